@@ -0,0 +1,192 @@
+"""
+Admission control for outbound upstream calls.
+
+Each upstream gets a fixed number of concurrent call slots. Callers that
+find every slot taken wait in a bounded FIFO queue for at most ``max_wait``
+seconds. When the queue is full, or the wait runs out, the call is shed at
+once with ``UpstreamOverloaded``. The services then answer from their
+caches, and the API answers 503 with a ``Retry-After`` hint when nothing is
+cached. A burst of cache misses therefore queues briefly instead of piling
+unbounded work onto a slow upstream, and every request gets an answer
+within a known time.
+"""
+
+import asyncio
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict
+
+from loguru import logger
+
+from metrics import Counter, Gauge, registry
+from resilience import UpstreamUnavailable
+
+ADMISSION_IN_FLIGHT = registry.register(Gauge(
+    "upstream_admission_in_flight",
+    "Upstream calls holding a concurrency slot.",
+    ("upstream",),
+))
+ADMISSION_QUEUE = registry.register(Gauge(
+    "upstream_admission_queue_depth",
+    "Upstream calls waiting for a concurrency slot.",
+    ("upstream",),
+))
+ADMISSION_WAIT = registry.register(Gauge(
+    "upstream_admission_wait_seconds",
+    "Time the most recently admitted call waited for a slot.",
+    ("upstream",),
+))
+ADMISSION_REJECTED = registry.register(Counter(
+    "upstream_admission_rejected_total",
+    "Upstream calls shed by admission control, by reason.",
+    ("upstream", "reason"),
+))
+
+# Weight of the newest slot hold time in its moving average
+_HOLD_ALPHA = 0.2
+
+
+class UpstreamOverloaded(UpstreamUnavailable):
+    """Raised when an upstream call is shed because all slots are busy."""
+
+    def __init__(self, message: str, retry_after: int = 1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Concurrency slots with a bounded, time-limited FIFO wait queue."""
+
+    def __init__(self, name: str, max_concurrency: int, queue_size: int, max_wait: float):
+        """
+        Args:
+            name: Upstream name used in logs and metrics
+            max_concurrency: Calls in flight at once (0 disables admission control)
+            queue_size: Maximum number of waiting callers
+            max_wait: Longest time in seconds a caller may wait for a slot
+        """
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.queue_size = queue_size
+        self.max_wait = max_wait
+        self.in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        # Moving average of how long a call holds its slot
+        self._hold_time = 0.0
+
+        # Statistics
+        self.admitted = 0
+        self.waited = 0
+        self.rejected = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_concurrency > 0
+
+    def retry_after(self) -> int:
+        """Seconds until the current queue is expected to drain (at least 1)."""
+        drain = self._hold_time * (len(self._waiters) + 1) / max(1, self.max_concurrency)
+        return max(1, math.ceil(drain))
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """
+        Hold a concurrency slot for the enclosed upstream call.
+
+        Raises:
+            UpstreamOverloaded: If the queue is full or no slot frees up within ``max_wait``
+        """
+        if not self.enabled:
+            yield
+            return
+        await self.acquire()
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self._hold_time += _HOLD_ALPHA * (time.monotonic() - start - self._hold_time)
+            self.release()
+
+    async def acquire(self) -> None:
+        """
+        Take a slot, waiting in the queue if all are busy.
+
+        Raises:
+            UpstreamOverloaded: If the queue is full or no slot frees up within ``max_wait``
+        """
+        if self.in_flight < self.max_concurrency and not self._waiters:
+            self.in_flight += 1
+            self.admitted += 1
+            ADMISSION_IN_FLIGHT.set(self.in_flight, self.name)
+            ADMISSION_WAIT.set(0.0, self.name)
+            return
+
+        if len(self._waiters) >= self.queue_size or self.max_wait <= 0:
+            self._reject("queue_full")
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        ADMISSION_QUEUE.set(len(self._waiters), self.name)
+        start = time.monotonic()
+        try:
+            # asyncio.wait leaves the future alone on timeout, so a slot
+            # handed over at the last moment is never lost
+            await asyncio.wait((future,), timeout=self.max_wait)
+        except asyncio.CancelledError:
+            self._leave(future)
+            raise
+        if not future.done():
+            self._leave(future)
+            self._reject("timeout")
+
+        waited = time.monotonic() - start
+        self.admitted += 1
+        self.waited += 1
+        ADMISSION_WAIT.set(waited, self.name)
+
+    def release(self) -> None:
+        """Give the slot to the longest waiting caller, or free it."""
+        while self._waiters:
+            future = self._waiters.popleft()
+            if not future.done():
+                # The slot passes on directly, so in_flight stays the same
+                future.set_result(None)
+                ADMISSION_QUEUE.set(len(self._waiters), self.name)
+                return
+        self.in_flight -= 1
+        ADMISSION_QUEUE.set(0, self.name)
+        ADMISSION_IN_FLIGHT.set(self.in_flight, self.name)
+
+    def _leave(self, future: asyncio.Future) -> None:
+        """Withdraw a waiter; if it was handed a slot meanwhile, pass the slot on."""
+        if future.done():
+            self.release()
+            return
+        future.cancel()
+        try:
+            self._waiters.remove(future)
+        except ValueError:
+            pass
+        ADMISSION_QUEUE.set(len(self._waiters), self.name)
+
+    def _reject(self, reason: str) -> None:
+        self.rejected += 1
+        ADMISSION_REJECTED.inc(self.name, reason)
+        retry_after = self.retry_after()
+        logger.warning(
+            f"🚦 {self.name}: overloaded, shedding call ({reason}, in_flight={self.in_flight}, "
+            f"queued={len(self._waiters)}, retry after {retry_after}s)"
+        )
+        raise UpstreamOverloaded(f"{self.name} overloaded ({reason})", retry_after=retry_after)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "in_flight": self.in_flight,
+            "queued": len(self._waiters),
+            "admitted": self.admitted,
+            "waited": self.waited,
+            "rejected": self.rejected,
+        }
@@ -0,0 +1,131 @@
+"""
+Playback manifests for LibriVox audiobooks.
+
+The agent's flow is search, then the user picks a book, then playback.
+Chapter URLs and durations need an extended LibriVox lookup per book, which
+is slow. So whenever /search_audiobooks returns results, the manifests of
+the top few books are fetched concurrently in the background into a
+bounded, expiring cache. By the time the user has picked one, the play call
+is usually served from memory. A play request for a book that is still
+being prefetched joins the running fetch instead of starting another.
+"""
+
+import asyncio
+from typing import Any, Dict, Iterable, Optional, Set
+
+from loguru import logger
+
+from cache import TTLCache
+from config import settings
+from librivox_service import LibriVoxService
+from logging_config import DETAIL
+
+
+def render_m3u(manifest: Dict[str, Any]) -> str:
+    """
+    Extended M3U playlist of a book's chapters.
+
+    Args:
+        manifest: Playback manifest from LibriVoxService.convert_manifest_format
+
+    Returns:
+        Playlist text
+    """
+    author = ", ".join(manifest.get("authors") or [])
+    lines = ["#EXTM3U", f"#PLAYLIST:{manifest.get('title') or ''}"]
+    for chapter in manifest["chapters"]:
+        title = f"{author} - {chapter['title']}" if author else chapter["title"]
+        lines.append(f"#EXTINF:{chapter['duration_seconds'] or -1},{title}")
+        lines.append(chapter["url"])
+    return "\n".join(lines) + "\n"
+
+
+class AudiobookManifests:
+    """Bounded cache of playback manifests, warmed from search results."""
+
+    def __init__(self, service: LibriVoxService, cache: Optional[TTLCache] = None):
+        """
+        Args:
+            service: LibriVox service that fetches manifests
+            cache: Manifest cache (defaults to a TTLCache sized from settings)
+        """
+        self.service = service
+        self.cache = cache if cache is not None else TTLCache(
+            maxsize=settings.audiobook_manifest_cache_maxsize,
+            ttl=settings.audiobook_manifest_ttl,
+            stale_ttl=settings.audiobook_manifest_stale_ttl,
+            name="audiobook-manifests",
+        )
+        self.prefetch_count = settings.audiobook_manifest_prefetch_count
+        self._tasks: Set[asyncio.Task] = set()
+
+        # Statistics
+        self.prefetched = 0
+        self.prefetch_failures = 0
+
+    async def get(self, book_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Return the playback manifest of a book, from the cache when possible.
+
+        Args:
+            book_id: LibriVox book id
+
+        Returns:
+            Playback manifest, or None if LibriVox has no such book
+
+        Raises:
+            httpx.HTTPError: If the request fails or LibriVox returns an error status
+            UpstreamUnavailable: If LibriVox is unavailable and the manifest is not cached
+        """
+        return await self.cache.get_or_load(book_id, lambda: self.service.fetch_manifest(book_id))
+
+    def prefetch(self, book_ids: Iterable[Any]) -> int:
+        """
+        Start background fetches for the first uncached books of a search result.
+
+        Args:
+            book_ids: Book ids in result order
+
+        Returns:
+            Number of fetches started
+        """
+        if self.prefetch_count <= 0 or not self.cache.enabled:
+            return 0
+        started = 0
+        for book_id in list(book_ids)[:self.prefetch_count]:
+            if book_id is None:
+                continue
+            book_id = str(book_id)
+            if self.cache.fresh_for(book_id) is not None:
+                continue
+            task = asyncio.create_task(self._prefetch(book_id))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+            started += 1
+        if started:
+            logger.log(DETAIL, "🎧 Prefetching {} audiobook manifests", started)
+        return started
+
+    async def _prefetch(self, book_id: str) -> None:
+        try:
+            await self.get(book_id)
+            self.prefetched += 1
+        except Exception as e:
+            # The play call retries the fetch itself
+            self.prefetch_failures += 1
+            logger.warning(f"⚠️ Audiobook manifest prefetch failed for book {book_id}: {e}")
+
+    async def stop(self) -> None:
+        """Cancel prefetches still running."""
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "cached": len(self.cache),
+            "prefetching": len(self._tasks),
+            "prefetched": self.prefetched,
+            "prefetch_failures": self.prefetch_failures,
+        }
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark of near-duplicate clustering on one SerpAPI result set.
+
+Runs news_dedup.cluster_articles over three result sets of 100 articles:
+ - realistic: 47 stories as reported by different outlets, with rephrased
+   headlines, their own snippets, some Spanish coverage and look-alike
+   stories that must stay apart ("Nadal wins" / "Nadal loses", rate cuts by
+   different banks). Each article is labelled with its story, so clustering
+   mistakes are counted as well.
+ - synthetic: the load-test fixture (20 headlines repeated with " (1)"
+   suffixes), the best case.
+ - distinct: no shared vocabulary, the worst case for the candidate index.
+"cold" clears the per-token caches before every run, as for a query with
+unseen words.
+
+Usage:
+    python benchmarks/bench_dedup.py [--iterations N]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import news_dedup  # noqa: E402
+
+FIXTURE = os.path.join(ROOT, "benchmarks", "fixtures", "serpapi_news.json")
+CLUSTERS_FIXTURE = os.path.join(ROOT, "benchmarks", "fixtures", "news_clusters.json")
+
+# Syllables for made-up words, so distinct articles share almost no vocabulary
+SYLLABLES = "ka lo mi ne ru sa te vo bi da fe go hu ji".split()
+
+
+def load_fixture():
+    with open(FIXTURE) as f:
+        results = json.load(f)["news_results"]
+    return [
+        {"title": a.get("title", ""), "description": a.get("snippet", ""), "position": a.get("position", 0)}
+        for a in results
+    ]
+
+
+def load_clusters_fixture():
+    """Realistic result set; each article carries the id of the story it reports as 'story'."""
+    with open(CLUSTERS_FIXTURE) as f:
+        results = json.load(f)["news_results"]
+    return [
+        {"title": a["title"], "description": a["snippet"], "position": a["position"], "story": a["story"]}
+        for a in results
+    ]
+
+
+def clustering_errors(articles):
+    """
+    (wrongly merged, missed) article counts for labelled articles.
+
+    An article is wrongly merged when its cluster's first member reports
+    another story, and missed when its story already had a cluster it did
+    not join.
+    """
+    wrong = missed = 0
+    first_cluster = {}
+    for number, (best, members) in enumerate(news_dedup._cluster(articles, 14, 8)):
+        head = articles[members[0]]["story"]
+        for i in members:
+            story = articles[i]["story"]
+            wrong += story != head
+            missed += first_cluster.setdefault(story, number) != number and story == head
+    return wrong, missed
+
+
+def distinct_articles(n: int = 100):
+    rng = random.Random(42)
+
+    def word():
+        return "".join(rng.choice(SYLLABLES) for _ in range(3))
+
+    return [
+        {
+            "title": " ".join(word() for _ in range(7)),
+            "description": " ".join(word() for _ in range(25)),
+            "position": i + 1,
+        }
+        for i in range(n)
+    ]
+
+
+def measure(articles, iterations: int, cold: bool) -> float:
+    def run():
+        if cold:
+            news_dedup._lanes.clear()
+            news_dedup._stems.clear()
+        news_dedup.cluster_articles(articles)
+    return min(timeit.repeat(run, number=iterations, repeat=5)) / iterations
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    print("Near-duplicate clustering cost per result set")
+    result_sets = (("realistic", load_clusters_fixture()), ("synthetic", load_fixture()), ("distinct", distinct_articles()))
+    for name, articles in result_sets:
+        clusters = news_dedup.cluster_articles(articles)
+        warm = measure(articles, args.iterations, cold=False)
+        cold = measure(articles, args.iterations, cold=True)
+        print(
+            f"  {name:9} {len(articles):4} articles -> {len(clusters):3} stories   "
+            f"warm {warm * 1e6:8.1f} µs   cold {cold * 1e6:8.1f} µs"
+        )
+
+    articles = load_clusters_fixture()
+    wrong, missed = clustering_errors(articles)
+    stories = len({article["story"] for article in articles})
+    print(f"  realistic: {stories} true stories, {wrong} articles merged into another story, {missed} not merged")
+
+
+if __name__ == "__main__":
+    main_cli()
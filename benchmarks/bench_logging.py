@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Benchmark of per-request logging overhead on /api/v1/news/top.
+
+Drives the app in-process (httpx.ASGITransport) against a local stand-in
+SerpAPI transport with a warm news cache, and compares the default verbose
+mode at INFO with the structured mode (detail lines gated, one sampled
+summary line per request). Logs are written to a temporary directory.
+
+Usage:
+    python benchmarks/bench_logging.py [--requests N] [--sample-rate R]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("SERPAPI_API_KEY", "benchmark")
+os.environ.setdefault("SERPAPI_BASE_URL", "http://serpapi.local/search.json")
+os.environ.setdefault("LIBRIVOX_API", "http://librivox.local/api/feed/audiobooks/?format=json")
+os.chdir(tempfile.mkdtemp(prefix="bench_logging_"))
+
+import httpx  # noqa: E402
+from loguru import logger  # noqa: E402
+
+import main  # noqa: E402
+from http_clients import build_client  # noqa: E402
+from logging_config import configure_logging  # noqa: E402
+
+NEWS_PAYLOAD = {
+    "search_metadata": {"status": "Success"},
+    "news_results": [
+        {"title": f"Headline {i}", "snippet": "Snippet " * 10, "source": "Example",
+         "date": f"{i % 23 + 1} hours ago", "link": f"https://example.com/{i}"}
+        for i in range(100)
+    ],
+}
+
+
+def serpapi_stand_in(request: httpx.Request) -> httpx.Response:
+    return httpx.Response(200, json=NEWS_PAYLOAD)
+
+
+async def run(mode: str, requests: int, sample_rate: float) -> float:
+    configure_logging(mode, console=False)
+    main.request_sampler.default_rate = sample_rate
+    main.serpapi_service.client = build_client(5, 5, transport=httpx.MockTransport(serpapi_stand_in))
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://app") as client:
+        params = {"q": "Spain sports news", "limit": 3}
+        for _ in range(20):  # warm up the cache and code paths
+            await client.get("/api/v1/news/top", params=params)
+        start = time.perf_counter()
+        for _ in range(requests):
+            response = await client.get("/api/v1/news/top", params=params)
+            response.raise_for_status()
+        elapsed = time.perf_counter() - start
+    await logger.complete()
+    return elapsed / requests
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--sample-rate", type=float, default=0.1)
+    args = parser.parse_args()
+
+    # Silence loguru's default stderr sink so only the file sinks are measured
+    logger.remove(0)
+    verbose = asyncio.run(run("verbose", args.requests, args.sample_rate))
+    structured = asyncio.run(run("structured", args.requests, args.sample_rate))
+    print(f"{args.requests} warm-cache GET /api/v1/news/top requests")
+    print(f"  verbose (INFO + detail lines)        {verbose * 1e6:8.1f} µs/request")
+    print(f"  structured (sample={args.sample_rate:<4})           {structured * 1e6:8.1f} µs/request")
+    print(f"  saved per request                    {(verbose - structured) * 1e6:8.1f} µs ({verbose / structured:.2f}x)")
+
+
+if __name__ == "__main__":
+    main_cli()
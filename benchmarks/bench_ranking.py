@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for the SerpAPI ranking stage.
+
+Compares the previous per-article parsing + full sort with the
+news_ranking pipeline (one compiled pattern, one reference timestamp,
+per-batch memoization and heap top-k) on a realistic 100-article batch.
+
+Usage:
+    python benchmarks/bench_ranking.py [--iterations N]
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+import timeit
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from news_ranking import rank_articles  # noqa: E402
+
+
+def legacy_parse_date_string(date_str):
+    """The pre-rework SerpAPIService._parse_date_string, kept as the baseline."""
+    if not date_str:
+        return None
+    patterns = [
+        r'(\d+)\s+(minute|hour|day|week|month|year)s?\s+ago',
+        r'(\d+)\s+(minute|hour|day|week|month|year)\s+ago',
+        r'(\d+)\s+(min|hr|d|w|mo|y)\s+ago',
+    ]
+    for pattern in patterns:
+        match = re.search(pattern, date_str.lower())
+        if match:
+            try:
+                value = int(match.group(1))
+                unit = match.group(2)
+                now = datetime.now()
+                if unit in ['minute', 'min']:
+                    return now - timedelta(minutes=value)
+                elif unit in ['hour', 'hr']:
+                    return now - timedelta(hours=value)
+                elif unit in ['day', 'd']:
+                    return now - timedelta(days=value)
+                elif unit in ['week', 'w']:
+                    return now - timedelta(weeks=value)
+                elif unit in ['month', 'mo']:
+                    return now - timedelta(days=value * 30)
+                elif unit in ['year', 'y']:
+                    return now - timedelta(days=value * 365)
+            except (ValueError, TypeError):
+                continue
+    try:
+        for fmt in ['%Y-%m-%d', '%m/%d/%Y', '%d/%m/%Y', '%B %d, %Y']:
+            try:
+                return datetime.strptime(date_str, fmt)
+            except ValueError:
+                continue
+    except Exception:
+        pass
+    return None
+
+
+def legacy_rank(articles, size):
+    def get_sort_key(article):
+        published_at = article.get('published_at', '')
+        if not published_at:
+            return datetime.min
+        return legacy_parse_date_string(published_at) or datetime.min
+    return sorted(articles, key=get_sort_key, reverse=True)[:size]
+
+
+def make_batch(n=100, seed=7):
+    """Build a batch with the mix of date strings seen in logs/news_api.log."""
+    rng = random.Random(seed)
+    dates = []
+    for _ in range(n):
+        roll = rng.random()
+        if roll < 0.35:
+            dates.append(f"{rng.randint(1, 23)} hours ago")
+        elif roll < 0.65:
+            dates.append(f"{rng.randint(1, 6)} days ago")
+        elif roll < 0.75:
+            dates.append(f"{rng.randint(1, 4)} weeks ago")
+        elif roll < 0.80:
+            dates.append(f"{rng.randint(1, 59)} minutes ago")
+        elif roll < 0.95:
+            day = datetime(2025, 9, 1) + timedelta(days=rng.randint(0, 30))
+            dates.append(day.strftime("%B %d, %Y"))
+        else:
+            dates.append("")
+    return [{"title": f"Story {i}", "published_at": d} for i, d in enumerate(dates)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    articles = make_batch()
+    assert [a["title"] for a in legacy_rank(articles, 3)] == [a["title"] for a in rank_articles(articles, k=3)]
+
+    cases = {
+        "legacy parse + full sort, size=3": lambda: legacy_rank(articles, 3),
+        "ranking stage, top-k size=3": lambda: rank_articles(articles, k=3),
+        "ranking stage, full order": lambda: rank_articles(articles),
+    }
+
+    baseline = None
+    print(f"{len(articles)} articles, {args.iterations} iterations")
+    for name, fn in cases.items():
+        best = min(timeit.repeat(fn, number=args.iterations, repeat=5)) / args.iterations
+        baseline = baseline or best
+        print(f"  {name:<36} {best * 1e6:8.1f} µs/request  ({baseline / best:4.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
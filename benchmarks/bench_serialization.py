@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark of the per-response cost of building the /api/v1/news/top body.
+
+Compares the previous handler path (formatted_story dicts validated into
+NewsResponse, re-validated and serialized through FastAPI's response_model
+machinery and encoded by JSONResponse) with the news_pipeline path, both on
+a cache miss (typed Story records rendered to JSON bytes) and on a cache hit
+(reused encoded bytes).
+
+Usage:
+    python benchmarks/bench_serialization.py [--iterations N] [--limit N]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("SERPAPI_API_KEY", "benchmark")
+os.environ.setdefault("SERPAPI_BASE_URL", "http://serpapi.local/search.json")
+os.environ.setdefault("LIBRIVOX_API", "http://librivox.local/api/feed/audiobooks/?format=json")
+
+from fastapi.responses import JSONResponse  # noqa: E402
+from loguru import logger  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+
+import serialization  # noqa: E402
+from http_caching import compute_etag  # noqa: E402
+from main import NewsResponse  # noqa: E402
+from news_pipeline import NewsPage, NewsPipeline, Story, render_news_response  # noqa: E402
+
+ARTICLES = [
+    {
+        "title": f"Community choir celebrates {i} years of song",
+        "description": "Residents gathered to mark the occasion, and organisers said they hope to make it a yearly tradition.",
+        "source": "Example News",
+        "published_at": f"{i % 23 + 1} hours ago",
+        "link": f"https://example.com/{i}",
+        "category": "news",
+        "country": "us",
+        "language": "en",
+    }
+    for i in range(100)
+]
+
+_response_adapter = TypeAdapter(NewsResponse)
+
+
+def legacy_render(articles, limit: int) -> bytes:
+    """The pre-pipeline handler path, kept as the baseline."""
+    stories_data = []
+    for story in articles[:limit]:
+        formatted_story = {
+            "title": story.get("title", "No title"),
+            "description": story.get("description", "No description available"),
+            "source": story.get("source", "Unknown source"),
+            "published_at": story.get("published_at", ""),
+            "language": "en"
+        }
+        stories_data.append(formatted_story)
+    response = NewsResponse(
+        success=True,
+        stories=stories_data,
+        total_count=len(stories_data),
+        language="en",
+        locale=None,
+        categories=None
+    )
+    # response_model: validate the returned object again, then serialize
+    validated = _response_adapter.validate_python(response, from_attributes=True)
+    content = _response_adapter.dump_python(validated, mode="json")
+    return JSONResponse(content).body
+
+
+def pipeline_miss(articles, limit: int) -> bytes:
+    stories = tuple(Story.from_article(article) for article in articles[:limit])
+    body = render_news_response(stories)
+    return NewsPage(stories=stories, body=body, etag=compute_etag(body)).body
+
+
+class CachedService:
+    """Stand-in for SerpAPIService that always returns the same cached list."""
+
+    async def get_ranked_articles(self, q=None, limit=None, **kwargs):
+        return ARTICLES
+
+    def cache_key_for(self, q):
+        return (q, "en", "lang_en", "google.com")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--limit", type=int, default=5)
+    args = parser.parse_args()
+    logger.remove()
+
+    expected = serialization.loads(legacy_render(ARTICLES, args.limit))
+    rendered = serialization.loads(pipeline_miss(ARTICLES, args.limit))
+    for story in rendered["stories"]:
+        story.pop("cluster_size")  # Added after the legacy path
+    assert expected == rendered
+
+    pipeline = NewsPipeline(CachedService())
+    loop = asyncio.new_event_loop()
+    loop.run_until_complete(pipeline.top_stories("q", args.limit))
+
+    def pipeline_hit():
+        coro = pipeline.top_stories("q", args.limit)
+        try:
+            coro.send(None)
+        except StopIteration as done:
+            return done.value.body
+
+    n = args.iterations
+    legacy = min(timeit.repeat(lambda: legacy_render(ARTICLES, args.limit), number=n, repeat=3)) / n
+    miss = min(timeit.repeat(lambda: pipeline_miss(ARTICLES, args.limit), number=n, repeat=3)) / n
+    hit = min(timeit.repeat(pipeline_hit, number=n, repeat=3)) / n
+
+    encoder = "orjson" if serialization.orjson is not None else "json"
+    print(f"Serialization cost per response ({args.limit} stories, {encoder})")
+    print(f"  legacy NewsResponse + response_model   {legacy * 1e6:8.2f} µs")
+    print(f"  pipeline, cache miss (Story + encode)  {miss * 1e6:8.2f} µs  ({legacy / miss:.1f}x)")
+    print(f"  pipeline, cache hit (reused bytes)     {hit * 1e6:8.2f} µs  ({legacy / hit:.1f}x)")
+
+
+if __name__ == "__main__":
+    main_cli()
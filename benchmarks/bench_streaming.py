@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Time-to-first-story benchmark for the streaming news endpoint.
+
+Serves the app and the SerpAPI stand-in (benchmarks/fake_upstreams.py) with
+uvicorn on local ports, then compares when the first headline reaches the
+client for the buffered GET /api/v1/news/top and for
+GET /api/v1/news/stream in SSE and NDJSON format, with a cold cache (every
+request goes to the stand-in) and a warm one. Stories are ranked over the
+whole SerpAPI result before the first event, so the stream is expected to
+match the buffered endpoint, not beat it.
+
+Usage:
+    python benchmarks/bench_streaming.py [--requests N] [--serpapi-latency-ms MS]
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, BENCH_DIR)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+UPSTREAM_PORT = free_port()
+APP_PORT = free_port()
+os.environ["SERPAPI_API_KEY"] = "benchmark"
+os.environ["SERPAPI_BASE_URL"] = f"http://127.0.0.1:{UPSTREAM_PORT}/search.json"
+os.environ["LIBRIVOX_API"] = f"http://127.0.0.1:{UPSTREAM_PORT}/api/feed/audiobooks/?format=json"
+os.environ["PREFETCH_ENABLED"] = "false"
+os.environ["LIBRIVOX_CATALOG_ENABLED"] = "false"
+os.environ["LOG_MODE"] = "structured"
+os.chdir(tempfile.mkdtemp(prefix="bench_streaming_"))
+
+import httpx  # noqa: E402
+import uvicorn  # noqa: E402
+from loguru import logger  # noqa: E402
+
+import main  # noqa: E402
+from fake_upstreams import create_app  # noqa: E402
+
+
+async def serve(app, port: int) -> uvicorn.Server:
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", lifespan="on"))
+    server.install_signal_handlers = lambda: None
+    asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+    return server
+
+
+async def buffered(client: httpx.AsyncClient, q: str) -> float:
+    start = time.perf_counter()
+    response = await client.get("/api/v1/news/top", params={"q": q, "limit": 5})
+    response.raise_for_status()
+    assert response.json()["stories"]
+    return time.perf_counter() - start
+
+
+async def streamed(client: httpx.AsyncClient, q: str, fmt: str) -> float:
+    marker = "event: story" if fmt == "sse" else '"event":"story"'
+    start = time.perf_counter()
+    async with client.stream("GET", "/api/v1/news/stream", params={"q": q, "limit": 5, "format": fmt}) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if marker in line:
+                return time.perf_counter() - start
+    raise RuntimeError("No story event received")
+
+
+async def run(requests: int, serpapi_latency: float) -> None:
+    logger.remove()
+    upstream = await serve(create_app(serpapi_latency=serpapi_latency, jitter=0.0), UPSTREAM_PORT)
+    app = await serve(main.app, APP_PORT)
+
+    variants = {
+        "buffered /news/top": lambda c, q: buffered(c, q),
+        "stream sse": lambda c, q: streamed(c, q, "sse"),
+        "stream ndjson": lambda c, q: streamed(c, q, "ndjson"),
+    }
+    print(f"Time to first story (median of {requests}, SerpAPI stand-in latency {serpapi_latency * 1000:.0f} ms)")
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{APP_PORT}", timeout=30) as client:
+        for name, measure in variants.items():
+            cold, warm = [], []
+            for i in range(requests):
+                q = f"{name} query {i}"
+                cold.append(await measure(client, q))  # cache miss
+                warm.append(await measure(client, q))  # cache hit
+            print(f"  {name:<20} cold {statistics.median(cold) * 1000:8.2f} ms   "
+                  f"warm {statistics.median(warm) * 1000:8.2f} ms")
+
+    app.should_exit = True
+    upstream.should_exit = True
+    await asyncio.sleep(0.2)
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--serpapi-latency-ms", type=float, default=350)
+    args = parser.parse_args()
+    asyncio.run(run(args.requests, args.serpapi_latency_ms / 1000))
+
+
+if __name__ == "__main__":
+    main_cli()
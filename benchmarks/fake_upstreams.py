@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the SerpAPI and LibriVox APIs.
+
+Serves the recorded payloads in benchmarks/fixtures with configurable latency
+and error rates, so the app can be load-tested without spending SerpAPI
+quota. Both upstreams are served by one server:
+
+    SERPAPI_BASE_URL=http://127.0.0.1:8900/search.json
+    LIBRIVOX_API=http://127.0.0.1:8900/api/feed/audiobooks/?format=json
+
+Usage:
+    python benchmarks/fake_upstreams.py [--port 8900] [--serpapi-latency-ms 350]
+        [--librivox-latency-ms 150] [--jitter 0.3] [--error-rate 0.0] [--capacity 0]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def load_fixture(name: str) -> dict:
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def create_app(
+    serpapi_latency: float = 0.35,
+    librivox_latency: float = 0.15,
+    jitter: float = 0.3,
+    error_rate: float = 0.0,
+    capacity: int = 0,
+    news_payload: dict = None,
+    books_payload: dict = None,
+) -> Starlette:
+    """
+    Build the stand-in app.
+
+    Args:
+        serpapi_latency: Mean SerpAPI response time in seconds
+        librivox_latency: Mean LibriVox response time in seconds
+        jitter: +/- fraction applied uniformly to each latency
+        error_rate: Fraction of requests answered with a 500
+        capacity: Requests each upstream works on at once; the rest queue,
+            like an overloaded backend (0 means unlimited)
+        news_payload: SerpAPI response body (defaults to the recorded fixture)
+        books_payload: LibriVox response body (defaults to the recorded fixture)
+
+    Returns:
+        Starlette application
+    """
+    news = news_payload or load_fixture("serpapi_news.json")
+    books = (books_payload or load_fixture("librivox_books.json"))["books"]
+
+    workers = {name: asyncio.Semaphore(capacity) if capacity > 0 else None for name in ("serpapi", "librivox")}
+
+    async def delay(mean: float, upstream: str) -> None:
+        if mean <= 0:
+            return
+        seconds = mean * random.uniform(1 - jitter, 1 + jitter)
+        if workers[upstream] is None:
+            await asyncio.sleep(seconds)
+            return
+        async with workers[upstream]:
+            await asyncio.sleep(seconds)
+
+    async def serpapi(request: Request) -> JSONResponse:
+        await delay(serpapi_latency, "serpapi")
+        if random.random() < error_rate:
+            return JSONResponse({"error": "Simulated upstream failure"}, status_code=500)
+        return JSONResponse(news)
+
+    async def librivox(request: Request) -> JSONResponse:
+        await delay(librivox_latency, "librivox")
+        if random.random() < error_rate:
+            return JSONResponse({"error": "Simulated upstream failure"}, status_code=500)
+        title = (request.query_params.get("title") or "").lstrip("^").casefold()
+        genre = (request.query_params.get("genre") or "").casefold()
+        offset = int(request.query_params.get("offset", 0))
+        limit = int(request.query_params.get("limit", 50))
+        matches = [
+            book for book in books
+            if title in book["title"].casefold()
+            and (not genre or any(genre in g["name"].casefold() for g in book["genres"]))
+        ][offset:offset + limit]
+        if not matches:
+            # LibriVox answers 404 when nothing matches
+            return JSONResponse({"error": "Audiobooks could not be found"}, status_code=404)
+        return JSONResponse({"books": matches})
+
+    return Starlette(routes=[
+        Route("/search.json", serpapi),
+        Route("/api/feed/audiobooks/", librivox),
+    ])
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--serpapi-latency-ms", type=float, default=350)
+    parser.add_argument("--librivox-latency-ms", type=float, default=150)
+    parser.add_argument("--jitter", type=float, default=0.3)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--capacity", type=int, default=0, help="Requests served at once per upstream (0 = unlimited)")
+    args = parser.parse_args()
+
+    app = create_app(
+        serpapi_latency=args.serpapi_latency_ms / 1000,
+        librivox_latency=args.librivox_latency_ms / 1000,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        capacity=args.capacity,
+    )
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main_cli()
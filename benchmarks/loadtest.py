@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""
+Load test for /api/v1/news/top (GET and POST) and /search_audiobooks.
+
+Starts the local SerpAPI/LibriVox stand-in (benchmarks/fake_upstreams.py) in a
+subprocess, then drives the app at a fixed request rate and reports p50/p95/
+p99 latency, throughput and CPU time per request. By default the app runs
+in-process over httpx.ASGITransport with its real lifespan (pooled clients,
+caches), so CPU per request covers the app plus the load generator; pass
+--target to load an already running server instead.
+
+The generator is open-loop: requests are started on a fixed schedule and
+latency is measured from the scheduled start, so a slow server shows up as
+higher latency rather than as a lower request rate.
+
+Requests shed by the app's admission control (503 with Retry-After) are
+counted separately as ``shed`` rather than as errors, and their latency is
+not included in the percentiles.
+
+Results are written as JSON (benchmarks/results/ by default). Pass
+--baseline with an earlier result file to print the change per metric.
+
+Usage:
+    python benchmarks/loadtest.py [--rps 50] [--duration 20]
+        [--mix news_get=4,news_post=4,audiobooks=2] [--no-cache]
+        [--serpapi-latency-ms 350] [--error-rate 0.0] [--upstream-capacity 0]
+        [--target http://localhost:8000] [--baseline results/old.json]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT)
+
+# Queries drawn with Zipf-like weights so some repeat, as in real sessions
+NEWS_QUERIES = [
+    "Spain national news today",
+    "good news today",
+    "Spain sports news",
+    "uplifting science news",
+    "Madrid local news",
+    "gardening news",
+    "classical music news",
+    "world travel news",
+]
+AUDIOBOOK_SEARCHES = [
+    {"title": "Pride and Prejudice"},
+    {"title": "Sherlock"},
+    {"genre": "Romance"},
+    {"title": "Treasure Island"},
+    {"genre": "Detective Fiction"},
+    {"title": "Emma", "genre": "Romance"},
+]
+SCENARIOS = ("news_get", "news_post", "audiobooks")
+
+
+def weighted_choice(items: list) -> object:
+    return random.choices(items, weights=[1 / (i + 1) for i in range(len(items))])[0]
+
+
+def build_request(scenario: str) -> Tuple[str, str, dict]:
+    """Return (method, path, httpx request kwargs) for one request of ``scenario``."""
+    if scenario == "news_get":
+        return "GET", "/api/v1/news/top", {"params": {"q": weighted_choice(NEWS_QUERIES), "limit": 3}}
+    if scenario == "news_post":
+        return "POST", "/api/v1/news/top", {"json": {"q": weighted_choice(NEWS_QUERIES), "limit": 3}}
+    return "GET", "/search_audiobooks", {"params": weighted_choice(AUDIOBOOK_SEARCHES)}
+
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        if name not in SCENARIOS:
+            raise SystemExit(f"Unknown scenario '{name}' (expected one of {', '.join(SCENARIOS)})")
+        weights[name] = float(weight or 1)
+    return weights
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(latencies: List[float], errors: int, shed: int, duration: float) -> Dict[str, float]:
+    values = sorted(latencies)
+    return {
+        "requests": len(values) + errors + shed,
+        "errors": errors,
+        "shed": shed,
+        "throughput_rps": round(len(values) / duration, 2),
+        "mean_ms": round(sum(values) / len(values) * 1000, 2) if values else 0.0,
+        "p50_ms": round(percentile(values, 50) * 1000, 2),
+        "p95_ms": round(percentile(values, 95) * 1000, 2),
+        "p99_ms": round(percentile(values, 99) * 1000, 2),
+        "max_ms": round(values[-1] * 1000, 2) if values else 0.0,
+    }
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_upstreams(args) -> Tuple[subprocess.Popen, str]:
+    """Start fake_upstreams.py in a subprocess and wait until it accepts connections."""
+    port = free_port()
+    process = subprocess.Popen([
+        sys.executable, os.path.join(BENCH_DIR, "fake_upstreams.py"),
+        "--port", str(port),
+        "--serpapi-latency-ms", str(args.serpapi_latency_ms),
+        "--librivox-latency-ms", str(args.librivox_latency_ms),
+        "--jitter", str(args.jitter),
+        "--error-rate", str(args.error_rate),
+        "--capacity", str(args.upstream_capacity),
+    ])
+    deadline = time.monotonic() + 15
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return process, f"http://127.0.0.1:{port}"
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise SystemExit("Fake upstreams did not start")
+
+
+async def drive(client: httpx.AsyncClient, weights: Dict[str, float], rps: float, duration: float,
+                warmup: float) -> Tuple[Dict[str, List[float]], Dict[str, int], Dict[str, int], float, float]:
+    """
+    Send requests on a fixed schedule for ``duration`` seconds after ``warmup``.
+
+    Returns:
+        (latencies per scenario, errors per scenario, shed requests per
+        scenario, measured seconds, CPU seconds)
+    """
+    latencies: Dict[str, List[float]] = {name: [] for name in weights}
+    errors: Dict[str, int] = {name: 0 for name in weights}
+    shed: Dict[str, int] = {name: 0 for name in weights}
+    names, scenario_weights = list(weights), list(weights.values())
+
+    async def one(scenario: str, scheduled: float, record: bool) -> None:
+        method, path, kwargs = build_request(scenario)
+        status = None
+        try:
+            response = await client.request(method, path, **kwargs)
+            status = response.status_code
+            ok = status < 400 or (scenario == "audiobooks" and status == 404)
+        except httpx.HTTPError:
+            ok = False
+        if record:
+            if status == 503 and "retry-after" in response.headers:
+                shed[scenario] += 1
+            elif ok:
+                latencies[scenario].append(time.perf_counter() - scheduled)
+            else:
+                errors[scenario] += 1
+
+    interval = 1 / rps
+    tasks = []
+    start = time.perf_counter()
+    measure_from = start + warmup
+    end = measure_from + duration
+    cpu_start = None
+    i = 0
+    while True:
+        scheduled = start + i * interval
+        if scheduled >= end:
+            break
+        if cpu_start is None and scheduled >= measure_from:
+            cpu_start = time.process_time()
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        scenario = random.choices(names, weights=scenario_weights)[0]
+        tasks.append(asyncio.create_task(one(scenario, scheduled, scheduled >= measure_from)))
+        i += 1
+    await asyncio.gather(*tasks)
+    cpu = time.process_time() - (cpu_start if cpu_start is not None else time.process_time())
+    return latencies, errors, shed, time.perf_counter() - measure_from, cpu
+
+
+async def run_in_process(args, upstream_url: str, weights: Dict[str, float]):
+    os.environ["SERPAPI_API_KEY"] = "loadtest"
+    os.environ["SERPAPI_BASE_URL"] = f"{upstream_url}/search.json"
+    os.environ["LIBRIVOX_API"] = f"{upstream_url}/api/feed/audiobooks/?format=json"
+    os.environ.setdefault("PREFETCH_ENABLED", "false")
+    os.environ.setdefault("LIBRIVOX_CATALOG_ENABLED", "false")
+    os.environ["LOG_MODE"] = args.log_mode
+    if args.no_cache:
+        os.environ["NEWS_CACHE_MAXSIZE"] = "0"
+        os.environ["AUDIOBOOK_CACHE_MAXSIZE"] = "0"
+    os.chdir(tempfile.mkdtemp(prefix="loadtest_"))
+
+    from loguru import logger
+    import main
+
+    # Only the file sink configured by the app is kept
+    try:
+        logger.remove(0)
+    except ValueError:
+        pass
+
+    async with main.app.router.lifespan_context(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://app", timeout=60) as client:
+            return await drive(client, weights, args.rps, args.duration, args.warmup)
+
+
+async def run_against_target(args, weights: Dict[str, float]):
+    limits = httpx.Limits(max_connections=args.max_connections, max_keepalive_connections=args.max_connections)
+    async with httpx.AsyncClient(base_url=args.target, timeout=60, limits=limits) as client:
+        return await drive(client, weights, args.rps, args.duration, args.warmup)
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(result: dict, baseline: Optional[dict]) -> None:
+    columns = ("requests", "errors", "shed", "throughput_rps", "p50_ms", "p95_ms", "p99_ms", "max_ms")
+    print(f"{'scenario':<12}" + "".join(f"{c:>16}" for c in columns))
+    rows = [("overall", result["overall"])] + list(result["scenarios"].items())
+    for name, stats in rows:
+        print(f"{name:<12}" + "".join(f"{stats[c]:>16}" for c in columns))
+        if baseline:
+            previous = baseline["overall"] if name == "overall" else baseline["scenarios"].get(name)
+            if previous:
+                deltas = []
+                for c in columns:
+                    before = previous.get(c)
+                    deltas.append(f"{(stats[c] - before) / before * 100:+.1f}%" if before else "-")
+                print(f"{'  vs base':<12}" + "".join(f"{d:>16}" for d in deltas))
+    cpu = result["overall"].get("cpu_ms_per_request")
+    if cpu is not None:
+        line = f"CPU per request: {cpu} ms (app + load generator)"
+        if baseline and baseline["overall"].get("cpu_ms_per_request"):
+            before = baseline["overall"]["cpu_ms_per_request"]
+            line += f"  vs base {(cpu - before) / before * 100:+.1f}%"
+        print(line)
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rps", type=float, default=50, help="Target requests per second")
+    parser.add_argument("--duration", type=float, default=20, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=2, help="Unmeasured seconds before measuring")
+    parser.add_argument("--mix", default="news_get=4,news_post=4,audiobooks=2",
+                        help="Scenario weights, e.g. news_get=1,audiobooks=1")
+    parser.add_argument("--target", help="Base URL of a running server (default: run the app in-process)")
+    parser.add_argument("--max-connections", type=int, default=200, help="Client pool size with --target")
+    parser.add_argument("--no-cache", action="store_true", help="Disable the in-process result caches")
+    parser.add_argument("--log-mode", default="verbose", choices=("verbose", "structured"))
+    parser.add_argument("--serpapi-latency-ms", type=float, default=350)
+    parser.add_argument("--librivox-latency-ms", type=float, default=150)
+    parser.add_argument("--jitter", type=float, default=0.3)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--upstream-capacity", type=int, default=0,
+                        help="Requests the stand-in serves at once per upstream (0 = unlimited)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/loadtest-<timestamp>.json)")
+    parser.add_argument("--baseline", help="Earlier result file to compare against")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    weights = parse_mix(args.mix)
+    output = os.path.abspath(args.output or os.path.join(
+        BENCH_DIR, "results", f"loadtest-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    ))
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    upstreams = None
+    try:
+        if args.target:
+            latencies, errors, shed, elapsed, cpu = asyncio.run(run_against_target(args, weights))
+        else:
+            upstreams, upstream_url = start_upstreams(args)
+            latencies, errors, shed, elapsed, cpu = asyncio.run(run_in_process(args, upstream_url, weights))
+    finally:
+        if upstreams is not None:
+            upstreams.terminate()
+            upstreams.wait()
+
+    overall = summarize(
+        [v for values in latencies.values() for v in values], sum(errors.values()), sum(shed.values()), elapsed
+    )
+    if not args.target and overall["requests"]:
+        overall["cpu_ms_per_request"] = round(cpu / overall["requests"] * 1000, 3)
+
+    result = {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "config": {
+            "rps": args.rps,
+            "duration": args.duration,
+            "warmup": args.warmup,
+            "mix": weights,
+            "target": args.target or "in-process",
+            "cache": not args.no_cache,
+            "log_mode": args.log_mode,
+            "serpapi_latency_ms": args.serpapi_latency_ms,
+            "librivox_latency_ms": args.librivox_latency_ms,
+            "jitter": args.jitter,
+            "error_rate": args.error_rate,
+            "upstream_capacity": args.upstream_capacity,
+            "seed": args.seed,
+        },
+        "overall": overall,
+        "scenarios": {name: summarize(latencies[name], errors[name], shed[name], elapsed) for name in weights},
+    }
+
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2)
+
+    print_report(result, baseline)
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main_cli()
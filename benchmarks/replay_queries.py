@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Replay logged news queries to measure the cache hit-rate gain of query canonicalization.
+
+Reads the /api/v1/news/top requests from a server log ("Fetching stories
+with query: '...'" lines, with their timestamps). For each request it then
+simulates the news result cache keyed by the raw query (the previous
+behaviour) and by the canonical query. Two caches are simulated: one that
+never expires and one with a freshness TTL. Only the queries are read from
+the log.
+
+Usage:
+    python benchmarks/replay_queries.py [--log logs/news_api.log] [--ttl 300] [--top 10]
+"""
+
+import argparse
+import os
+import re
+import sys
+from collections import Counter, defaultdict
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from news_query import canonicalize_query  # noqa: E402
+
+REQUEST_LINE = re.compile(
+    r"^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})\S* \| .*Fetching stories with query: '(.*)', limit=\d+"
+)
+
+
+def read_requests(path: str):
+    """Yield (timestamp, query) for every logged news request."""
+    with open(path, encoding="utf-8", errors="replace") as f:
+        for line in f:
+            match = REQUEST_LINE.match(line)
+            if match:
+                yield datetime.strptime(match.group(1), "%Y-%m-%d %H:%M:%S").timestamp(), match.group(2)
+
+
+def hit_rate(requests, key, ttl: float) -> float:
+    """Fraction of requests served by a cache keyed by ``key(query)``."""
+    fetched = {}
+    hits = 0
+    for ts, q in requests:
+        k = key(q)
+        if k in fetched and ts - fetched[k] < ttl:
+            hits += 1
+        else:
+            fetched[k] = ts
+    return hits / len(requests) if requests else 0.0
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--log", default=os.path.join(ROOT, "logs", "news_api.log"))
+    parser.add_argument("--ttl", type=float, default=300.0, help="Cache freshness in seconds (NEWS_CACHE_TTL)")
+    parser.add_argument("--top", type=int, default=10, help="Largest merged query groups to show")
+    args = parser.parse_args()
+
+    requests = list(read_requests(args.log))
+    if not requests:
+        sys.exit(f"No news requests found in {args.log}")
+
+    def raw(q):
+        return q
+
+    def canonical(q):
+        return canonicalize_query(q)
+
+    raw_keys = {raw(q) for _, q in requests}
+    canonical_keys = {canonical(q) for _, q in requests}
+    print(f"Replayed {len(requests)} news requests from {args.log}")
+    print(f"  distinct cache keys      raw {len(raw_keys):6}  canonical {len(canonical_keys):6}")
+    for label, ttl in (("unbounded", float("inf")), (f"TTL {args.ttl:.0f}s", args.ttl)):
+        before = hit_rate(requests, raw, ttl)
+        after = hit_rate(requests, canonical, ttl)
+        print(f"  hit rate, {label:13} raw {before:6.1%}   canonical {after:6.1%}   (+{(after - before) * 100:.1f} pts)")
+
+    groups = defaultdict(Counter)
+    for _, q in requests:
+        groups[canonical(q)][q] += 1
+    merged = sorted((g for g in groups.items() if len(g[1]) > 1), key=lambda g: -len(g[1]))
+    if merged and args.top:
+        print("\nLargest merged groups (canonical query <- raw variants):")
+        for key, variants in merged[: args.top]:
+            print(f"  [{key.language}] {key.q!r} <- {len(variants)} variants: " + ", ".join(repr(v) for v in variants))
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,253 @@
+"""
+In-process result caching with TTL, LRU eviction and stale-while-revalidate.
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterator, Optional, Tuple
+
+from loguru import logger
+
+Loader = Callable[[], Awaitable[Any]]
+
+# True while a loader runs as a background stale-while-revalidate refresh,
+# so upstream schedulers can give it a lower priority than live requests
+in_background_refresh: ContextVar[bool] = ContextVar("in_background_refresh", default=False)
+
+
+class CacheEntry:
+    """A cached value with its freshness deadlines (monotonic seconds)."""
+
+    __slots__ = ("value", "fresh_until", "stale_until")
+
+    def __init__(self, value: Any, fresh_until: float, stale_until: float):
+        self.value = value
+        self.fresh_until = fresh_until
+        self.stale_until = stale_until
+
+    def is_fresh(self, now: float) -> bool:
+        return now < self.fresh_until
+
+    def is_expired(self, now: float) -> bool:
+        return now >= self.stale_until
+
+
+class TTLCache:
+    """
+    Bounded LRU cache with a per-entry TTL and a stale-while-revalidate window.
+
+    Entries are fresh for ``ttl`` seconds. After that they may still be served
+    for another ``stale_ttl`` seconds while a single background refresh runs,
+    so repeat callers never wait on the upstream. A ``maxsize`` of 0 disables
+    caching entirely.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, stale_ttl: float = 0.0, name: str = "cache"):
+        """
+        Args:
+            maxsize: Maximum number of entries before the least recently used is evicted
+            ttl: Seconds an entry is considered fresh
+            stale_ttl: Extra seconds a stale entry may be served while refreshing
+            name: Name used in log messages
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.name = name
+        self._data: "OrderedDict[Hashable, CacheEntry]" = OrderedDict()
+        self._refreshing: Dict[Hashable, asyncio.Task] = {}
+        # Entries from a warm-start snapshot, restored on first use (see cache_snapshot)
+        self.warm_start: Optional[Any] = None
+
+        # Statistics
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.restored = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get_entry(key) is not None
+
+    def get_entry(self, key: Hashable, now: Optional[float] = None) -> Optional[CacheEntry]:
+        """
+        Look up an entry (fresh or stale) and mark it as recently used.
+
+        Args:
+            key: Cache key
+            now: Current monotonic time (defaults to time.monotonic())
+
+        Returns:
+            The entry, or None if missing or past its stale deadline
+        """
+        if now is None:
+            now = time.monotonic()
+        entry = self._lookup(key, now)
+        if entry is None:
+            return None
+        if entry.is_expired(now):
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return entry
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value (fresh or stale) or ``default``."""
+        entry = self.get_entry(key)
+        return entry.value if entry is not None else default
+
+    async def peek(self, key: Hashable) -> Any:
+        """Return the cached value (fresh or stale) or None, never loading it."""
+        return self.get(key)
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """
+        Store a value, evicting the least recently used entries if full.
+
+        Args:
+            key: Cache key
+            value: Value to store
+            ttl: Optional per-entry TTL overriding the cache default
+        """
+        if not self.enabled:
+            return
+        fresh_for = self.ttl if ttl is None else ttl
+        now = time.monotonic()
+        if self.warm_start is not None:
+            self.warm_start.discard(key)
+        self._store(key, CacheEntry(value, now + fresh_for, now + fresh_for + self.stale_ttl))
+
+    def _store(self, key: Hashable, entry: CacheEntry) -> None:
+        self._data[key] = entry
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def _lookup(self, key: Hashable, now: float) -> Optional[CacheEntry]:
+        """Return the stored entry, restoring it from the warm-start snapshot if needed."""
+        entry = self._data.get(key)
+        if entry is None and self.warm_start is not None:
+            restored = self.warm_start.take(key)
+            if restored is not None:
+                value, fresh_until, stale_until = restored
+                entry = CacheEntry(value, fresh_until, stale_until)
+                if entry.is_expired(now):
+                    return None
+                self._store(key, entry)
+                self.restored += 1
+        return entry
+
+    def items(self, now: Optional[float] = None) -> Iterator[Tuple[Hashable, CacheEntry]]:
+        """Yield the (key, entry) pairs that have not expired, least recently used first."""
+        if now is None:
+            now = time.monotonic()
+        for key, entry in list(self._data.items()):
+            if not entry.is_expired(now):
+                yield key, entry
+
+    def fresh_for(self, key: Hashable) -> Optional[float]:
+        """
+        Seconds until the entry for ``key`` goes stale.
+
+        Returns:
+            Remaining freshness (negative once stale), or None if not cached
+        """
+        now = time.monotonic()
+        entry = self._lookup(key, now)
+        if entry is None or entry.is_expired(now):
+            return None
+        return entry.fresh_until - now
+
+    def delete(self, key: Hashable) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    async def get_or_load(self, key: Hashable, loader: Loader) -> Any:
+        """
+        Return the cached value, loading it on a miss.
+
+        Fresh entries are returned directly. Stale entries are returned
+        immediately and refreshed in the background. Exceptions raised by
+        ``loader`` on a miss propagate and nothing is cached.
+
+        Args:
+            key: Cache key
+            loader: Zero-argument coroutine function producing the value
+
+        Returns:
+            The cached or freshly loaded value
+        """
+        if not self.enabled:
+            return await loader()
+
+        now = time.monotonic()
+        entry = self.get_entry(key, now)
+        if entry is not None:
+            if entry.is_fresh(now):
+                self.hits += 1
+            else:
+                self.stale_hits += 1
+                self._schedule_refresh(key, loader)
+            return entry.value
+
+        self.misses += 1
+        value = await loader()
+        self.set(key, value)
+        return value
+
+    async def refresh(self, key: Hashable, loader: Loader) -> Any:
+        """
+        Reload and store the value for ``key`` now, regardless of its freshness.
+
+        Args:
+            key: Cache key
+            loader: Zero-argument coroutine function producing the value
+
+        Returns:
+            The freshly loaded value
+        """
+        value = await loader()
+        self.set(key, value)
+        return value
+
+    def _schedule_refresh(self, key: Hashable, loader: Loader) -> None:
+        """Start a background refresh for ``key`` unless one is already running."""
+        if key in self._refreshing:
+            return
+        task = asyncio.create_task(self._refresh(key, loader))
+        self._refreshing[key] = task
+
+    async def _refresh(self, key: Hashable, loader: Loader) -> None:
+        in_background_refresh.set(True)
+        try:
+            value = await loader()
+            self.set(key, value)
+            logger.debug(f"♻️ {self.name}: refreshed stale entry {key!r}")
+        except Exception as e:
+            # Keep serving the stale value until it expires
+            logger.warning(f"⚠️ {self.name}: background refresh failed for {key!r}: {e}")
+        finally:
+            self._refreshing.pop(key, None)
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters and current size."""
+        return {
+            "size": len(self._data),
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "restored": self.restored,
+        }
@@ -0,0 +1,280 @@
+"""
+Warm-start snapshots of the in-process result caches.
+
+On shutdown, and periodically while running, the entries of each TTLCache
+are written to one compact file. Each record holds the namespace, the key,
+the wall-clock freshness and stale deadlines, and the value in the
+serialization payload format. The file is replaced atomically.
+
+On startup the file is memory-mapped and only the small record headers are
+read. The values stay on disk until a cache misses on their key. Restored
+entries keep their original deadlines: an entry that was fresh for two more
+minutes at shutdown is fresh for two more minutes minus the downtime, and
+entries that expired in between are never served.
+"""
+
+import asyncio
+import mmap
+import os
+import random
+import struct
+import time
+from typing import Any, Dict, Hashable, Iterator, List, Optional, Tuple
+
+from loguru import logger
+
+import serialization
+from cache import TTLCache
+from config import settings
+
+MAGIC = b"SCSNAP01"
+# Header and value lengths of one record
+_LENGTHS = struct.Struct(">II")
+
+# (header bytes, value payload) of one record
+Record = Tuple[bytes, bytes]
+
+
+def _key_from_json(key: Any) -> Hashable:
+    """Cache keys are tuples, which JSON stores as lists."""
+    return tuple(_key_from_json(k) for k in key) if isinstance(key, list) else key
+
+
+class SnapshotView:
+    """The not yet restored entries of one namespace in a snapshot file."""
+
+    def __init__(self, snapshot: "Snapshot", namespace: str):
+        self.snapshot = snapshot
+        self.namespace = namespace
+        # key -> (value offset, value length, fresh deadline, stale deadline, header bytes)
+        self._index: Dict[Hashable, Tuple[int, int, float, float, bytes]] = {}
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def take(self, key: Hashable) -> Optional[Tuple[Any, float, float]]:
+        """
+        Decode and remove the entry for ``key``.
+
+        Args:
+            key: Cache key
+
+        Returns:
+            (value, fresh_until, stale_until) with monotonic deadlines, or
+            None if the snapshot has no live entry for the key
+        """
+        item = self._index.pop(key, None)
+        if item is None:
+            return None
+        offset, length, fresh_wall, stale_wall, _ = item
+        now = time.time()
+        if stale_wall <= now:
+            return None
+        try:
+            value = serialization.unpack(self.snapshot.read(offset, length))
+        except ValueError as e:
+            logger.warning(f"⚠️ Cache snapshot: unreadable entry {key!r} in '{self.namespace}': {e}")
+            return None
+        self.snapshot.restored += 1
+        shift = time.monotonic() - now
+        return value, fresh_wall + shift, stale_wall + shift
+
+    def discard(self, key: Hashable) -> None:
+        """Forget the entry for ``key`` (the cache has stored a newer value)."""
+        self._index.pop(key, None)
+
+    def pending(self, now: float) -> Iterator[Record]:
+        """Raw records of entries not restored yet and not expired at wall time ``now``."""
+        for offset, length, _, stale_wall, header in list(self._index.values()):
+            if stale_wall > now:
+                yield header, self.snapshot.read(offset, length)
+
+
+class Snapshot:
+    """A memory-mapped snapshot file, indexed by record headers only."""
+
+    def __init__(self, path: str, data: mmap.mmap):
+        self.path = path
+        self._data = data
+        self.views: Dict[str, SnapshotView] = {}
+        self.restored = 0
+
+    @classmethod
+    def open(cls, path: str) -> Optional["Snapshot"]:
+        """
+        Map a snapshot file and index its live entries.
+
+        Args:
+            path: Snapshot file path
+
+        Returns:
+            The snapshot, or None if the file is missing, empty or not a snapshot
+        """
+        try:
+            with open(path, "rb") as f:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (FileNotFoundError, ValueError):  # ValueError: empty file
+            return None
+        except OSError as e:
+            logger.warning(f"⚠️ Cache snapshot: cannot open {path}: {e}")
+            return None
+        if data[:len(MAGIC)] != MAGIC:
+            logger.warning(f"⚠️ Cache snapshot: {path} is not a snapshot file, ignoring it")
+            data.close()
+            return None
+
+        snapshot = cls(path, data)
+        now = time.time()
+        live = expired = 0
+        offset = len(MAGIC)
+        try:
+            while offset < len(data):
+                header_len, value_len = _LENGTHS.unpack_from(data, offset)
+                offset += _LENGTHS.size
+                if offset + header_len + value_len > len(data):
+                    raise ValueError("record runs past the end of the file")
+                header = data[offset:offset + header_len]
+                namespace, key, fresh_wall, stale_wall = serialization.loads(header)
+                offset += header_len
+                if stale_wall > now:
+                    view = snapshot.views.get(namespace)
+                    if view is None:
+                        view = snapshot.views[namespace] = SnapshotView(snapshot, namespace)
+                    view._index[_key_from_json(key)] = (offset, value_len, fresh_wall, stale_wall, header)
+                    live += 1
+                else:
+                    expired += 1
+                offset += value_len
+        except (struct.error, ValueError) as e:
+            # Truncated or corrupt tail: keep the records indexed so far
+            logger.warning(f"⚠️ Cache snapshot: {path} is damaged after {live + expired} entries: {e}")
+
+        logger.info(f"💾 Cache snapshot: {live} entries available from {path} ({expired} expired)")
+        return snapshot
+
+    def read(self, offset: int, length: int) -> bytes:
+        return self._data[offset:offset + length]
+
+    def attach(self, caches: Dict[str, TTLCache]) -> None:
+        """Let each cache restore its namespace's entries on demand."""
+        for namespace, cache in caches.items():
+            view = self.views.get(namespace)
+            if view is not None and isinstance(cache, TTLCache) and cache.enabled:
+                cache.warm_start = view
+
+
+def _collect(caches: Dict[str, TTLCache]) -> List[Tuple[str, Hashable, Any, float, float]]:
+    """Live entries of all caches with wall-clock deadlines (runs on the event loop)."""
+    now_mono = time.monotonic()
+    shift = time.time() - now_mono
+    entries = []
+    for namespace, cache in caches.items():
+        for key, entry in cache.items(now_mono):
+            entries.append((namespace, key, entry.value, entry.fresh_until + shift, entry.stale_until + shift))
+    return entries
+
+
+def _write(path: str, entries: List[Tuple[str, Hashable, Any, float, float]], pending: List[Record]) -> int:
+    """Encode and atomically write a snapshot (runs in a worker thread)."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        for namespace, key, value, fresh_wall, stale_wall in entries:
+            header = serialization.dumps([namespace, key, fresh_wall, stale_wall])
+            payload = serialization.pack(value)
+            f.write(_LENGTHS.pack(len(header), len(payload)))
+            f.write(header)
+            f.write(payload)
+        for header, payload in pending:
+            f.write(_LENGTHS.pack(len(header), len(payload)))
+            f.write(header)
+            f.write(payload)
+    os.replace(tmp_path, path)
+    return len(entries) + len(pending)
+
+
+class CacheSnapshotter:
+    """Restores the result caches from a snapshot and writes new snapshots."""
+
+    def __init__(self, caches: Dict[str, Any], path: Optional[str] = None, interval: Optional[float] = None):
+        """
+        Args:
+            caches: Caches by namespace; only in-process TTLCaches are snapshotted
+            path: Snapshot file path (defaults to settings.cache_snapshot_path)
+            interval: Seconds between periodic snapshots (0 only snapshots on shutdown)
+        """
+        self.caches = {name: cache for name, cache in caches.items() if isinstance(cache, TTLCache)}
+        self.path = path or settings.cache_snapshot_path
+        self.interval = settings.cache_snapshot_interval if interval is None else interval
+        self.snapshot: Optional[Snapshot] = None
+        self._task: Optional[asyncio.Task] = None
+
+        # Statistics
+        self.saves = 0
+        self.last_saved_entries = 0
+
+    def load(self) -> None:
+        """Map the last snapshot and attach it to the caches for lazy restoring."""
+        self.snapshot = Snapshot.open(self.path)
+        if self.snapshot is not None:
+            self.snapshot.attach(self.caches)
+
+    async def save(self) -> int:
+        """
+        Write a snapshot of all live entries, including ones not restored yet.
+
+        Returns:
+            Number of entries written
+        """
+        if not self.caches:
+            return 0
+        entries = _collect(self.caches)
+        pending: List[Record] = []
+        if self.snapshot is not None:
+            now = time.time()
+            for namespace, view in self.snapshot.views.items():
+                if namespace in self.caches:
+                    pending.extend(view.pending(now))
+        count = await asyncio.to_thread(_write, self.path, entries, pending)
+        self.saves += 1
+        self.last_saved_entries = count
+        logger.info(f"💾 Cache snapshot: saved {count} entries to {self.path}")
+        return count
+
+    def start(self) -> None:
+        """Start periodic snapshots (no-op without an interval or if running)."""
+        if self.interval > 0 and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop periodic snapshots and write a final one."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            await self.save()
+        except Exception as e:
+            logger.warning(f"⚠️ Cache snapshot: final save failed: {e}")
+
+    async def _run(self) -> None:
+        while True:
+            # Jittered so several workers sharing a volume do not write at once
+            await asyncio.sleep(self.interval * random.uniform(0.9, 1.1))
+            try:
+                await self.save()
+            except Exception as e:
+                logger.warning(f"⚠️ Cache snapshot: periodic save failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "saves": self.saves,
+            "last_saved_entries": self.last_saved_entries,
+            "restored": self.snapshot.restored if self.snapshot is not None else 0,
+            "pending": sum(len(v) for v in self.snapshot.views.values()) if self.snapshot is not None else 0,
+        }
@@ -3,7 +3,7 @@ Configuration settings for the News API MCP Server.
 """
 
 import os
-from typing import Optional
+from typing import Dict, List, Optional
 from pydantic_settings import BaseSettings
 from dotenv import load_dotenv
 load_dotenv()
@@ -21,6 +21,148 @@ class Settings(BaseSettings):
     # API Settings
     timeout: float = 30.0
     
+    # Logging
+    log_mode: str = "verbose"  # "verbose" (emoji detail lines) or "structured" (one sampled line per request)
+    log_level: str = "INFO"  # Minimum level in structured mode
+    log_request_bodies: bool = False  # Log raw POST bodies (may contain user data)
+    log_sample_rates: Dict[str, float] = {}  # Per-route summary sampling, e.g. {"/api/v1/news/top": 0.1}
+    log_default_sample_rate: float = 1.0
+    
+    # Profiling (requests sent with an X-Profile header are sampled; off in production)
+    profiling_enabled: bool = False
+    profiling_token: str = ""  # If set, X-Profile must carry this value
+    profiling_interval: float = 0.001  # Seconds between stack samples
+    profiling_max_profiles: int = 20  # Profiles kept for download
+    loop_lag_monitor_enabled: bool = True
+    loop_lag_threshold: float = 0.1  # Seconds the event loop may be blocked before it is logged
+    loop_lag_interval: float = 0.05  # Heartbeat period
+    loop_lag_stack_depth: int = 15  # Innermost frames logged for a stall
+    
+    # HTTP connection pool (one long-lived client per upstream)
+    http_max_connections: int = 100
+    http_max_keepalive_connections: int = 20
+    http_keepalive_expiry: float = 30.0
+    http2_enabled: bool = False  # Requires the optional `h2` package
+    
+    # Per-upstream timeouts (seconds)
+    serpapi_timeout: float = 30.0
+    serpapi_connect_timeout: float = 5.0
+    librivox_timeout: float = 10.0
+    librivox_connect_timeout: float = 5.0
+    
+    # News result cache (full sorted result set per query)
+    news_cache_maxsize: int = 256  # 0 disables the cache
+    news_cache_ttl: float = 300.0
+    news_cache_stale_ttl: float = 900.0  # Served while a background refresh runs
+    news_response_cache_maxsize: int = 512  # Rendered responses reused while the cached result is unchanged
+    news_cursor_ttl: float = 3600.0  # Seconds a served result list stays pageable after its last page
+    news_cursor_store_maxsize: int = 1024  # Served result lists kept for paging (per worker without Redis)
+    news_cursor_secret: str = ""  # HMAC key of "more news" cursors, same on every worker (default: derived from SERPAPI_API_KEY, else random per process)
+    
+    # Query canonicalization (word order, case, filler words, country/category names)
+    news_query_canonicalize: bool = True
+    
+    # Near-duplicate story clustering (same event from several outlets)
+    news_dedup_enabled: bool = True
+    news_dedup_max_distance: int = 14  # Max differing SimHash bits (of 64) within one cluster, scaled down below 24 tokens
+    news_dedup_snippet_words: int = 8  # Snippet words fingerprinted along with the title
+    
+    # Positive-content filter (senior-friendly news)
+    news_filter_enabled: bool = True
+    news_filter_negative_terms: List[str] = []  # Added to the built-in negative lexicon
+    news_filter_positive_terms: List[str] = []  # Added to the built-in positive lexicon
+    news_filter_negative_weight: float = 2.0  # Score lost per negative match (a positive match adds 1)
+    news_filter_min_score: float = 0.0  # Articles scoring lower are dropped
+    
+    # Audiobook search cache (raw LibriVox results per title/genre)
+    audiobook_cache_maxsize: int = 256  # 0 disables the cache
+    audiobook_cache_ttl: float = 3600.0
+    audiobook_cache_stale_ttl: float = 86400.0
+    
+    # Audiobook playback manifests (chapters), prefetched for the top search results
+    audiobook_manifest_cache_maxsize: int = 512  # 0 disables the cache and prefetching
+    audiobook_manifest_ttl: float = 6 * 3600.0
+    audiobook_manifest_stale_ttl: float = 7 * 86400.0
+    audiobook_manifest_prefetch_count: int = 3  # Top results prefetched per search (0 disables)
+    
+    # Warm-start snapshot of the in-process news/audiobook caches
+    cache_snapshot_enabled: bool = True
+    cache_snapshot_path: str = "data/cache_snapshot.bin"
+    cache_snapshot_interval: float = 300.0  # Seconds between snapshots while running (0: only on shutdown)
+    
+    # Background prefetch of hot news queries
+    prefetch_enabled: bool = True
+    prefetch_top_n: int = 5  # Number of hottest queries kept warm
+    prefetch_interval: float = 60.0  # Seconds between prefetch cycles
+    prefetch_jitter: float = 0.2  # +/- fraction applied to the interval
+    prefetch_lead_time: float = 90.0  # Refresh when results go stale within this many seconds
+    prefetch_budget_per_hour: int = 60  # Max SerpAPI calls spent on prefetching per hour
+    prefetch_half_life: float = 3600.0  # Popularity decay half-life in seconds
+    prefetch_min_score: float = 1.5  # Minimum decayed request count to be prefetched
+    prefetch_max_tracked: int = 1000
+    prefetch_seed_queries: List[str] = []  # Always-hot queries, e.g. national headlines
+    
+    # Local LibriVox catalog index
+    librivox_catalog_enabled: bool = True
+    librivox_catalog_path: str = "data/librivox_catalog.db"
+    librivox_catalog_refresh_interval: float = 6 * 3600.0  # Incremental sync period
+    librivox_catalog_retry_interval: float = 30.0  # First retry of a failed full load (doubles up to the refresh interval)
+    librivox_catalog_page_size: int = 1000
+    librivox_catalog_max_results: int = 50
+    
+    # Genre matching for /search_audiobooks
+    genre_short_circuit: bool = True  # Answer unknown genres with suggestions, skipping LibriVox (after a full catalog sync)
+    genre_suggestion_limit: int = 3
+    
+    # Shared L2 cache tier
+    cache_backend: str = os.getenv("CACHE_BACKEND", "memory")  # "memory" (in-process only) or "redis"
+    redis_url: str = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+    redis_key_prefix: str = "social-companion"
+    redis_socket_timeout: float = 0.25
+    redis_retry_interval: float = 30.0  # Seconds to serve L1-only after a Redis failure
+    cache_l1_ttl: float = 15.0  # Local L1 freshness in front of Redis
+    
+    # Upstream resilience (latency budget, circuit breaker, hedging)
+    serpapi_budget: float = 6.0  # Seconds a SerpAPI call may take before giving up (0 disables)
+    librivox_budget: float = 4.0
+    breaker_failure_threshold: int = 5  # Consecutive failures that open the breaker (0 disables)
+    breaker_recovery_time: float = 30.0  # Seconds the breaker stays open before probing
+    serpapi_hedge_enabled: bool = False  # Hedged SerpAPI requests are billed as extra searches
+    librivox_hedge_enabled: bool = True
+    hedge_quantile: float = 0.95  # Latency quantile after which a hedged request is sent
+    hedge_min_delay: float = 0.1
+    hedge_min_samples: int = 20
+    resilience_last_good_maxsize: int = 256  # Last good results kept per upstream for fallback
+    
+    # SerpAPI quota scheduler (token bucket; disabled while no quota is set)
+    serpapi_quota_monthly: int = 0  # Searches per month in the SerpAPI plan
+    serpapi_quota_hourly: int = 0  # Searches per hour (the stricter quota wins)
+    serpapi_quota_burst: int = 10  # Bucket capacity
+    serpapi_quota_queue_size: int = 50  # Calls that may wait for a token
+    serpapi_quota_live_max_wait: float = 2.0  # Seconds a user request may wait for a token
+    serpapi_quota_background_max_wait: float = 0.0  # Prefetch/refresh never wait
+    serpapi_quota_live_reserve: int = 3  # Tokens background work leaves for user requests
+    
+    # Admission control: concurrent upstream calls, and how long others may queue for a slot
+    serpapi_max_concurrency: int = 8  # 0 disables admission control
+    librivox_max_concurrency: int = 8
+    librivox_manifest_max_concurrency: int = 2  # Chapter manifest lookups (mostly prefetches), apart from searches
+    upstream_queue_size: int = 32  # Calls that may wait for a slot, per upstream
+    upstream_queue_max_wait: float = 1.0  # Seconds a call may wait before it is shed
+    
+    # HTTP caching (ETag, Cache-Control, 304) and compression of API responses
+    http_caching_enabled: bool = True
+    http_compression_enabled: bool = True
+    http_compression_min_size: int = 1024  # Smaller bodies are sent uncompressed
+    http_gzip_level: int = 6
+    http_brotli_quality: int = 5  # Used when the optional brotli package is installed
+    http_compressed_cache_maxsize: int = 512  # Compressed bodies kept for reuse
+    
+    # Batch news endpoint
+    news_batch_max_queries: int = 10
+    news_batch_concurrency: int = 4  # Queries fetched at once per batch
+    news_batch_timeout: float = 10.0  # Shared deadline for a whole batch, in seconds
+    
     class Config:
         env_file = ".env"
         case_sensitive = False
@@ -0,0 +1,142 @@
+"""
+In-memory genre → book-id inverted index with fuzzy "closest genre" matching.
+
+The genre vocabulary is seeded with the LibriVox genres the agent is told to
+use and grows with every genre seen in LibriVox results. Unknown genres are
+matched against the vocabulary with a trigram index, so the agent gets ranked
+suggestions without another upstream call. The vocabulary only counts as
+``complete`` once the local catalog has finished a full sync; until then a
+genre missing from it may still exist on LibriVox.
+"""
+
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set
+
+from librivox_service import LibriVoxService
+
+# LibriVox genres listed in the ElevenLabs agent prompt
+LIBRIVOX_GENRES = [
+    "Action & Adventure", "Animals & Nature", "Myths, Legends & Fairy Tales", "Family", "General",
+    "Historical", "Poetry", "Religion", "School", "Short works", "Arts", "Reference", "Science",
+    "History", "Biography", "Detective Fiction", "Horror & Supernatural Fiction", "Gothic Fiction",
+    "Science Fiction", "Fantasy Fiction", "Published before 1800", "Published 1800–1900",
+    "Published 1900 onward", "Comedy", "Satire", "Drama", "Tragedy", "Romance", "Anthologies",
+    "Single author", "Ballads", "Elegies & Odes", "Epics", "Free Verse", "Lyric", "Narratives",
+    "Sonnets", "Multi-version (Weekly and Fortnightly poetry)", "Christian Fiction",
+    "Single Author Collections", "War & Military", "Animals", "Art, Design & Architecture",
+    "American Standard Version", "World English Bible", "King James Version",
+    "Weymouth New Testament", "Douay-Rheims Version", "Young’s Literal Translation", "Memoirs",
+    "Business & Economics", "Crafts & Hobbies", "Language learning", "Essays & Short Works",
+    "Family & Relationships", "Health & Fitness", "Antiquity", "Middle Ages/Middle History",
+    "Early Modern", "Modern (19th C)", "Modern (20th C)", "Cooking", "Gardening", "Humor", "Law",
+    "Essays", "Short non-fiction", "Letters", "Literary Criticism", "Mathematics", "Medical", "Music",
+    "Nature", "Performing Arts", "Ancient", "Medieval", "Modern", "Contemporary",
+    "Atheism & Agnosticism", "Political Science", "Psychology", "Christianity - Commentary",
+    "Christianity - Biographies", "Christianity - Other", "Other religions",
+    "Astronomy, Physics & Mechanics", "Chemistry", "Earth Sciences", "Life Sciences", "Self-Help",
+    "Social Science (Culture & Anthropology)", "Games", "Transportation", "Exploration", "True Crime",
+    "Writing & Linguistics", "Asian Antiquity",
+]
+
+_IGNORED_GENRES = {"unknown genre"}
+
+
+def _trigrams(text: str) -> Set[str]:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class GenreIndex:
+    """Inverted index from genre to LibriVox book ids, with fuzzy genre lookup."""
+
+    def __init__(self, seed: Iterable[str] = LIBRIVOX_GENRES):
+        """
+        Args:
+            seed: Genre names known to exist before any book has been indexed
+        """
+        self._names: Dict[str, str] = {}
+        self._books: Dict[str, Set[str]] = defaultdict(set)
+        self._grams: Dict[str, Set[str]] = {}
+        self._postings: Dict[str, Set[str]] = defaultdict(set)
+        # Set once every LibriVox genre has been indexed (full catalog sync)
+        self.complete = False
+        for name in seed:
+            self._add_genre(name)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def _add_genre(self, name: str) -> Optional[str]:
+        key = LibriVoxService.normalize_term(name)
+        if not key or key in _IGNORED_GENRES:
+            return None
+        if key not in self._names:
+            self._names[key] = name
+            grams = _trigrams(key)
+            self._grams[key] = grams
+            for gram in grams:
+                self._postings[gram].add(key)
+        return key
+
+    def add_books(self, books: Iterable[Dict]) -> None:
+        """
+        Index converted book records (as returned by LibriVoxService.convert_book_format).
+
+        Args:
+            books: Records with 'id' and 'genres'
+        """
+        for book in books:
+            book_id = book.get("id")
+            for name in book.get("genres", []):
+                key = self._add_genre(name)
+                if key is not None and book_id is not None:
+                    self._books[key].add(str(book_id))
+
+    def contains(self, genre: str) -> bool:
+        """Return True if ``genre`` is a known genre (case-insensitive)."""
+        return LibriVoxService.normalize_term(genre) in self._names
+
+    def is_plausible(self, genre: str) -> bool:
+        """Return True if ``genre`` is known or part of a known genre name."""
+        key = LibriVoxService.normalize_term(genre)
+        if key in self._names:
+            return True
+        return any(key in known for known in self._names)
+
+    def book_ids(self, genre: str) -> Set[str]:
+        """Return the ids of indexed books in ``genre``."""
+        return self._books.get(LibriVoxService.normalize_term(genre), set())
+
+    def suggest(self, genre: str, limit: int = 3) -> List[str]:
+        """
+        Return the known genres closest to ``genre`` (excluding ``genre`` itself), best first.
+
+        Candidates share at least one trigram with the query and are ranked by
+        the Dice coefficient of their trigram sets, then by how many indexed
+        books they contain.
+
+        Args:
+            genre: Requested genre name
+            limit: Maximum number of suggestions
+
+        Returns:
+            Genre names as LibriVox spells them
+        """
+        key = LibriVoxService.normalize_term(genre)
+        if not key:
+            return []
+        query = _trigrams(key)
+        shared: Dict[str, int] = defaultdict(int)
+        for gram in query:
+            for candidate in self._postings.get(gram, ()):
+                if candidate != key:
+                    shared[candidate] += 1
+        if not shared:
+            return []
+
+        def score(candidate: str):
+            dice = 2.0 * shared[candidate] / (len(query) + len(self._grams[candidate]))
+            return (dice, len(self._books.get(candidate, ())))
+
+        ranked = sorted(shared, key=score, reverse=True)
+        return [self._names[candidate] for candidate in ranked[:limit]]
@@ -0,0 +1,198 @@
+"""
+HTTP caching and compression of rendered API responses.
+
+Responses get a strong ``ETag`` (a hash of the body) and a
+``Cache-Control: max-age`` equal to the remaining freshness of the
+server-side cache entry they came from. A GET whose ``If-None-Match``
+matches is answered with ``304 Not Modified`` and no body.
+
+Bodies of at least ``min_size`` bytes are compressed with brotli (when the
+optional ``brotli`` package is installed and the client accepts it) or
+gzip. Compressed bodies are kept in a small LRU keyed by ETag and encoding,
+so a hot response is compressed once, not once per request. Each encoding
+gets its own ETag ("<hash>-gzip"), as a strong validator must differ
+between representations.
+"""
+
+import gzip
+import hashlib
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+from config import settings
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+# Encodings in order of preference
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def compute_etag(body: bytes) -> str:
+    """
+    Strong ETag of a response body.
+
+    Args:
+        body: Encoded response body, or any bytes that identify it
+
+    Returns:
+        Quoted entity tag
+    """
+    return f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+def _encoded_etag(etag: str, encoding: Optional[str]) -> str:
+    return f'{etag[:-1]}-{encoding}"' if encoding else etag
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Return True if an If-None-Match header matches ``etag`` in any encoding.
+
+    Args:
+        if_none_match: Header value (a list of entity tags, or "*")
+        etag: Identity-encoding ETag of the current response
+
+    Returns:
+        True if the client's copy is current
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison, so a W/ prefix is ignored
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return any(_encoded_etag(etag, encoding) in candidates for encoding in (None, "br", "gzip"))
+
+
+def choose_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """
+    Pick the preferred supported encoding the client accepts.
+
+    Args:
+        accept_encoding: Accept-Encoding header value
+
+    Returns:
+        "br", "gzip", or None for an uncompressed response
+    """
+    if not accept_encoding:
+        return None
+    accepted: Dict[str, float] = {}
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[coding.strip()] = q
+    for encoding in ENCODINGS:
+        if accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """Compress a body with "br" or "gzip"."""
+    if encoding == "br":
+        return brotli.compress(body, quality=settings.http_brotli_quality)
+    return gzip.compress(body, compresslevel=settings.http_gzip_level, mtime=0)
+
+
+class CompressedBodies:
+    """LRU of compressed response bodies by (ETag, encoding)."""
+
+    def __init__(self, maxsize: Optional[int] = None):
+        """
+        Args:
+            maxsize: Compressed bodies kept (defaults to settings.http_compressed_cache_maxsize)
+        """
+        self.maxsize = settings.http_compressed_cache_maxsize if maxsize is None else maxsize
+        self._data: "OrderedDict[Tuple[str, str], bytes]" = OrderedDict()
+
+        # Statistics
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, etag: str, encoding: str, body: bytes) -> bytes:
+        """
+        Return ``body`` compressed with ``encoding``, compressing it on a miss.
+
+        Args:
+            etag: ETag of ``body``
+            encoding: "br" or "gzip"
+            body: Uncompressed body
+
+        Returns:
+            Compressed body
+        """
+        key = (etag, encoding)
+        compressed = self._data.get(key)
+        if compressed is not None:
+            self.hits += 1
+            self._data.move_to_end(key)
+            return compressed
+        self.misses += 1
+        compressed = compress(body, encoding)
+        if self.maxsize > 0:
+            self._data[key] = compressed
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return compressed
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, int]:
+        return {"size": len(self._data), "hits": self.hits, "misses": self.misses}
+
+
+compressed_bodies = CompressedBodies()
+
+
+def cached_response(
+    request: Request,
+    body: bytes,
+    max_age: Optional[float],
+    etag: Optional[str] = None,
+    media_type: str = "application/json",
+) -> Response:
+    """
+    Build a response with validators, freshness and content negotiation.
+
+    Args:
+        request: Incoming request (method, If-None-Match, Accept-Encoding)
+        body: Uncompressed response body
+        max_age: Seconds clients may reuse the response (None or <= 0: revalidate every time)
+        etag: Precomputed ETag of ``body`` (computed when omitted)
+        media_type: Response media type
+
+    Returns:
+        200 response (compressed when worthwhile) or 304 Not Modified
+    """
+    if etag is None:
+        etag = compute_etag(body)
+    headers = {"Vary": "Accept-Encoding"}
+
+    encoding = None
+    if settings.http_compression_enabled and len(body) >= settings.http_compression_min_size:
+        encoding = choose_encoding(request.headers.get("accept-encoding"))
+
+    if settings.http_caching_enabled:
+        seconds = int(max_age) if max_age and max_age > 0 else 0
+        headers["Cache-Control"] = f"public, max-age={seconds}" if seconds else "no-cache"
+        headers["ETag"] = _encoded_etag(etag, encoding)
+        if request.method in ("GET", "HEAD") and etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+
+    if encoding is not None:
+        body = compressed_bodies.get(etag, encoding, body)
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type=media_type, headers=headers)
@@ -0,0 +1,84 @@
+"""
+Shared, long-lived HTTP clients for upstream APIs (SerpAPI, LibriVox).
+
+Each upstream gets its own pooled ``httpx.AsyncClient`` so TCP/TLS
+connections are reused across requests instead of being re-established on
+every voice turn. The clients are created and closed by the FastAPI lifespan.
+"""
+
+import importlib.util
+from typing import Optional
+
+import httpx
+from loguru import logger
+
+from config import settings
+
+
+def _http2_available() -> bool:
+    """Return True if the optional `h2` package needed for HTTP/2 is installed."""
+    return importlib.util.find_spec("h2") is not None
+
+
+def build_client(
+    timeout: float,
+    connect_timeout: float,
+    transport: Optional[httpx.AsyncBaseTransport] = None,
+) -> httpx.AsyncClient:
+    """
+    Build a pooled async client using the connection settings from config.
+
+    Args:
+        timeout: Default read/write/pool timeout in seconds
+        connect_timeout: Connection timeout in seconds
+        transport: Optional transport override (e.g. httpx.MockTransport in tests)
+
+    Returns:
+        Configured httpx.AsyncClient
+    """
+    http2 = settings.http2_enabled
+    if http2 and not _http2_available():
+        logger.warning("⚠️ HTTP/2 enabled but the 'h2' package is not installed, falling back to HTTP/1.1")
+        http2 = False
+
+    limits = httpx.Limits(
+        max_connections=settings.http_max_connections,
+        max_keepalive_connections=settings.http_max_keepalive_connections,
+        keepalive_expiry=settings.http_keepalive_expiry,
+    )
+
+    return httpx.AsyncClient(
+        timeout=httpx.Timeout(timeout, connect=connect_timeout),
+        limits=limits,
+        http2=http2,
+        transport=transport,
+    )
+
+
+class UpstreamClients:
+    """Holder for the per-upstream pooled clients."""
+
+    def __init__(self):
+        self.serpapi: Optional[httpx.AsyncClient] = None
+        self.librivox: Optional[httpx.AsyncClient] = None
+
+    def start(self) -> None:
+        """Create the pooled clients (idempotent)."""
+        if self.serpapi is None:
+            self.serpapi = build_client(settings.serpapi_timeout, settings.serpapi_connect_timeout)
+        if self.librivox is None:
+            self.librivox = build_client(settings.librivox_timeout, settings.librivox_connect_timeout)
+        logger.info(
+            f"🔌 Upstream connection pools ready "
+            f"(max_connections={settings.http_max_connections}, "
+            f"keepalive={settings.http_max_keepalive_connections}, http2={settings.http2_enabled})"
+        )
+
+    async def aclose(self) -> None:
+        """Close the pooled clients and release their connections."""
+        for client in (self.serpapi, self.librivox):
+            if client is not None:
+                await client.aclose()
+        self.serpapi = None
+        self.librivox = None
+        logger.info("🔌 Upstream connection pools closed")
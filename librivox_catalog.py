@@ -0,0 +1,316 @@
+"""
+Local indexed LibriVox catalog backed by SQLite FTS5.
+
+Book metadata (id, title, authors, genres) is bulk-ingested from the LibriVox
+API and refreshed incrementally on a schedule, so title and genre searches are
+answered locally in milliseconds. Callers fall back to the live API only when
+the index has no match, or while the first full load is still running (a
+partial index would answer with partial results).
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import List, Dict, Any, Optional
+
+from loguru import logger
+from config import settings
+from librivox_service import LibriVoxService
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS books (
+    id INTEGER PRIMARY KEY,
+    title TEXT NOT NULL,
+    record TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS book_genres (
+    genre TEXT NOT NULL,
+    book_id INTEGER NOT NULL,
+    PRIMARY KEY (genre, book_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+class LibriVoxCatalog:
+    """SQLite-backed full-text index of LibriVox book metadata."""
+
+    def __init__(self, service: LibriVoxService, path: Optional[str] = None, genre_index: Optional[Any] = None):
+        """
+        Args:
+            service: LibriVox service used to ingest pages and normalize records
+            path: SQLite database path (":memory:" for an in-memory index)
+            genre_index: Optional GenreIndex kept in sync with ingested books
+        """
+        self.service = service
+        self.genre_index = genre_index
+        self.path = path or settings.librivox_catalog_path
+        self.max_results = settings.librivox_catalog_max_results
+        # Serializes use of the connection; only taken in worker threads
+        # (asyncio.to_thread), so a long upsert never blocks the event loop
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        # Books in the index, as of the last upsert
+        self._size = 0
+        self._fts = False
+        # True once a full sync has finished (meta.last_sync is set)
+        self._synced = False
+        self._task: Optional[asyncio.Task] = None
+
+        # Statistics
+        self.hits = 0
+        self.misses = 0
+
+    def open(self) -> None:
+        """Open (and create if needed) the catalog database."""
+        if self._conn is not None:
+            return
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        try:
+            conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS books_fts "
+                "USING fts5(title, tokenize='unicode61 remove_diacritics 2')"
+            )
+            self._fts = True
+        except sqlite3.OperationalError:
+            logger.warning("⚠️ SQLite FTS5 not available, catalog title search will use LIKE")
+        conn.commit()
+        # No other thread can use the connection before it is published
+        self._synced = conn.execute("SELECT 1 FROM meta WHERE key = 'last_sync'").fetchone() is not None
+        self._size = conn.execute("SELECT COUNT(*) FROM books").fetchone()[0]
+        self._conn = conn
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+            self._synced = False
+            self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    # ------------------------------------------------------------------
+    # Search
+    # ------------------------------------------------------------------
+
+    async def search(self, title: Optional[str] = None, genre: Optional[str] = None) -> Optional[List[Dict[str, Any]]]:
+        """
+        Search the local index by title and/or genre.
+
+        Args:
+            title: Book title to search for
+            genre: Genre name to search for
+
+        Returns:
+            Converted book records, or None on an index miss or before the
+            first full sync has finished
+        """
+        if self._conn is None or not self._synced:
+            return None
+        results = await asyncio.to_thread(self._search, title, genre)
+        if results:
+            self.hits += 1
+            return results
+        self.misses += 1
+        return None
+
+    def _search(self, title: Optional[str], genre: Optional[str]) -> List[Dict[str, Any]]:
+        clauses = []
+        args: List[Any] = []
+        if title:
+            if self._fts:
+                clauses.append("b.id IN (SELECT rowid FROM books_fts WHERE books_fts MATCH ?)")
+                args.append(self._fts_query(title))
+            else:
+                clauses.append("b.title LIKE ?")
+                args.append(f"%{title}%")
+        if genre:
+            clauses.append("b.id IN (SELECT book_id FROM book_genres WHERE genre = ?)")
+            args.append(LibriVoxService.normalize_term(genre))
+        if not clauses:
+            return []
+
+        sql = f"SELECT b.record FROM books b WHERE {' AND '.join(clauses)} ORDER BY b.id LIMIT ?"
+        args.append(self.max_results)
+        with self._lock:
+            try:
+                rows = self._conn.execute(sql, args).fetchall()
+            except sqlite3.OperationalError as e:
+                logger.warning(f"⚠️ Catalog search failed: {e}")
+                return []
+        return [json.loads(row[0]) for row in rows]
+
+    @staticmethod
+    def _fts_query(title: str) -> str:
+        """Build an FTS5 query requiring every title token (as a quoted prefix)."""
+        tokens = [t.replace('"', "") for t in title.split()]
+        return " ".join(f'"{t}"*' for t in tokens if t)
+
+    # ------------------------------------------------------------------
+    # Ingest
+    # ------------------------------------------------------------------
+
+    async def sync(self) -> int:
+        """
+        Ingest LibriVox metadata: a full load when the index is empty, otherwise
+        only the books cataloged since the previous sync. A full load that
+        failed partway resumes after the last page it ingested.
+
+        Returns:
+            Number of books ingested
+        """
+        self.open()
+        last_sync = await asyncio.to_thread(self._get_meta, "last_sync")
+        since = int(float(last_sync)) if last_sync and len(self) else None
+        started = time.time()
+        page_size = settings.librivox_catalog_page_size
+
+        total = 0
+        offset = 0
+        if since is None:
+            resume = await asyncio.to_thread(self._get_meta, "full_sync_offset")
+            if resume is not None:
+                offset = int(resume)
+                started = float(await asyncio.to_thread(self._get_meta, "full_sync_started") or started)
+                logger.info(f"📚 Resuming LibriVox catalog full sync at offset {offset}")
+            else:
+                await asyncio.to_thread(self._set_meta, "full_sync_started", str(started))
+        while True:
+            books = await self.service.fetch_catalog_page(offset=offset, limit=page_size, since=since)
+            if not books:
+                break
+            records = [self.service.convert_book_format(book) for book in books]
+            await asyncio.to_thread(self._upsert, records)
+            if self.genre_index is not None:
+                self.genre_index.add_books(records)
+            total += len(records)
+            offset += len(books)
+            if since is None:
+                await asyncio.to_thread(self._set_meta, "full_sync_offset", str(offset))
+            if len(books) < page_size:
+                break
+
+        await asyncio.to_thread(self._finish_sync, started)
+        self._synced = True
+        if self.genre_index is not None:
+            self.genre_index.complete = True
+        mode = "incremental" if since else "full"
+        logger.info(f"📚 LibriVox catalog {mode} sync ingested {total} books ({len(self)} indexed)")
+        return total
+
+    def _upsert(self, records: List[Dict[str, Any]]) -> None:
+        with self._lock:
+            conn = self._conn
+            with conn:
+                for record in records:
+                    try:
+                        book_id = int(record["id"])
+                    except (TypeError, ValueError, KeyError):
+                        continue
+                    title = record.get("title") or ""
+                    conn.execute(
+                        "INSERT OR REPLACE INTO books (id, title, record) VALUES (?, ?, ?)",
+                        (book_id, title, json.dumps(record, ensure_ascii=False)),
+                    )
+                    conn.execute("DELETE FROM book_genres WHERE book_id = ?", (book_id,))
+                    conn.executemany(
+                        "INSERT OR IGNORE INTO book_genres (genre, book_id) VALUES (?, ?)",
+                        [(LibriVoxService.normalize_term(g), book_id) for g in record.get("genres", [])],
+                    )
+                    if self._fts:
+                        conn.execute("DELETE FROM books_fts WHERE rowid = ?", (book_id,))
+                        conn.execute("INSERT INTO books_fts (rowid, title) VALUES (?, ?)", (book_id, title))
+            self._size = conn.execute("SELECT COUNT(*) FROM books").fetchone()[0]
+
+    async def load_genre_index(self) -> None:
+        """Populate the genre index from books already in the catalog."""
+        if self.genre_index is None or self._conn is None:
+            return
+        records = await asyncio.to_thread(self._all_records)
+        self.genre_index.add_books(records)
+        # Books left by an interrupted first sync are not the whole catalog
+        if self._synced:
+            self.genre_index.complete = True
+        logger.info(f"🏷️ Genre index loaded with {len(self.genre_index)} genres from {len(records)} books")
+
+    def _all_records(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute("SELECT record FROM books").fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def _get_meta(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key: str, value: str) -> None:
+        with self._lock:
+            with self._conn:
+                self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def _finish_sync(self, started: float) -> None:
+        """Record a finished sync and drop the progress of a full one, in one transaction."""
+        with self._lock:
+            with self._conn:
+                self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('last_sync', ?)", (str(started),))
+                self._conn.execute("DELETE FROM meta WHERE key IN ('full_sync_offset', 'full_sync_started')")
+
+    # ------------------------------------------------------------------
+    # Scheduling
+    # ------------------------------------------------------------------
+
+    def start(self) -> None:
+        """Open the index and start the periodic background sync."""
+        self.open()
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the background sync and close the index."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.close()
+
+    async def _run(self) -> None:
+        try:
+            await self.load_genre_index()
+        except Exception as e:
+            logger.error(f"❌ Failed to load genre index from catalog: {e}")
+        refresh = settings.librivox_catalog_refresh_interval
+        retry = settings.librivox_catalog_retry_interval
+        while True:
+            delay = refresh
+            try:
+                await self.sync()
+                retry = settings.librivox_catalog_retry_interval
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ LibriVox catalog sync failed: {e}")
+                if not self._synced:
+                    # Searches go live until the first full load finishes:
+                    # retry it soon, backing off up to the refresh interval
+                    delay = retry
+                    retry = min(retry * 2, refresh)
+                    logger.info(f"📚 Retrying LibriVox catalog full sync in {delay:.0f}s")
+            await asyncio.sleep(delay)
+
+    def stats(self) -> Dict[str, int]:
+        return {"size": len(self), "hits": self.hits, "misses": self.misses}
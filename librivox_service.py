@@ -0,0 +1,287 @@
+"""
+LibriVox service for searching free public-domain audiobooks.
+"""
+
+import urllib.parse
+from typing import List, Dict, Any, Optional
+
+import httpx
+from loguru import logger
+from config import settings
+from cache import TTLCache
+from single_flight import SingleFlight
+from admission import AdmissionController
+from metrics import timed_upstream
+from resilience import ResilientCaller, UpstreamUnavailable
+
+
+class LibriVoxService:
+    """Service for interacting with the LibriVox audiobook API."""
+
+    def __init__(self, client: Optional[httpx.AsyncClient] = None, cache: Optional[Any] = None):
+        """
+        Args:
+            client: Shared pooled client. When omitted a short-lived client is
+                created per request (e.g. when used outside the app lifespan).
+            cache: Result cache (TTLCache or TieredCache). Defaults to an
+                in-process TTLCache sized from settings.
+        """
+        self.api_url = settings.librivox_api
+        self.timeout = settings.librivox_timeout
+        self.client = client
+        self.cache = cache if cache is not None else TTLCache(
+            maxsize=settings.audiobook_cache_maxsize,
+            ttl=settings.audiobook_cache_ttl,
+            stale_ttl=settings.audiobook_cache_stale_ttl,
+            name="audiobook-cache",
+        )
+        self.single_flight = SingleFlight(name="librivox")
+        self.resilience = ResilientCaller(
+            "librivox",
+            budget=settings.librivox_budget,
+            failure_threshold=settings.breaker_failure_threshold,
+            recovery_time=settings.breaker_recovery_time,
+            hedge=settings.librivox_hedge_enabled,
+            hedge_quantile=settings.hedge_quantile,
+            hedge_min_delay=settings.hedge_min_delay,
+            hedge_min_samples=settings.hedge_min_samples,
+            last_good_maxsize=settings.resilience_last_good_maxsize,
+        )
+        self.admission = AdmissionController(
+            "librivox",
+            max_concurrency=settings.librivox_max_concurrency,
+            queue_size=settings.upstream_queue_size,
+            max_wait=settings.upstream_queue_max_wait,
+        )
+        # Manifest lookups are mostly background prefetches: they get their own
+        # coalescing, slots and breaker, so they never crowd out, trip or join
+        # searches, and no hedging or last-good results
+        self.manifest_flight = SingleFlight(name="librivox-manifests")
+        self.manifest_resilience = ResilientCaller(
+            "librivox-manifests",
+            budget=settings.librivox_budget,
+            failure_threshold=settings.breaker_failure_threshold,
+            recovery_time=settings.breaker_recovery_time,
+            last_good_maxsize=0,
+        )
+        self.manifest_admission = AdmissionController(
+            "librivox-manifests",
+            max_concurrency=settings.librivox_manifest_max_concurrency,
+            queue_size=settings.upstream_queue_size,
+            max_wait=settings.upstream_queue_max_wait,
+        )
+
+    def build_search_url(self, title: Optional[str] = None, genre: Optional[str] = None) -> str:
+        """
+        Build the LibriVox search URL for a title and/or genre.
+
+        Args:
+            title: Book title to search for
+            genre: Genre name to search for
+
+        Returns:
+            Fully-qualified LibriVox API URL
+        """
+        api_url = self.api_url
+        if title:
+            api_url += f"&title={urllib.parse.quote(title)}"
+        if genre:
+            api_url += f"&genre={urllib.parse.quote(genre)}"
+        return api_url
+
+    async def fetch_books(self, title: Optional[str] = None, genre: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Fetch raw book records from LibriVox.
+
+        Results are cached per normalized title/genre, and concurrent calls
+        for the same search share one upstream request. While LibriVox is
+        unavailable (circuit breaker open, latency budget exceeded or too many
+        searches in flight) the last good result for the same search is
+        returned if there is one.
+
+        Args:
+            title: Book title to search for
+            genre: Genre name to search for
+
+        Returns:
+            List of raw LibriVox book records
+
+        Raises:
+            httpx.HTTPError: If the request fails or LibriVox returns an error status
+            UpstreamUnavailable: If LibriVox is unavailable and nothing was cached for the search
+        """
+        api_url = self.build_search_url(title=title, genre=genre)
+        key = (self.normalize_term(title), self.normalize_term(genre))
+        try:
+            return await self.cache.get_or_load(
+                key,
+                lambda: self.single_flight.do(key, lambda: self.resilience.call(key, lambda: self._fetch(api_url)))
+            )
+        except UpstreamUnavailable as e:
+            books = self.resilience.last_good(key)
+            if books is None:
+                raise
+            logger.warning(f"⚠️ LibriVox unavailable ({e}), serving last good result for {key!r}")
+            return books
+
+    def cache_fresh_for(self, title: Optional[str] = None, genre: Optional[str] = None) -> Optional[float]:
+        """
+        Seconds until the cached results for a search go stale.
+
+        Args:
+            title: Book title searched for
+            genre: Genre name searched for
+
+        Returns:
+            Remaining freshness (negative once stale), or None if not cached
+        """
+        return self.cache.fresh_for((self.normalize_term(title), self.normalize_term(genre)))
+
+    async def fetch_manifest(self, book_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Fetch a book's chapters for playback.
+
+        Concurrent calls for the same book share one upstream request.
+        Manifest lookups are coalesced and run under their own admission
+        slots and circuit breaker, apart from searches.
+
+        Args:
+            book_id: LibriVox book id
+
+        Returns:
+            Playback manifest (see convert_manifest_format), or None if LibriVox has no such book
+
+        Raises:
+            httpx.HTTPError: If the request fails or LibriVox returns an error status
+            UpstreamUnavailable: If LibriVox is unavailable
+        """
+        api_url = self.api_url + f"&id={urllib.parse.quote(book_id)}&extended=1"
+        key = ("manifest", book_id)
+        books = await self.manifest_flight.do(
+            key,
+            lambda: self.manifest_resilience.call(key, lambda: self._fetch(api_url, self.manifest_admission))
+        )
+        if not books:
+            return None
+        return self.convert_manifest_format(books[0])
+
+    async def fetch_catalog_page(self, offset: int, limit: int, since: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Fetch one page of book metadata for bulk catalog ingest.
+
+        Args:
+            offset: Number of records to skip
+            limit: Page size
+            since: Only return books cataloged after this UNIX timestamp
+
+        Returns:
+            List of raw LibriVox book records (empty past the last page)
+        """
+        api_url = self.api_url + f"&offset={offset}&limit={limit}&fields={urllib.parse.quote('{id,title,authors,genres}')}"
+        if since:
+            api_url += f"&since={since}"
+        response = await self._request(api_url)
+        if response.status_code == 404:
+            # LibriVox answers 404 when a page has no books
+            return []
+        response.raise_for_status()
+        return response.json().get("books", []) or []
+
+    async def _fetch(self, api_url: str, admission: Optional[AdmissionController] = None) -> List[Dict[str, Any]]:
+        async with (admission or self.admission).slot():
+            response = await self._request(api_url)
+        if response.status_code == 404:
+            # LibriVox answers 404 when nothing matches (or the id is unknown)
+            return []
+        response.raise_for_status()
+        data = response.json()
+        return data.get("books", []) or []
+
+    @staticmethod
+    def normalize_term(term: Optional[str]) -> str:
+        """Normalize a search term for use in cache/coalescing keys (LibriVox matching is case-insensitive)."""
+        return " ".join(term.split()).casefold() if term else ""
+
+    async def _request(self, api_url: str) -> httpx.Response:
+        """
+        Send a GET request, reusing the shared pooled client when available.
+
+        Args:
+            api_url: Fully-qualified LibriVox API URL
+
+        Returns:
+            Raw HTTP response
+        """
+        if self.client is not None:
+            return await timed_upstream("librivox", self.client.get(api_url))
+
+        logger.debug("LibriVox client not initialised, using a short-lived client")
+        async with httpx.AsyncClient(timeout=self.timeout) as client:
+            return await timed_upstream("librivox", client.get(api_url))
+
+    @staticmethod
+    def convert_manifest_format(book: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Convert an extended LibriVox book record to a playback manifest.
+
+        Args:
+            book: Book record from LibriVox, requested with extended=1
+
+        Returns:
+            Book id, title and authors, chapters in order with audio URL and
+            duration, total duration, and the RSS feed and zip download URLs
+        """
+        chapters = []
+        for section in sorted(book.get("sections") or [], key=lambda s: int(s.get("section_number") or 0)):
+            if not section.get("listen_url"):
+                continue
+            readers = [r.get("display_name") for r in section.get("readers") or [] if r.get("display_name")]
+            chapters.append({
+                "number": int(section.get("section_number") or len(chapters) + 1),
+                "title": section.get("title") or f"Chapter {len(chapters) + 1}",
+                "url": section["listen_url"],
+                "duration_seconds": int(section.get("playtime") or 0),
+                "readers": readers,
+            })
+
+        return {
+            "id": book.get("id"),
+            "title": book.get("title"),
+            "authors": LibriVoxService.convert_book_format(book)["authors"],
+            "language": book.get("language"),
+            "total_seconds": int(book.get("totaltimesecs") or 0) or sum(c["duration_seconds"] for c in chapters),
+            "chapters": chapters,
+            "rss_url": book.get("url_rss"),
+            "zip_url": book.get("url_zip_file"),
+        }
+
+    @staticmethod
+    def convert_book_format(book: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Convert a LibriVox book record to our expected format.
+
+        Args:
+            book: Book record from LibriVox
+
+        Returns:
+            Book with id, title, authors and genres
+        """
+        authors = []
+        for a in book.get("authors", []):
+            if "name" in a:
+                authors.append(a["name"])
+            else:
+                full_name = f"{a.get('first_name', '')} {a.get('last_name', '')}".strip()
+                if full_name:
+                    authors.append(full_name)
+        if not authors:
+            authors = ["Unknown Author"]
+
+        genres_list = [g.get("name", "Unknown Genre") for g in book.get("genres", [])] or ["Unknown Genre"]
+
+        return {
+            "id": book.get("id"),
+            "title": book.get("title"),
+            "authors": authors,
+            "genres": genres_list,
+        }
@@ -0,0 +1,126 @@
+"""
+Logging setup built on loguru, with a low-overhead structured mode.
+
+Two modes are available through ``settings.log_mode``:
+
+- ``verbose`` (default): the existing human-readable emoji log lines,
+  including per-request detail such as every returned story.
+- ``structured``: per-request detail lines are gated out before they are
+  formatted, and each request is summarized in one sampled logfmt line
+  with its route, status and latency.
+
+Hot-path detail lines are logged at the custom ``DETAIL`` level with
+brace-style arguments, so in structured mode they cost a level check only.
+Secrets such as the SerpAPI ``api_key`` are always redacted.
+"""
+
+import random
+import sys
+from typing import Any, Dict, List, Mapping, Optional
+
+from loguru import logger
+from config import settings
+
+# Level for per-request detail lines (between DEBUG and INFO)
+DETAIL = "DETAIL"
+logger.level(DETAIL, no=15)
+
+SECRET_KEYS = {"api_key", "apikey", "key", "token", "access_token", "password", "secret", "authorization"}
+REDACTED = "***"
+
+_LEGACY_FORMAT = "{time:YYYY-MM-DD HH:mm:ss} | {level} | {message}"
+_handler_ids: List[int] = []
+
+
+def is_structured() -> bool:
+    """Return True when the structured logging mode is active."""
+    return settings.log_mode.lower() == "structured"
+
+
+def redact(values: Mapping[str, Any]) -> Dict[str, Any]:
+    """
+    Return a copy of ``values`` with secret fields masked.
+
+    Args:
+        values: Mapping such as SerpAPI query params or request headers
+
+    Returns:
+        Copy safe to log
+    """
+    return {k: (REDACTED if k.lower() in SECRET_KEYS else v) for k, v in values.items()}
+
+
+def _logfmt_value(value: Any) -> str:
+    text = str(value)
+    if not text or any(c in text for c in ' "='):
+        text = '"' + text.replace('"', '\\"') + '"'
+    return text.replace("{", "{{").replace("}", "}}")
+
+
+def _structured_format(record: Dict[str, Any]) -> str:
+    fields = " ".join(f"{k}={_logfmt_value(v)}" for k, v in record["extra"].items())
+    return "{time:YYYY-MM-DDTHH:mm:ss.SSSZ} level={level} msg=\"{message}\" " + fields + "\n{exception}"
+
+
+class RouteSampler:
+    """Per-route sampling of request summary lines."""
+
+    def __init__(self, rates: Optional[Mapping[str, float]] = None, default_rate: Optional[float] = None):
+        """
+        Args:
+            rates: Fraction of requests to log per route path (0.0-1.0)
+            default_rate: Fraction for routes not listed in ``rates``
+        """
+        self.rates = dict(settings.log_sample_rates if rates is None else rates)
+        self.default_rate = settings.log_default_sample_rate if default_rate is None else default_rate
+
+    def should_log(self, route: str, status_code: int = 200) -> bool:
+        """Errors are always logged; other requests according to the route's rate."""
+        if status_code >= 500:
+            return True
+        rate = self.rates.get(route, self.default_rate)
+        return rate >= 1.0 or (rate > 0.0 and random.random() < rate)
+
+
+def configure_logging(mode: Optional[str] = None, path: str = "logs/news_api.log", console: bool = True) -> None:
+    """
+    Install the log sinks for the selected mode, replacing previously installed ones.
+
+    Args:
+        mode: 'verbose' or 'structured' (defaults to settings.log_mode)
+        path: Log file path
+        console: Also log to stderr in structured mode
+    """
+    if mode is not None:
+        settings.log_mode = mode
+
+    for handler_id in _handler_ids:
+        logger.remove(handler_id)
+    _handler_ids.clear()
+
+    if is_structured():
+        # Drop loguru's default DEBUG stderr sink so detail lines are gated
+        # out before formatting
+        try:
+            logger.remove(0)
+        except ValueError:
+            pass
+        if console:
+            _handler_ids.append(logger.add(sys.stderr, level=settings.log_level, format=_structured_format))
+        _handler_ids.append(logger.add(
+            path,
+            rotation="500 MB",
+            compression="zip",
+            level=settings.log_level,
+            format=_structured_format,
+            enqueue=True
+        ))
+    else:
+        _handler_ids.append(logger.add(
+            path,
+            rotation="500 MB",
+            compression="zip",
+            level=DETAIL,
+            format=_LEGACY_FORMAT,
+            enqueue=True
+        ))
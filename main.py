@@ -4,39 +4,137 @@ FastAPI server for Social Companionship Agent - News API Integration
 Provides top news stories for the ElevenLabs agent.
 """
 
-from fastapi import FastAPI, HTTPException, Request, Query
+from fastapi import FastAPI, HTTPException, Path, Request, Query
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.exceptions import RequestValidationError
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.responses import HTMLResponse, JSONResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import AsyncIterator, List, Optional, Tuple
+from contextlib import asynccontextmanager
+import asyncio
+from sse_starlette import EventSourceResponse
 from loguru import logger
 from serpapi_service import SerpAPIService
+from librivox_service import LibriVoxService
+from librivox_catalog import LibriVoxCatalog
+from audiobook_manifests import AudiobookManifests, render_m3u
+from genre_index import GenreIndex
+from prefetch import NewsPrefetcher
+from news_pipeline import NewsPipeline
+from http_clients import UpstreamClients
+from redis_cache import build_l2_backend, build_result_cache
+from cache_snapshot import CacheSnapshotter
+from admission import UpstreamOverloaded
+from profiling import LoopLagMonitor, RequestProfiler
+from http_caching import cached_response, compressed_bodies
 from config import settings
-import httpx
+from serialization import dumps
+from logging_config import DETAIL, RouteSampler, configure_logging, is_structured
+import metrics
+import time
 
 # Configure logging
-logger.add(
-    "logs/news_api.log",
-    rotation="500 MB",
-    compression="zip",
-    level="INFO",
-    format="{time:YYYY-MM-DD HH:mm:ss} | {level} | {message}",
-    enqueue=True
+configure_logging()
+request_sampler = RouteSampler()
+
+# Initialize services
+upstream_clients = UpstreamClients()
+cache_backend = build_l2_backend()
+serpapi_service = SerpAPIService(
+    cache=build_result_cache(
+        cache_backend, "news",
+        maxsize=settings.news_cache_maxsize,
+        ttl=settings.news_cache_ttl,
+        stale_ttl=settings.news_cache_stale_ttl,
+    )
+)
+librivox_service = LibriVoxService(
+    cache=build_result_cache(
+        cache_backend, "audiobooks",
+        maxsize=settings.audiobook_cache_maxsize,
+        ttl=settings.audiobook_cache_ttl,
+        stale_ttl=settings.audiobook_cache_stale_ttl,
+    )
 )
+news_pipeline = NewsPipeline(
+    serpapi_service,
+    cursor_store=build_result_cache(
+        cache_backend, "news-cursors",
+        maxsize=settings.news_cursor_store_maxsize,
+        ttl=settings.news_cursor_ttl,
+        stale_ttl=0.0,
+    ),
+)
+audiobook_manifests = AudiobookManifests(librivox_service)
+cache_snapshotter = CacheSnapshotter(caches={
+    "news": serpapi_service.cache,
+    "audiobooks": librivox_service.cache,
+    "audiobook_manifests": audiobook_manifests.cache,
+})
+news_prefetcher = NewsPrefetcher(serpapi_service)
+request_profiler = RequestProfiler()
+loop_lag_monitor = LoopLagMonitor()
+genre_index = GenreIndex()
+librivox_catalog = LibriVoxCatalog(librivox_service, genre_index=genre_index)
+metrics.registry.add_collector(metrics.cache_collector(
+    caches={
+        "news": serpapi_service.cache,
+        "news_responses": news_pipeline,
+        "news_cursors": news_pipeline.cursor_store,
+        "audiobooks": librivox_service.cache,
+        "audiobook_manifests": audiobook_manifests.cache,
+        "compressed_responses": compressed_bodies,
+    },
+    flights={
+        "serpapi": serpapi_service.single_flight,
+        "librivox": librivox_service.single_flight,
+        "librivox-manifests": librivox_service.manifest_flight,
+    },
+))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create the pooled upstream clients on startup and close them on shutdown."""
+    if settings.cache_snapshot_enabled:
+        # Before the prefetcher starts, so it sees the restored freshness
+        cache_snapshotter.load()
+        cache_snapshotter.start()
+    if settings.loop_lag_monitor_enabled:
+        loop_lag_monitor.start()
+    upstream_clients.start()
+    serpapi_service.client = upstream_clients.serpapi
+    librivox_service.client = upstream_clients.librivox
+    if settings.librivox_catalog_enabled:
+        librivox_catalog.start()
+    if settings.prefetch_enabled:
+        news_prefetcher.start()
+    try:
+        yield
+    finally:
+        await news_prefetcher.stop()
+        await librivox_catalog.stop()
+        await audiobook_manifests.stop()
+        await loop_lag_monitor.stop()
+        if settings.cache_snapshot_enabled:
+            await cache_snapshotter.stop()
+        serpapi_service.client = None
+        librivox_service.client = None
+        await upstream_clients.aclose()
+        if cache_backend is not None:
+            await cache_backend.close()
+
 
 # Initialize FastAPI app
 app = FastAPI(
     title="Social Companionship API",
     description="News and Audiobook API for Social Companionship Agent",
     version="1.0.0",
-    redirect_slashes=False  # disables 301 redirect for missing or extra trailing slash
+    redirect_slashes=False,  # disables 301 redirect for missing or extra trailing slash
+    lifespan=lifespan
 )
 
-# Initialize services
-serpapi_service = SerpAPIService()
-
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -50,22 +148,65 @@ app.add_middleware(
 # Add request logging middleware
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
-    # Log the raw request body for POST requests
-    if request.method == "POST" and request.url.path == "/api/v1/news/top":
+    # Log the raw request body for POST requests (off by default)
+    if settings.log_request_bodies and request.method == "POST" and request.url.path == "/api/v1/news/top":
         try:
             body = await request.body()
-            logger.info(f"🔍 Raw POST body: {body.decode('utf-8')}")
+            logger.log(DETAIL, "🔍 Raw POST body: {}", body.decode('utf-8'))
         except Exception as e:
             logger.error(f"❌ Error reading request body: {e}")
     
+    start = time.perf_counter()
     response = await call_next(request)
+    duration = time.perf_counter() - start
+    
+    # Label by route template so path parameters don't explode the series
+    route = request.scope.get("route")
+    route_path = route.path if route is not None else "unmatched"
+    metrics.REQUEST_LATENCY.observe(duration, request.method, route_path, str(response.status_code))
+    
+    # Structured mode: one sampled summary line per request
+    if is_structured() and request_sampler.should_log(request.url.path, response.status_code):
+        logger.bind(
+            method=request.method,
+            route=request.url.path,
+            status=response.status_code,
+            duration_ms=round(duration * 1000, 2),
+        ).info("request")
+    return response
+
+# Routes that can be profiled with the X-Profile request header
+PROFILED_PATHS = {"/api/v1/news/top", "/search_audiobooks"}
+
+
+@app.middleware("http")
+async def profile_requests(request: Request, call_next):
+    # Opt-in: profiling must be enabled and the request must ask for it
+    wanted = request.headers.get("x-profile")
+    if (
+        not settings.profiling_enabled
+        or not wanted
+        or request.url.path not in PROFILED_PATHS
+        or (settings.profiling_token and wanted != settings.profiling_token)
+        or not request_profiler.start()
+    ):
+        return await call_next(request)
+    
+    started_at = time.time()
+    start = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        profile = request_profiler.stop(request.method, request.url.path, started_at, time.perf_counter() - start)
+    response.headers["X-Profile-Id"] = profile.id
     return response
 
 # Add validation error handler
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
     logger.error(f"❌ Validation Error on {request.method} {request.url.path}")
-    logger.error(f"📄 Request body: {await request.body()}")
+    if settings.log_request_bodies:
+        logger.error(f"📄 Request body: {await request.body()}")
     logger.error(f"🔍 Validation errors: {exc.errors()}")
     
     return JSONResponse(
@@ -73,12 +214,23 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
         content={"detail": f"Validation error: {exc.errors()}"}
     )
 
+# Shed upstream calls: a fast 503 telling the agent when to try again
+@app.exception_handler(UpstreamOverloaded)
+async def overloaded_exception_handler(request: Request, exc: UpstreamOverloaded):
+    logger.warning(f"🚦 {request.method} {request.url.path} - Shedding request: {exc}")
+    return JSONResponse(
+        status_code=503,
+        content={"detail": f"Service busy, retry in {exc.retry_after}s"},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
 # Request models
 from pydantic import field_validator
 
 class NewsRequest(BaseModel):
     q: str  # Direct search query for SerpAPI (required)
     limit: Optional[int] = 3
+    cursor: Optional[str] = None  # next_cursor of a previous response, for more stories
     
     class Config:
         # Allow extra fields that might be sent by the agent
@@ -94,6 +246,23 @@ class NewsRequest(BaseModel):
                 return 3
         return v
 
+class NewsBatchRequest(BaseModel):
+    queries: List[NewsRequest]
+    timeout: Optional[float] = None  # Seconds for the whole batch (defaults to settings)
+
+class NewsBatchResult(BaseModel):
+    q: str
+    success: bool
+    stories: List[dict] = []
+    total_count: int = 0
+    next_cursor: Optional[str] = None
+    error: Optional[str] = None
+
+class NewsBatchResponse(BaseModel):
+    success: bool
+    results: List[NewsBatchResult]
+    elapsed_ms: float
+
 class NewsResponse(BaseModel):
     success: bool
     stories: List[dict]
@@ -101,6 +270,7 @@ class NewsResponse(BaseModel):
     language: str
     locale: Optional[str] = None
     categories: Optional[List[str]] = None
+    next_cursor: Optional[str] = None  # Pass back as `cursor` to get more stories
 
 
 
@@ -113,119 +283,148 @@ async def root():
         "status": "running",
         "endpoints": {
             "news": "/api/v1/news/top",
+            "news_batch": "/api/v1/news/batch",
+            "news_stream": "/api/v1/news/stream",
             "audiobooks": "/api/v1/audiobooks/search",
+            "play_audiobook": "/play_audiobook/{book_id}",
             "player": "/player",
             "docs": "/docs"
         }
     }
 
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Prometheus metrics in the text exposition format."""
+    return Response(content=metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
+
+@app.get("/debug/profiles", include_in_schema=False)
+async def list_profiles():
+    """Stored request profiles, newest first."""
+    if not settings.profiling_enabled:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return {"profiles": request_profiler.summaries(), "event_loop": loop_lag_monitor.stats()}
+
+@app.get("/debug/profiles/{profile_id}", include_in_schema=False)
+async def download_profile(profile_id: str):
+    """One request profile as collapsed stacks (flamegraph.pl / speedscope input)."""
+    profile = request_profiler.get(profile_id) if settings.profiling_enabled else None
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return Response(
+        content=profile.collapsed,
+        media_type="text/plain",
+        headers={"Content-Disposition": f'attachment; filename="profile-{profile.id}.folded"'},
+    )
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint."""
-    return {"status": "healthy", "service": "news-api"}
+    return {
+        "status": "healthy",
+        "service": "news-api",
+        "upstreams": {
+            "serpapi": {
+                **serpapi_service.resilience.stats(),
+                "quota": serpapi_service.scheduler.stats(),
+                "admission": serpapi_service.admission.stats(),
+            },
+            "librivox": {**librivox_service.resilience.stats(), "admission": librivox_service.admission.stats()},
+            "librivox_manifests": {
+                **librivox_service.manifest_resilience.stats(),
+                "admission": librivox_service.manifest_admission.stats(),
+            },
+        },
+        "event_loop": loop_lag_monitor.stats(),
+    }
 
-@app.post("/api/v1/news/top", response_model=NewsResponse)
-async def get_top_news(request: NewsRequest):
+async def render_top_news(request: Request, q: str, limit: int, cursor: Optional[str] = None) -> Response:
     """
-    Get top news stories filtered for positive, senior-friendly content.
+    Shared implementation of GET and POST /api/v1/news/top.
+    
+    First pages carry an ETag and a max-age matching the remaining freshness
+    of the cached result set; a GET with a matching If-None-Match gets a 304.
+    Pages continued from a cursor are single-use and not cacheable.
     
     Args:
-        request: News request with locale, language, categories, and limit
+        request: Incoming request (method, conditional and encoding headers)
+        q: Direct search query for SerpAPI
+        limit: Number of stories to return (1-50)
+        cursor: next_cursor of a previous response; continues that result
+            list from memory instead of searching again
         
     Returns:
-        NewsResponse with filtered news stories
+        Pre-rendered NewsResponse JSON, possibly compressed, or 304 Not Modified
     """
-    # Log incoming request
-    logger.info(f"📥 POST /api/v1/news/top - Incoming request: {request.model_dump()}")
-    
+    route = f"{request.method} /api/v1/news/top"
     try:
-        # Always use direct query approach
-        limit = request.limit or 3
-        
         # Validate limit
         if limit < 1 or limit > 50:
-            logger.warning(f"❌ POST /api/v1/news/top - Invalid limit: {limit}")
+            logger.warning(f"❌ {route} - Invalid limit: {limit}")
             raise HTTPException(
                 status_code=400,
                 detail="Limit must be between 1 and 50"
             )
         
-        logger.info(f"🔍 POST /api/v1/news/top - Fetching stories with query: '{request.q}', limit={limit}")
+        if cursor:
+            logger.log(DETAIL, "🔍 {} - Continuing query '{}' from cursor, limit={}", route, q, limit)
+            page = await news_pipeline.more_stories(cursor, limit, q)
+            if page is None:
+                logger.warning(f"❌ {route} - Invalid or expired cursor for query '{q}'")
+                raise HTTPException(
+                    status_code=410,
+                    detail="Cursor is invalid or expired; repeat the request without a cursor"
+                )
+        else:
+            logger.log(DETAIL, "🔍 {} - Fetching stories with query: '{}', limit={}", route, q, limit)
+            news_prefetcher.record(q)
+            page = await news_pipeline.top_stories(q=q, limit=limit)
         
-        # Always use direct query approach
-        logger.info(f"🎯 Using direct query: '{request.q}'")
-        
-        stories = await serpapi_service.get_latest_news(
-            country=None,  # Let the query handle location
-            category=None,  # Let the query handle category
-            language="en",  # Default to English, agent can specify in query
-            size=limit,
-            q=request.q  # Direct query from agent
-        )
-        
-        if not stories:
-            logger.warning(f"⚠️ POST /api/v1/news/top - No stories found for request: {request.model_dump()}")
-            # Return successful response with empty stories instead of error
-            response = NewsResponse(
-                success=True,
-                stories=[],
-                total_count=0,
-                language="en",
-                locale=None,
-                categories=None
-            )
-            
-            # Log outgoing response
-            logger.info(f"📤 POST /api/v1/news/top - Response sent: success={response.success}, total_count={response.total_count}")
-            logger.info(f"📋 Empty response - no stories found for the requested criteria")
-            
-            return response
-        
-        logger.info(f"✅ POST /api/v1/news/top - Found {len(stories)} stories")
-        
-        # Format the response to match our expected format
-        stories_data = []
-        for story in stories:
-            # Map SerpAPI fields to our expected format
-            formatted_story = {
-                "title": story.get("title", "No title"),
-                "description": story.get("description", "No description available"),
-                "source": story.get("source", "Unknown source"),
-                "published_at": story.get("published_at", ""),
-                "language": "en"
-            }
-            stories_data.append(formatted_story)
-        
-        response = NewsResponse(
-            success=True,
-            stories=stories_data,
-            total_count=len(stories),
-            language="en",
-            locale=None,
-            categories=None
-        )
+        if not page.stories:
+            # Successful response with empty stories instead of an error
+            logger.warning(f"⚠️ {route} - No stories found for request: q='{q}', limit={limit}")
         
         # Log outgoing response with story details
-        logger.info(f"📤 POST /api/v1/news/top - Response sent: success={response.success}, total_count={response.total_count}")
-        for i, story in enumerate(response.stories, 1):
-            logger.info(f"📰 Story {i}: {story['title']} | Source: {story['source']} | Published: {story['published_at']}")
+        logger.log(DETAIL, "📤 {} - Response sent: success=True, total_count={}", route, len(page.stories))
+        for i, story in enumerate(page.stories, 1):
+            logger.log(DETAIL, "📰 Story {}: {} | Source: {} | Published: {}", i, story.title, story.source, story.published_at)
         
-        return response
+        if cursor:
+            return Response(content=page.body, media_type="application/json", headers={"Cache-Control": "no-store"})
+        return cached_response(request, page.body, serpapi_service.cache_fresh_for(q), etag=page.etag)
         
     except HTTPException as e:
-        logger.error(f"❌ POST /api/v1/news/top - HTTP Exception: {e.status_code} - {e.detail}")
+        logger.error(f"❌ {route} - HTTP Exception: {e.status_code} - {e.detail}")
+        raise
+    except UpstreamOverloaded:
+        # Answered with 503 and Retry-After by overloaded_exception_handler
         raise
     except Exception as e:
-        logger.error(f"❌ POST /api/v1/news/top - Unexpected error: {str(e)}")
+        logger.error(f"❌ {route} - Unexpected error: {str(e)}")
         raise HTTPException(
             status_code=500,
             detail=f"Internal server error: {str(e)}"
         )
 
-@app.get("/api/v1/news/top")
+@app.post("/api/v1/news/top", response_model=NewsResponse)
+async def get_top_news(request: NewsRequest, http_request: Request):
+    """
+    Get top news stories filtered for positive, senior-friendly content.
+    
+    Args:
+        request: News request with the search query and limit
+        
+    Returns:
+        NewsResponse with filtered news stories
+    """
+    logger.log(DETAIL, "📥 POST /api/v1/news/top - Incoming request: {}", request.model_dump())
+    return await render_top_news(http_request, request.q, request.limit or 3, request.cursor)
+
+@app.get("/api/v1/news/top", response_model=NewsResponse)
 async def get_top_news_get(
+    request: Request,
     q: str,  # Direct search query for SerpAPI (required)
-    limit: int = 3
+    limit: int = 3,
+    cursor: Optional[str] = None
 ):
     """
     Get top news stories (GET version for easy testing).
@@ -233,149 +432,241 @@ async def get_top_news_get(
     Args:
         q: Direct search query for SerpAPI (required)
         limit: Number of stories to return (1-50)
+        cursor: next_cursor of a previous response, for more stories
         
     Returns:
         NewsResponse with filtered news stories
     """
-    # Log incoming request
-    logger.info(f"📥 GET /api/v1/news/top - Incoming request: q='{q}', limit={limit}")
+    logger.log(DETAIL, "📥 GET /api/v1/news/top - Incoming request: q='{}', limit={}", q, limit)
+    return await render_top_news(request, q, limit, cursor)
+
+
+@app.post("/api/v1/news/batch", response_model=NewsBatchResponse)
+async def get_top_news_batch(request: NewsBatchRequest):
+    """
+    Get top news stories for several queries in one call.
     
-    try:
-        # Validate limit
-        if limit < 1 or limit > 50:
-            logger.warning(f"❌ GET /api/v1/news/top - Invalid limit: {limit}")
-            raise HTTPException(
-                status_code=400,
-                detail="Limit must be between 1 and 50"
-            )
-        
-        logger.info(f"🔍 GET /api/v1/news/top - Fetching stories with query: '{q}', limit={limit}")
-        
-        # Always use direct query approach
-        logger.info(f"🎯 Using direct query: '{q}'")
+    Queries are fetched concurrently (at most settings.news_batch_concurrency
+    at a time) under one shared deadline, so a batch takes about as long as
+    its slowest query. Each query gets its own result or error; a query
+    SerpAPI failed for reports that error, and queries still running at the
+    deadline are reported as timed out. Cursors are not accepted here: a
+    query's next_cursor is followed with /api/v1/news/top.
+    
+    Args:
+        request: Batch of news requests and an optional timeout in seconds
         
-        stories = await serpapi_service.get_latest_news(
-            country=None,  # Let the query handle location
-            category=None,  # Let the query handle category
-            language="en",  # Default to English, agent can specify in query
-            size=limit,
-            q=q  # Direct query from agent
+    Returns:
+        NewsBatchResponse with one result per query, in request order
+    """
+    count = len(request.queries)
+    logger.log(DETAIL, "📥 POST /api/v1/news/batch - Incoming batch of {} queries", count)
+    
+    if count < 1 or count > settings.news_batch_max_queries:
+        logger.warning(f"❌ POST /api/v1/news/batch - Invalid batch size: {count}")
+        raise HTTPException(
+            status_code=400,
+            detail=f"Batch must contain between 1 and {settings.news_batch_max_queries} queries"
         )
-        
-        if not stories:
-            logger.warning(f"⚠️ GET /api/v1/news/top - No stories found for request: q='{q}', limit={limit}")
-            # Return successful response with empty stories instead of error
-            response = NewsResponse(
-                success=True,
-                stories=[],
-                total_count=0,
-                language="en",
-                locale=None,
-                categories=None
+    
+    timeout = request.timeout if request.timeout and request.timeout > 0 else settings.news_batch_timeout
+    timeout = min(timeout, settings.news_batch_timeout)
+    semaphore = asyncio.Semaphore(settings.news_batch_concurrency)
+    start = time.perf_counter()
+    
+    async def fetch(item: NewsRequest) -> NewsBatchResult:
+        limit = item.limit or 3
+        if limit < 1 or limit > 50:
+            return NewsBatchResult(q=item.q, success=False, error="Limit must be between 1 and 50")
+        if item.cursor:
+            return NewsBatchResult(
+                q=item.q, success=False, error="Cursors are not supported in batches; use /api/v1/news/top"
             )
-            
-            # Log outgoing response
-            logger.info(f"📤 GET /api/v1/news/top - Response sent: success={response.success}, total_count={response.total_count}")
-            logger.info(f"📋 Empty response - no stories found for the requested criteria")
-            
-            return response
-        
-        logger.info(f"✅ GET /api/v1/news/top - Found {len(stories)} stories")
-        
-        # Format the response to match our expected format
-        stories_data = []
-        for story in stories:
-            # Map SerpAPI fields to our expected format
-            formatted_story = {
-                "title": story.get("title", "No title"),
-                "description": story.get("description", "No description available"),
-                "source": story.get("source", "Unknown source"),
-                "published_at": story.get("published_at", ""),
-                "language": "en"
-            }
-            stories_data.append(formatted_story)
-        
-        response = NewsResponse(
-            success=True,
-            stories=stories_data,
-            total_count=len(stories),
-            language="en",
-            locale=None,
-            categories=None
+        news_prefetcher.record(item.q)
+        async with semaphore:
+            page = await news_pipeline.top_stories(q=item.q, limit=limit, raise_errors=True)
+        stories_data = [story.to_dict() for story in page.stories]
+        return NewsBatchResult(
+            q=item.q, success=True, stories=stories_data, total_count=len(stories_data), next_cursor=page.next_cursor
         )
+    
+    tasks = [asyncio.create_task(fetch(item)) for item in request.queries]
+    done, pending = await asyncio.wait(tasks, timeout=timeout)
+    for task in pending:
+        task.cancel()
+    
+    results = []
+    for item, task in zip(request.queries, tasks):
+        if task in pending:
+            logger.warning(f"⏱️ POST /api/v1/news/batch - Query '{item.q}' timed out after {timeout:.1f}s")
+            results.append(NewsBatchResult(q=item.q, success=False, error=f"Timed out after {timeout:.1f}s"))
+        elif task.exception() is not None:
+            error = task.exception()
+            logger.error(f"❌ POST /api/v1/news/batch - Query '{item.q}' failed: {error!r}")
+            results.append(NewsBatchResult(q=item.q, success=False, error=str(error) or type(error).__name__))
+        else:
+            results.append(task.result())
+    
+    response = NewsBatchResponse(
+        success=all(result.success for result in results),
+        results=results,
+        elapsed_ms=round((time.perf_counter() - start) * 1000, 2)
+    )
+    logger.log(DETAIL, "📤 POST /api/v1/news/batch - Response sent: {}/{} queries succeeded in {} ms",
+               sum(result.success for result in results), count, response.elapsed_ms)
+    return response
+
+
+@app.get("/api/v1/news/stream")
+async def stream_top_news(
+    q: str,  # Direct search query for SerpAPI (required)
+    limit: int = 3,
+    format: str = Query(default="sse", pattern="^(sse|ndjson)$")
+):
+    """
+    Stream top news stories, one event per story, followed by a summary event.
+    
+    Stories can only be ranked once the whole SerpAPI result is in, so the
+    first event comes no sooner than the /api/v1/news/top response would.
+    The stream delivers each story as its own event, and reports an
+    overloaded upstream in-band. Cached results are sent without waiting on
+    SerpAPI.
+    
+    Args:
+        q: Direct search query for SerpAPI (required)
+        limit: Number of stories to return (1-50)
+        format: 'sse' (text/event-stream) or 'ndjson' (one JSON object per line)
         
-        # Log outgoing response with story details
-        logger.info(f"📤 GET /api/v1/news/top - Response sent: success={response.success}, total_count={response.total_count}")
-        for i, story in enumerate(response.stories, 1):
-            logger.info(f"📰 Story {i}: {story['title']} | Source: {story['source']} | Published: {story['published_at']}")
-        
-        return response
-        
-    except HTTPException as e:
-        logger.error(f"❌ GET /api/v1/news/top - HTTP Exception: {e.status_code} - {e.detail}")
-        raise
-    except Exception as e:
-        logger.error(f"❌ GET /api/v1/news/top - Unexpected error: {str(e)}")
+    Returns:
+        Streaming response with 'story' events and a final 'summary' event
+    """
+    logger.log(DETAIL, "📥 GET /api/v1/news/stream - Incoming request: q='{}', limit={}, format={}", q, limit, format)
+    
+    if limit < 1 or limit > 50:
+        logger.warning(f"❌ GET /api/v1/news/stream - Invalid limit: {limit}")
         raise HTTPException(
-            status_code=500,
-            detail=f"Internal server error: {str(e)}"
+            status_code=400,
+            detail="Limit must be between 1 and 50"
         )
+    
+    news_prefetcher.record(q)
+    
+    async def events() -> AsyncIterator[Tuple[str, dict]]:
+        try:
+            page = await news_pipeline.top_stories(q=q, limit=limit)
+        except UpstreamOverloaded as e:
+            # Headers are already sent, so report it in the stream
+            yield "summary", {"success": False, "total_count": 0, "error": str(e), "retry_after": e.retry_after}
+            return
+        for index, story in enumerate(page.stories, 1):
+            yield "story", {"index": index, **story.to_dict()}
+        yield "summary", {"success": True, "total_count": len(page.stories), "language": "en", "next_cursor": page.next_cursor}
+        logger.log(DETAIL, "📤 GET /api/v1/news/stream - Streamed {} stories", len(page.stories))
+    
+    if format == "ndjson":
+        async def lines() -> AsyncIterator[bytes]:
+            async for event, data in events():
+                yield dumps({"event": event, **data}) + b"\n"
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+    
+    async def server_sent_events() -> AsyncIterator[dict]:
+        async for event, data in events():
+            yield {"event": event, "data": dumps(data).decode("utf-8")}
+    return EventSourceResponse(server_sent_events())
 
 
-import urllib.parse
+def genre_not_found(genre: str) -> JSONResponse:
+    """404 response for an unknown genre, with the closest known genres."""
+    return JSONResponse(
+        status_code=404,
+        content={
+            "detail": f"No books found for genre: {genre}",
+            "suggestions": genre_index.suggest(genre, limit=settings.genre_suggestion_limit),
+        }
+    )
 
 
 @app.get("/search_audiobooks")
 async def search_audiobooks(
+    request: Request,
     title: str | None = Query(default=None),
     genre: str | None = Query(default=None),
 ):
     if not title and not genre:
         raise HTTPException(status_code=400, detail="Please provide title or genre")
 
-    api_url = settings.librivox_api
-    if title:
-        api_url += f"&title={urllib.parse.quote(title)}"
-    if genre:
-        api_url += f"&genre={urllib.parse.quote(genre)}"
+    # Unknown genres get the closest matches without an upstream call, once
+    # a full catalog sync has filled the genre vocabulary
+    if genre and settings.genre_short_circuit and genre_index.complete and not genre_index.is_plausible(genre):
+        return genre_not_found(genre)
 
-    async with httpx.AsyncClient() as client:
+    # Serve from the local catalog index, falling back to LibriVox on a miss
+    results = await librivox_catalog.search(title=title, genre=genre)
+    from_catalog = results is not None
+    if results is None:
         try:
-            response = await client.get(api_url, timeout=10)
-            response.raise_for_status()
-            data = response.json()
+            books = await librivox_service.fetch_books(title=title, genre=genre)
+        except UpstreamOverloaded:
+            raise
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Failed to fetch audiobooks: {str(e)}")
+        results = [librivox_service.convert_book_format(book) for book in books]
+        genre_index.add_books(results)
 
-    books = data.get("books", [])
+    # If a genre was specified but no books were found, suggest the closest genres
+    if genre and not results:
+        return genre_not_found(genre)
 
-    # If a genre was specified but no books were found, raise an error
-    if genre and not books:
-        raise HTTPException(status_code=404, detail=f"No books found for genre: {genre}")
+    # Warm the chapter manifests of the likeliest picks for /play_audiobook
+    audiobook_manifests.prefetch(book["id"] for book in results)
 
-    results = []
-    for book in books:
-        authors = []
-        for a in book.get("authors", []):
-            if "name" in a:
-                authors.append(a["name"])
-            else:
-                full_name = f"{a.get('first_name', '')} {a.get('last_name', '')}".strip()
-                if full_name:
-                    authors.append(full_name)
-        if not authors:
-            authors = ["Unknown Author"]
-
-        genres_list = [g.get("name", "Unknown Genre") for g in book.get("genres", [])] or ["Unknown Genre"]
-
-        results.append({
-            "id": book.get("id"),
-            "title": book.get("title"),
-            "authors": authors,
-            "genres": genres_list,
-        })
-
-    return {"results": results}
+    # Results are good for as long as the server would keep serving them
+    max_age = librivox_service.cache_fresh_for(title=title, genre=genre)
+    if max_age is None and from_catalog:
+        max_age = settings.audiobook_cache_ttl
+    return cached_response(request, dumps({"results": results}), max_age)
+
+async def load_manifest(book_id: str) -> dict:
+    """Playback manifest of a book, or an HTTP error."""
+    try:
+        manifest = await audiobook_manifests.get(book_id)
+    except UpstreamOverloaded:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to fetch audiobook: {str(e)}")
+    if manifest is None or not manifest["chapters"]:
+        raise HTTPException(status_code=404, detail=f"Audiobook {book_id} not found or has no chapters")
+    return manifest
+
+@app.get("/play_audiobook/{book_id}")
+async def play_audiobook(request: Request, book_id: str = Path(pattern=r"^\d+$")):
+    """
+    Playback manifest for a LibriVox book.
+    
+    Manifests of the top /search_audiobooks results are prefetched, so this
+    is usually answered from memory.
+    
+    Args:
+        book_id: LibriVox book id, as returned by /search_audiobooks
+        
+    Returns:
+        Book title and authors, chapters with audio URL and duration, total
+        duration, the RSS feed and zip URLs, and an M3U playlist URL
+    """
+    manifest = await load_manifest(book_id)
+    body = dumps({**manifest, "playlist_url": f"/play_audiobook/{book_id}/playlist.m3u"})
+    return cached_response(request, body, audiobook_manifests.cache.fresh_for(book_id))
+
+@app.get("/play_audiobook/{book_id}/playlist.m3u")
+async def play_audiobook_playlist(request: Request, book_id: str = Path(pattern=r"^\d+$")):
+    """Chapters of a LibriVox book as an extended M3U playlist for streaming players."""
+    manifest = await load_manifest(book_id)
+    return cached_response(
+        request,
+        render_m3u(manifest).encode("utf-8"),
+        audiobook_manifests.cache.fresh_for(book_id),
+        media_type="audio/x-mpegurl",
+    )
 
 if __name__ == "__main__":
     import uvicorn
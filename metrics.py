@@ -0,0 +1,261 @@
+"""
+Lightweight in-process metrics exposed in the Prometheus text format.
+
+Recording a sample is a dict lookup plus a bisect, cheap enough to leave on
+in production. Values that other components already count (cache hits,
+coalesced calls) are read through collectors at scrape time instead of being
+recorded on the hot path.
+"""
+
+import bisect
+import time
+from typing import Awaitable, Callable, Dict, Iterable, List, Sequence, Tuple
+
+import httpx
+
+LabelValues = Tuple[str, ...]
+Sample = Tuple[Dict[str, str], float]
+CollectorResult = Iterable[Tuple[str, str, str, Iterable[Sample]]]
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Counter:
+    """Monotonically increasing counter with optional labels."""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *labelvalues: str, amount: float = 1.0) -> None:
+        self._values[labelvalues] = self._values.get(labelvalues, 0.0) + amount
+
+    def value(self, *labelvalues: str) -> float:
+        return self._values.get(labelvalues, 0.0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for labelvalues, value in self._values.items():
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labelvalues)} {_format_value(value)}")
+        return lines
+
+
+class Gauge:
+    """Value that can go up and down, with optional labels."""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def set(self, value: float, *labelvalues: str) -> None:
+        self._values[labelvalues] = value
+
+    def inc(self, *labelvalues: str, amount: float = 1.0) -> None:
+        self._values[labelvalues] = self._values.get(labelvalues, 0.0) + amount
+
+    def dec(self, *labelvalues: str, amount: float = 1.0) -> None:
+        self.inc(*labelvalues, amount=-amount)
+
+    def value(self, *labelvalues: str) -> float:
+        return self._values.get(labelvalues, 0.0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge"]
+        for labelvalues, value in self._values.items():
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labelvalues)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    """Cumulative histogram with fixed buckets and optional labels."""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labelvalues -> [per-bucket counts (+Inf last), sum, count]
+        self._series: Dict[LabelValues, list] = {}
+
+    def observe(self, value: float, *labelvalues: str) -> None:
+        series = self._series.get(labelvalues)
+        if series is None:
+            series = self._series[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def count(self, *labelvalues: str) -> int:
+        series = self._series.get(labelvalues)
+        return series[2] if series else 0
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for labelvalues, (counts, total, count) in self._series.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, labelvalues, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, labelvalues)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Registry:
+    """Holds metrics and scrape-time collectors and renders them."""
+
+    def __init__(self):
+        self._metrics: List = []
+        self._collectors: List[Callable[[], CollectorResult]] = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], CollectorResult]) -> None:
+        """
+        Register a callable run at scrape time.
+
+        Args:
+            collector: Returns (name, type, help, samples) tuples where samples
+                are (labels dict, value) pairs
+        """
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        """Render all metrics in the Prometheus text exposition format."""
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            for name, metric_type, documentation, samples in collector():
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {metric_type}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_format_labels(list(labels), list(labels.values()))} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+REQUEST_LATENCY = registry.register(Histogram(
+    "http_request_duration_seconds",
+    "Latency of API requests by method, route and status code.",
+    ("method", "route", "status"),
+))
+UPSTREAM_LATENCY = registry.register(Histogram(
+    "upstream_request_duration_seconds",
+    "Latency of upstream API calls by upstream and status code.",
+    ("upstream", "status"),
+))
+UPSTREAM_ERRORS = registry.register(Counter(
+    "upstream_errors_total",
+    "Failed upstream API calls by upstream and error kind.",
+    ("upstream", "kind"),
+))
+ARTICLES_REQUESTED = registry.register(Histogram(
+    "news_articles_requested",
+    "Number of news articles requested per call.",
+    buckets=COUNT_BUCKETS,
+))
+ARTICLES_RETURNED = registry.register(Histogram(
+    "news_articles_returned",
+    "Number of news articles returned per call.",
+    buckets=COUNT_BUCKETS,
+))
+
+
+async def timed_upstream(upstream: str, request: Awaitable[httpx.Response]) -> httpx.Response:
+    """
+    Await an upstream request, recording its latency and any failure.
+
+    Args:
+        upstream: Upstream label ('serpapi' or 'librivox')
+        request: Pending HTTP request
+
+    Returns:
+        The upstream response
+    """
+    start = time.perf_counter()
+    try:
+        response = await request
+    except httpx.TimeoutException:
+        UPSTREAM_LATENCY.observe(time.perf_counter() - start, upstream, "timeout")
+        UPSTREAM_ERRORS.inc(upstream, "timeout")
+        raise
+    except httpx.RequestError:
+        UPSTREAM_LATENCY.observe(time.perf_counter() - start, upstream, "error")
+        UPSTREAM_ERRORS.inc(upstream, "connection")
+        raise
+    status = response.status_code
+    UPSTREAM_LATENCY.observe(time.perf_counter() - start, upstream, str(status))
+    if status >= 400:
+        UPSTREAM_ERRORS.inc(upstream, f"http_{status}")
+    return response
+
+
+def cache_collector(caches: Dict[str, object], flights: Dict[str, object]) -> Callable[[], CollectorResult]:
+    """
+    Build a collector exposing cache and single-flight counters at scrape time.
+
+    Args:
+        caches: Name -> cache with a ``stats()`` method
+        flights: Name -> SingleFlight
+
+    Returns:
+        Collector callable for Registry.add_collector
+    """
+    def collect() -> CollectorResult:
+        results, sizes = [], []
+        for name, cache in caches.items():
+            stats = cache.stats()
+            sizes.append(({"cache": name}, stats.get("size", 0)))
+            for result in ("hits", "l2_hits", "stale_hits", "misses"):
+                if result in stats:
+                    results.append(({"cache": name, "result": result}, stats[result]))
+        yield ("cache_requests_total", "counter", "Cache lookups by cache and result.", results)
+        yield ("cache_entries", "gauge", "Entries currently held in each cache.", sizes)
+
+        calls, coalesced = [], []
+        for name, flight in flights.items():
+            stats = flight.stats()
+            calls.append(({"upstream": name}, stats["executions"]))
+            coalesced.append(({"upstream": name}, stats["coalesced"]))
+        yield ("upstream_calls_total", "counter", "Upstream calls actually executed.", calls)
+        yield ("upstream_coalesced_total", "counter", "Callers that joined an in-flight identical upstream call.", coalesced)
+
+    return collect
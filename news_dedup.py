@@ -0,0 +1,238 @@
+"""
+Near-duplicate clustering of news articles.
+
+Google News returns the same event from many outlets. Articles are
+clustered greedily in upstream order. A token index on title words finds
+candidate clusters, so each article is only compared with clusters that
+share a title word, and the title usually decides on its own. Title words
+are compared by a crude stem ("reopens" and "reopened" agree). When each
+headline has a stem the other lacks (another name, number, place or verb:
+"Nadal wins French Open" and "Nadal loses French Open final") the
+headlines report different stories, as do headlines sharing less than half
+of the shorter headline's words. A headline that matches a cluster's first
+headline, or adds one word, joins it. Only a headline that adds several
+words is compared by a 64-bit SimHash fingerprint over the title words and
+the first words of the snippet, and joins the nearest cluster within
+``max_distance`` bits. Fingerprints of few tokens are noisy, so they only
+allow a proportional share of that distance.
+Fingerprints are computed on demand, so most articles never need one. Each
+cluster is reduced to one representative that carries a ``cluster_size``.
+
+Fingerprints use Python's built-in hash, which is stable within a process
+only; clustering runs once per upstream fetch, so nothing depends on it
+across processes.
+"""
+
+import string
+from typing import Any, Dict, List, Optional, Tuple
+
+_MASK = (1 << 64) - 1
+_PUNCTUATION = bytes.maketrans(string.punctuation.encode(), b" " * len(string.punctuation))
+_UNICODE_PUNCTUATION = str.maketrans({c: " " for c in "‘’‚“”„«»‹›¿¡–—…·"})
+_STOPWORDS = frozenset(
+    b"a an and are as at be by for from has have he her his in is it its of on or our she "
+    b"that the their they this to was were will with after over into new says said "
+    b"el la los las un una y o de del en con por para que se al su sus es".split()
+)
+
+# Title words two headlines must share to count as the same headline
+_MIN_SAME_TITLE_WORDS = 3
+
+# Fingerprints of fewer tokens only allow a proportional share of max_distance
+_FULL_FINGERPRINT_TOKENS = 24
+
+# SimHash counters are summed in 64 byte-wide lanes, so at most 255 tokens count
+_MAX_TOKENS = 255
+_BIT_BYTES = bytes.maketrans(b"01", b"\x00\x01")
+# token -> its hash spread over 64 byte lanes (one lane per bit)
+_lanes: Dict[bytes, int] = {}
+_LANES_MAXSIZE = 32768
+# title word -> its stem (see _stem)
+_stems: Dict[bytes, bytes] = {}
+# threshold -> translation table mapping a lane count to b"1" above it, b"0" otherwise
+_majority: Dict[int, bytes] = {}
+
+
+def tokenize(text: str) -> List[bytes]:
+    """
+    Lower-case words of ``text`` without punctuation and stopwords.
+
+    Words are returned as UTF-8 bytes: ``bytes.translate`` and ``bytes.split``
+    are several times cheaper than their ``str`` counterparts.
+    """
+    if not text.isascii():
+        text = text.translate(_UNICODE_PUNCTUATION)
+    return [w for w in text.lower().encode().translate(_PUNCTUATION).split() if w not in _STOPWORDS]
+
+
+def _snippet_tokens(text: str, count: int) -> List[bytes]:
+    """
+    The first ``count`` tokens of ``text``, tokenizing only as much of it as needed.
+
+    Cutting at a space is exact: a space separates tokens, so the tokens of
+    the cut text are a prefix of the tokens of the whole text.
+    """
+    if count <= 0 or not text:
+        return []
+    words = text.split(" ", 2 * count)
+    if len(words) <= 2 * count:
+        return tokenize(text)[:count]
+    tokens = tokenize(" ".join(words[:2 * count]))
+    if len(tokens) < count:
+        # Mostly stopwords: fall back to the whole snippet
+        tokens = tokenize(text)
+    return tokens[:count]
+
+
+def _stem(word: bytes) -> bytes:
+    """Crude stem for comparing title words: one inflection suffix off, at most 5 bytes."""
+    stem = _stems.get(word)
+    if stem is None:
+        if len(_stems) >= _LANES_MAXSIZE:
+            _stems.clear()
+        stem = word
+        for suffix in (b"ing", b"ed", b"s"):
+            if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+                stem = word[:-len(suffix)]
+                break
+        stem = _stems[word] = stem[:5]
+    return stem
+
+
+def _token_lanes(token: bytes) -> int:
+    if len(_lanes) >= _LANES_MAXSIZE:
+        _lanes.clear()
+    lanes = _lanes[token] = int.from_bytes(format(hash(token) & _MASK, "064b").encode().translate(_BIT_BYTES), "big")
+    return lanes
+
+
+def simhash(tokens: List[bytes]) -> int:
+    """
+    64-bit SimHash of a token list.
+
+    Bit ``i`` of the result is set when more than half of the token hashes
+    have bit ``i`` set. Each token hash is spread over 64 byte lanes of one
+    integer (cached per token), so the per-bit counts of all tokens are a
+    single big-integer sum, and the majority vote is one byte translation.
+
+    Args:
+        tokens: Shingles (repeated tokens count repeatedly; only the first 255 count)
+
+    Returns:
+        Fingerprint (0 for an empty token list)
+    """
+    tokens = tokens[:_MAX_TOKENS]
+    if not tokens:
+        return 0
+    total = 0
+    get = _lanes.get
+    for token in tokens:
+        lanes = get(token)
+        total += _token_lanes(token) if lanes is None else lanes
+
+    threshold = len(tokens) // 2
+    table = _majority.get(threshold)
+    if table is None:
+        table = _majority[threshold] = bytes(0x31 if count > threshold else 0x30 for count in range(256))
+    return int(total.to_bytes(64, "big").translate(table), 2)
+
+
+def cluster_articles(
+    articles: List[Dict[str, Any]],
+    max_distance: int = 14,
+    snippet_words: int = 8,
+) -> List[Dict[str, Any]]:
+    """
+    Collapse near-duplicate articles into one representative each.
+
+    Args:
+        articles: Converted articles (with 'title' and 'description'), in upstream order
+        max_distance: Maximum Hamming distance between fingerprints of one cluster
+        snippet_words: Snippet words added to the title words for the fingerprint
+
+    Returns:
+        One article per cluster, in the order the clusters were first seen.
+        Each is a copy of the cluster's best member (the first one with a
+        description) with ``cluster_size`` set.
+    """
+    representatives = []
+    for best, members in _cluster(articles, max_distance, snippet_words):
+        representative = dict(articles[best])
+        representative["cluster_size"] = len(members)
+        representatives.append(representative)
+    return representatives
+
+
+def _cluster(articles: List[Dict[str, Any]], max_distance: int, snippet_words: int) -> List[Tuple[int, List[int]]]:
+    """Cluster ``articles``: (best member, all members) per cluster, by article index."""
+    def fingerprint(i: int, title_tokens: List[bytes]) -> Tuple[int, int]:
+        tokens = title_tokens + _snippet_tokens(articles[i].get("description") or "", snippet_words)
+        return simhash(tokens), len(tokens)
+
+    # Per cluster: [best article index, fingerprint and token count of the first member, members,
+    # title tokens, number of distinct title words and title stems of the
+    # first member]. Stems and fingerprints are computed on first comparison
+    # (None until then), as most articles are never compared.
+    clusters: List[List[Any]] = []
+    # Title word -> indices of clusters whose first member has it in its title
+    index: Dict[bytes, List[int]] = {}
+
+    for i, article in enumerate(articles):
+        title_tokens = tokenize(article.get("title") or "")
+        words = set(title_tokens)
+
+        # Title words shared with each candidate cluster
+        shared: Dict[int, int] = {}
+        for token in words:
+            for c in index.get(token, ()):
+                shared[c] = shared.get(c, 0) + 1
+
+        match: Optional[int] = None
+        own: Optional[Tuple[int, int]] = None
+        stems: Optional[frozenset] = None
+        best = None
+        for c, count in shared.items():
+            cluster = clusters[c]
+            if 2 * count < min(len(words), cluster[4]):
+                # Less than half of the shorter title shared: a different story
+                continue
+            if stems is None:
+                stems = frozenset(map(_stem, words))
+            if cluster[5] is None:
+                cluster[5] = frozenset(map(_stem, cluster[3]))
+            added, missing = len(stems - cluster[5]), len(cluster[5] - stems)
+            if added and missing:
+                # Each headline has a word the other lacks ("wins" / "loses",
+                # "2-1" / "3-0", "England" / "Spain"): a different story
+                continue
+            if count >= _MIN_SAME_TITLE_WORDS and added + missing <= 1:
+                # Same headline, or one with a word added: no fingerprint needed
+                if best is None or best[0] > 0 or count > best[2]:
+                    best = (0, c, count)
+                continue
+            if best is not None and best[0] == 0:
+                continue
+            if own is None:
+                own = fingerprint(i, title_tokens)
+            if cluster[1] is None:
+                cluster[1] = fingerprint(cluster[2][0], cluster[3])
+            distance = (own[0] ^ cluster[1][0]).bit_count()
+            # Few tokens give a noisy fingerprint: allow fewer differing bits
+            limit = max_distance * min(own[1], cluster[1][1], _FULL_FINGERPRINT_TOKENS) // _FULL_FINGERPRINT_TOKENS
+            # Nearest cluster by fingerprint (first seen on ties)
+            if distance <= limit and (best is None or (distance, c) < best[:2]):
+                best = (distance, c, count)
+        if best is not None:
+            match = best[1]
+
+        if match is None:
+            for token in words:
+                index.setdefault(token, []).append(len(clusters))
+            clusters.append([i, own, [i], title_tokens, len(words), stems])
+        else:
+            cluster = clusters[match]
+            cluster[2].append(i)
+            if not articles[cluster[0]].get("description") and article.get("description"):
+                cluster[0] = i
+
+    return [(cluster[0], cluster[2]) for cluster in clusters]
@@ -0,0 +1,169 @@
+"""
+Positive-content filter for news results.
+
+Each converted article is scored against a lexicon of negative and positive
+terms (English and Spanish). The lexicon is compiled into one regular
+expression whose alternatives are arranged as a prefix tree, so matching
+costs about the same for a few terms as for a few hundred. A whole result
+set is scored in a single pass over its concatenated text, once per upstream
+fetch, before it is sorted and cached. Rejected articles are dropped from the
+cached result set, so the top ``limit`` stories are backfilled from the
+lower-ranked articles that passed.
+"""
+
+import re
+from bisect import bisect_right
+from typing import Any, Dict, Iterable, List
+
+from metrics import Counter, registry
+
+FILTER_DECISIONS = registry.register(Counter(
+    "news_filter_articles_total",
+    "Articles scored by the positive-content filter, by outcome.",
+    ("outcome",),
+))
+
+# Words that are just as common in neutral sports and business news ("attack",
+# "war", "crash", "collapse", "crisis", "jail", "lawsuit", "bomb", "dead",
+# "invasion", "shooting") only count inside a phrase that is unambiguous.
+DEFAULT_NEGATIVE_TERMS = (
+    # English
+    "abuse", "abused", "accident", "air strike", "airstrike", "airstrikes", "arrest", "arrested",
+    "assault", "bankruptcy", "bomb blast", "bombing", "bridge collapse", "building collapse", "bus crash",
+    "cancer", "car bomb", "car crash", "casualties", "charged with", "civil war", "corpse", "corruption",
+    "crime", "deadly", "death", "deaths", "died", "dies", "disaster", "drought", "earthquake", "epidemic",
+    "execution", "explosion", "famine", "fatal", "flood", "flooding", "found dead", "fraud",
+    "funeral", "gunfire", "gunman", "heart attack", "hostage", "humanitarian crisis", "hurricane",
+    "injured", "jailed", "kidnapped", "kill", "killed", "killing", "killings", "kills", "knife attack",
+    "layoffs", "massacre", "mass shooting", "military invasion", "missile attack", "missiles", "murder",
+    "murdered", "outbreak", "overdose", "pandemic", "passed away", "plane crash", "prison", "rape",
+    "recession", "refugee crisis", "riot", "riots", "scandal", "school shooting", "sent to jail",
+    "sentenced", "shootings", "shot dead", "stabbed", "stabbing", "suicide", "terror",
+    "terrorism", "terrorist", "tornado", "tragedy", "tragic", "train crash", "victim", "victims",
+    "violence", "violent", "war breaks out", "war crimes", "wildfire", "wounded",
+    # Spanish
+    "accidente", "asesinada", "asesinado", "asesinato", "atentado", "catástrofe", "crimen", "detenido",
+    "fallece", "fallecido", "guerra", "herido", "heridos", "homicidio", "incendio", "inundaciones",
+    "muere", "muerte", "muertos", "secuestro", "terremoto", "tiroteo", "tragedia", "víctima", "víctimas",
+    "violencia",
+)
+
+DEFAULT_POSITIVE_TERMS = (
+    # English
+    "anniversary", "award", "awarded", "birthday", "breakthrough", "celebrate", "celebrated",
+    "celebrates", "celebration", "centenarian", "charity", "community", "concert", "cure", "discovery",
+    "donated", "donates", "donation", "festival", "garden", "grandfather", "grandmother", "heartwarming",
+    "hero", "heroes", "honours", "honors", "inspiring", "joy", "kindness", "milestone", "museum", "puppy",
+    "recovered", "recovery", "rescue", "rescued", "restored", "reunited", "smile", "volunteer",
+    "volunteers", "wins", "wildlife",
+    # Spanish
+    "abuela", "abuelo", "aniversario", "celebra", "celebración", "comunidad", "concierto", "cumpleaños",
+    "descubrimiento", "donación", "festival", "homenaje", "premio", "rescate", "voluntarios",
+)
+
+
+def _trie_pattern(terms: Iterable[str]) -> str:
+    """
+    Regular expression matching any of ``terms``, factored as a prefix tree.
+
+    Args:
+        terms: Lower-case terms (words or phrases)
+
+    Returns:
+        Pattern source without boundaries or groups
+    """
+    root: Dict[str, Any] = {}
+    for term in terms:
+        node = root
+        for char in term:
+            node = node.setdefault(char, {})
+        node[""] = None
+
+    def build(node: Dict[str, Any]) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        pattern = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if "" in node:
+            # A term ends here and longer terms continue
+            pattern = (pattern if len(branches) == 1 and len(branches[0]) == 1 else "(?:" + pattern + ")") + "?"
+        return pattern
+
+    return build(root)
+
+
+class ContentFilter:
+    """Scores articles against the lexicon and drops the negative ones."""
+
+    def __init__(
+        self,
+        negative_terms: Iterable[str] = DEFAULT_NEGATIVE_TERMS,
+        positive_terms: Iterable[str] = DEFAULT_POSITIVE_TERMS,
+        negative_weight: float = 2.0,
+        min_score: float = 0.0,
+    ):
+        """
+        Args:
+            negative_terms: Words or phrases that count against an article
+            positive_terms: Words or phrases that count for an article
+            negative_weight: Score subtracted per negative match (positive matches add 1)
+            min_score: Lowest score an article may have and still be kept
+        """
+        negative = {term.strip().lower() for term in negative_terms if term.strip()}
+        positive = {term.strip().lower() for term in positive_terms if term.strip()} - negative
+        self.negative_weight = negative_weight
+        self.min_score = min_score
+        alternatives = []
+        if negative:
+            alternatives.append(f"(?P<neg>{_trie_pattern(negative)})")
+        if positive:
+            alternatives.append(f"(?P<pos>{_trie_pattern(positive)})")
+        # Lookarounds instead of \b: the regex engine skips non-word positions faster
+        self._pattern = re.compile(r"(?<!\w)(?:" + "|".join(alternatives) + r")(?!\w)") if alternatives else None
+
+    def score_batch(self, articles: List[Dict[str, Any]]) -> List[float]:
+        """
+        Score all articles in one pass over their concatenated title and description.
+
+        Args:
+            articles: Converted articles
+
+        Returns:
+            One score per article (0.0 when nothing matched)
+        """
+        scores = [0.0] * len(articles)
+        if self._pattern is None or not articles:
+            return scores
+
+        starts = []
+        parts = []
+        offset = 0
+        for article in articles:
+            # Lower-case per article: lower() can change the length ("İ"
+            # becomes two characters), which would shift later offsets
+            text = f"{article.get('title') or ''}\n{article.get('description') or ''}\n".lower()
+            starts.append(offset)
+            parts.append(text)
+            offset += len(text)
+        text = "".join(parts)
+
+        for match in self._pattern.finditer(text):
+            i = bisect_right(starts, match.start()) - 1
+            scores[i] += 1.0 if match.lastgroup == "pos" else -self.negative_weight
+        return scores
+
+    def filter(self, articles: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Keep the articles scoring at least ``min_score``, in their original order.
+
+        Args:
+            articles: Converted articles
+
+        Returns:
+            The kept articles
+        """
+        scores = self.score_batch(articles)
+        kept = [article for article, score in zip(articles, scores) if score >= self.min_score]
+        FILTER_DECISIONS.inc("kept", amount=len(kept))
+        FILTER_DECISIONS.inc("rejected", amount=len(articles) - len(kept))
+        return kept
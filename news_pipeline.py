@@ -0,0 +1,319 @@
+"""
+Shared news pipeline behind the /api/v1/news routes.
+
+Ranked SerpAPI articles are turned into compact typed ``Story`` records and
+rendered straight to JSON bytes (orjson when installed). The rendered bytes
+are kept per query and limit, and reused for as long as SerpAPIService keeps
+serving the same cached result list, so a cache hit costs no per-story work
+and no serialization at all. Each rendered page carries its ETag, so HTTP
+revalidation and the compressed-body cache need no hashing on a hit
+either. The ETag covers the selected stories, the limit and the cursor;
+cursors are deterministic, so every worker and every re-render of the same
+results produces the same ETag.
+
+Every page that leaves stories unread carries an opaque ``next_cursor``. The
+ranked list the page was cut from is kept in a cursor store of its own (the
+Redis L2, when configured, so any worker resolves it), apart from the result
+cache: refreshing or evicting a result leaves every page chain that was
+already handed out intact for ``news_cursor_ttl``. Lists are stored under a
+digest of their stories, so every worker and every re-render of the same
+list issues the same cursor. A cursor is signed and holds the result-cache
+key of its query, the list digest and the position after the page under an
+HMAC. It only resolves for the query it was issued for, and a chain of
+cursors never repeats a story.
+"""
+
+import base64
+import hashlib
+import hmac
+import secrets
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+from loguru import logger
+
+from cache import TTLCache
+from config import settings
+from http_caching import compute_etag
+from logging_config import DETAIL
+from metrics import ARTICLES_REQUESTED, ARTICLES_RETURNED
+from serialization import dumps, loads
+from serpapi_service import SerpAPIService
+
+
+@dataclass(slots=True)
+class Story:
+    """A news story as returned to the agent."""
+
+    title: str
+    description: str
+    source: str
+    published_at: str
+    language: str = "en"
+    cluster_size: int = 1  # Near-duplicate articles this story stands for
+
+    @classmethod
+    def from_article(cls, article: Dict[str, Any]) -> "Story":
+        """
+        Build a story from a converted SerpAPI article.
+
+        Args:
+            article: Article from SerpAPIService._convert_article_format
+
+        Returns:
+            Story with the agent-facing fields
+        """
+        source = article.get("source", "Unknown source")
+        if isinstance(source, dict):
+            # Some google_news engines return {"name": ..., "icon": ...}
+            source = source.get("name") or "Unknown source"
+        return cls(
+            title=article.get("title", "No title"),
+            description=article.get("description", "No description available"),
+            source=source,
+            published_at=article.get("published_at", ""),
+            cluster_size=article.get("cluster_size", 1),
+        )
+
+    def to_dict(self) -> Dict[str, str]:
+        return {
+            "title": self.title,
+            "description": self.description,
+            "source": self.source,
+            "published_at": self.published_at,
+            "language": self.language,
+            "cluster_size": self.cluster_size,
+        }
+
+
+@dataclass(slots=True)
+class NewsPage:
+    """Stories selected for one request and their rendered NewsResponse body."""
+
+    stories: Tuple[Story, ...]
+    body: bytes
+    etag: str
+    next_cursor: Optional[str] = None
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+# Cursor key of last resort, when neither a cursor secret nor a SerpAPI key is set
+_PROCESS_SECRET = secrets.token_bytes(32)
+_process_secret_warned = False
+
+
+def _cursor_secret() -> bytes:
+    """HMAC key for cursors; every worker must use the same one."""
+    global _process_secret_warned
+    if settings.news_cursor_secret:
+        return settings.news_cursor_secret.encode()
+    if settings.serpapi_api_key:
+        # Workers share the SerpAPI key, so a key derived from it is shared too
+        return hashlib.sha256(b"news-cursor\0" + settings.serpapi_api_key.encode()).digest()
+    if not _process_secret_warned:
+        _process_secret_warned = True
+        logger.warning("⚠️ No NEWS_CURSOR_SECRET or SERPAPI_API_KEY set, cursors only resolve on the worker that issued them")
+    return _PROCESS_SECRET
+
+
+def list_digest(articles: List[Dict[str, Any]]) -> str:
+    """Short hash identifying a ranked result list by its stories; the cursor store key."""
+    digest = hashlib.blake2b(digest_size=12)
+    for article in articles:
+        digest.update(f"{article.get('title', '')}\0{article.get('link', '')}\n".encode())
+    return digest.hexdigest()
+
+
+def encode_cursor(cache_key: Tuple, digest: str, offset: int) -> str:
+    """
+    Build a signed cursor for the stories of a stored list from ``offset`` on.
+
+    Args:
+        cache_key: Result-cache key of the query the list was served for
+        digest: list_digest of the list, its key in the cursor store
+        offset: Position of the first story of the next page
+
+    Returns:
+        URL-safe cursor ("<payload>.<signature>")
+    """
+    payload = _b64encode(dumps([list(cache_key), digest, offset]))
+    signature = hmac.new(_cursor_secret(), payload.encode(), hashlib.sha256).digest()[:16]
+    return f"{payload}.{_b64encode(signature)}"
+
+
+def decode_cursor(cursor: str) -> Optional[Tuple[Tuple, str, int]]:
+    """
+    Verify and decode a cursor.
+
+    Args:
+        cursor: Cursor from encode_cursor
+
+    Returns:
+        (cache key, list digest, offset), or None if the cursor is malformed
+        or its signature does not match
+    """
+    payload, _, signature = cursor.partition(".")
+    try:
+        expected = hmac.new(_cursor_secret(), payload.encode(), hashlib.sha256).digest()[:16]
+        if not hmac.compare_digest(_b64decode(signature), expected):
+            return None
+        cache_key, digest, offset = loads(_b64decode(payload))
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(offset, int) or offset < 1 or not isinstance(digest, str):
+        return None
+    return tuple(cache_key), digest, offset
+
+
+def render_news_response(stories: Tuple[Story, ...], next_cursor: Optional[str] = None) -> bytes:
+    """
+    Encode stories in the NewsResponse JSON shape.
+
+    Args:
+        stories: Stories to return
+        next_cursor: Cursor for the following page, if any stories are left
+
+    Returns:
+        UTF-8 JSON bytes
+    """
+    return dumps({
+        "success": True,
+        "stories": [story.to_dict() for story in stories],
+        "total_count": len(stories),
+        "language": "en",
+        "locale": None,
+        "categories": None,
+        "next_cursor": next_cursor,
+    })
+
+
+class NewsPipeline:
+    """Fetches, formats and renders top news for a query."""
+
+    def __init__(self, service: SerpAPIService, maxsize: Optional[int] = None, cursor_store: Optional[Any] = None):
+        """
+        Args:
+            service: SerpAPI service providing the ranked articles
+            maxsize: Rendered responses kept (defaults to settings.news_response_cache_maxsize)
+            cursor_store: Cache (TTLCache or TieredCache) keeping the lists
+                cursors page through. Defaults to an in-process TTLCache
+                sized from settings.
+        """
+        self.service = service
+        self.maxsize = settings.news_response_cache_maxsize if maxsize is None else maxsize
+        self.cursor_store = cursor_store if cursor_store is not None else TTLCache(
+            maxsize=settings.news_cursor_store_maxsize, ttl=settings.news_cursor_ttl, name="news-cursors"
+        )
+        # (query, limit) -> (ranked article list the page was built from, page,
+        # monotonic time the list was last written to the cursor store)
+        self._rendered: "OrderedDict[Hashable, Tuple[List[Dict[str, Any]], NewsPage, float]]" = OrderedDict()
+
+        # Statistics
+        self.hits = 0
+        self.misses = 0
+
+    async def top_stories(self, q: str, limit: int, raise_errors: bool = False) -> NewsPage:
+        """
+        Return the ``limit`` most recent stories for query ``q``.
+
+        Args:
+            q: Direct search query for SerpAPI
+            limit: Number of stories (1-50)
+            raise_errors: Raise upstream errors instead of returning no stories
+
+        Returns:
+            NewsPage with the stories and the encoded response body
+        """
+        articles = await self.service.get_ranked_articles(q=q, limit=limit, raise_errors=raise_errors)
+        ARTICLES_REQUESTED.observe(limit)
+
+        key = (q, limit)
+        now = time.monotonic()
+        entry = self._rendered.get(key)
+        if entry is not None and entry[0] is articles:
+            # Same cached result list as last time: reuse the encoded bytes
+            self.hits += 1
+            self._rendered.move_to_end(key)
+            page, stored = entry[1], entry[2]
+            if page.next_cursor and now - stored > self.cursor_store.ttl / 2:
+                # Keep the list in the cursor store as long as pages point into it
+                await self._store_list(list_digest(articles), articles)
+                self._rendered[key] = (articles, page, now)
+        else:
+            self.misses += 1
+            digest = list_digest(articles) if len(articles) > limit else ""
+            page = self._render_page(self.service.cache_key_for(q), digest, articles, 0, limit)
+            if page.next_cursor:
+                await self._store_list(digest, articles)
+            if articles and self.maxsize > 0:
+                self._rendered[key] = (articles, page, now)
+                self._rendered.move_to_end(key)
+                while len(self._rendered) > self.maxsize:
+                    self._rendered.popitem(last=False)
+
+        ARTICLES_RETURNED.observe(len(page.stories))
+        logger.log(DETAIL, "📊 Returning {} latest articles (size={})", len(page.stories), limit)
+        return page
+
+    async def more_stories(self, cursor: str, limit: int, q: str) -> Optional[NewsPage]:
+        """
+        Return the page after the one that handed out ``cursor``.
+
+        Args:
+            cursor: ``next_cursor`` of a previous page, issued by any worker
+            limit: Number of stories (1-50)
+            q: Query the cursor is sent with; must be the one it was issued for
+
+        Returns:
+            NewsPage continuing the served list, or None if the cursor is
+            invalid, was issued for another query, or its list has expired
+        """
+        decoded = decode_cursor(cursor)
+        if decoded is None:
+            logger.warning("⚠️ Rejected a malformed or forged news cursor")
+            return None
+        cache_key, digest, offset = decoded
+        if cache_key != self.service.cache_key_for(q):
+            logger.warning(f"⚠️ Rejected a news cursor issued for another query than '{q}'")
+            return None
+        articles = await self.cursor_store.peek(digest)
+        if not articles or offset >= len(articles):
+            return None
+        ARTICLES_REQUESTED.observe(limit)
+        page = self._render_page(cache_key, digest, articles, offset, limit)
+        if page.next_cursor:
+            # An active session keeps its list
+            await self._store_list(digest, articles)
+        ARTICLES_RETURNED.observe(len(page.stories))
+        logger.log(DETAIL, "📊 Returning {} more articles from offset {} (size={})", len(page.stories), offset, limit)
+        return page
+
+    async def _store_list(self, digest: str, articles: List[Dict[str, Any]]) -> None:
+        async def load() -> List[Dict[str, Any]]:
+            return articles
+        await self.cursor_store.refresh(digest, load)
+
+    def _render_page(
+        self, cache_key: Tuple, digest: str, articles: List[Dict[str, Any]], offset: int, limit: int
+    ) -> NewsPage:
+        """Render ``articles[offset:offset + limit]``, with a cursor if more are left."""
+        end = offset + limit
+        stories = tuple(Story.from_article(article) for article in articles[offset:end])
+        next_cursor = encode_cursor(cache_key, digest, end) if end < len(articles) else None
+        body = render_news_response(stories, next_cursor)
+        # The body holds the stories and the (deterministic) cursor; the limit
+        # is added as a short list can render identically for several limits
+        etag = compute_etag(b"%d\n" % limit + body)
+        return NewsPage(stories=stories, body=body, etag=etag, next_cursor=next_cursor)
+
+    def stats(self) -> Dict[str, int]:
+        return {"size": len(self._rendered), "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,186 @@
+"""
+Canonical form of agent-generated news queries.
+
+The agent phrases the same request in many ways ("sports news Spain",
+"Spain Sports News", "es sports", "noticias deportivas de España hoy").
+Each variant used to be a separate cache entry and a separate billed
+SerpAPI search. ``canonicalize_query`` reduces a query to its keywords in
+their original order. It drops filler words ("latest", "today", "news") and
+appends countries and categories in a fixed order, under the names from the
+country and category tables below. It also detects Spanish queries, which
+are searched on google.es in Spanish.
+
+The canonical form is only a cache and coalescing key: SerpAPI is still
+searched with the agent's own words. Words that can carry meaning ("new",
+"top", "it") are never dropped, and bare two-letter country codes ("us",
+"de", "it") only count as countries when the query has no other keywords,
+so "New York news", "top gun" and "de Gaulle" keep their words.
+
+Canonicalization is idempotent, so a canonical query can be canonicalized
+again (e.g. by the prefetcher) without changing its cache key.
+"""
+
+import string
+from functools import lru_cache
+from typing import Dict, List, NamedTuple
+
+# Country codes and categories accepted by SerpAPIService
+COUNTRY_NAMES = {
+    "us": "United States",
+    "es": "Spain",
+    "uk": "United Kingdom",
+    "au": "Australia",
+    "ca": "Canada",
+    "fr": "France",
+    "de": "Germany",
+    "it": "Italy",
+    "jp": "Japan",
+    "in": "India",
+}
+
+CATEGORY_NAMES = {
+    "general": "news",
+    "sports": "sports",
+    "business": "business",
+    "health": "health",
+    "entertainment": "entertainment",
+    "tech": "technology",
+    "politics": "politics",
+    "science": "science",
+    "food": "food",
+    "travel": "travel",
+}
+
+SPANISH_COUNTRY_NAMES = {
+    "us": "Estados Unidos",
+    "es": "España",
+    "uk": "Reino Unido",
+    "au": "Australia",
+    "ca": "Canadá",
+    "fr": "Francia",
+    "de": "Alemania",
+    "it": "Italia",
+    "jp": "Japón",
+    "in": "India",
+}
+
+SPANISH_CATEGORY_NAMES = {
+    "sports": "deportes",
+    "business": "economía",
+    "health": "salud",
+    "entertainment": "espectáculos",
+    "tech": "tecnología",
+    "politics": "política",
+    "science": "ciencia",
+    "food": "gastronomía",
+    "travel": "viajes",
+}
+
+# SerpAPI language and domain parameters per query language
+LANGUAGE_PARAMS = {
+    "en": {"hl": "en", "lr": "lang_en", "google_domain": "google.com"},
+    "es": {"hl": "es", "lr": "lang_es", "google_domain": "google.es"},
+}
+
+_ENGLISH_FILLER = frozenset(
+    "a about an and any are at breaking by current for from general give headlines in is latest "
+    "me most news of on recent some stories the to today todays what whats with".split()
+)
+_SPANISH_FILLER = frozenset(
+    "actualidad al de del el en es generales hoy la las los noticia noticias para por recientes "
+    "sobre su sus ultimas últimas un una y".split()
+)
+# Words that mark a query as Spanish. Kept unambiguous: no word that also
+# appears in English queries ("la", "los", "de", "es", "del", "mundo", "sobre")
+_SPANISH_NAMES = {name.lower() for name in SPANISH_COUNTRY_NAMES.values() if name.lower() not in ("australia", "india")}
+_SPANISH_MARKERS = frozenset(
+    "actualidad cómo está hoy más noticia noticias qué recientes ultimas últimas".split()
+) | {name for name in _SPANISH_NAMES if " " not in name} \
+  | set(SPANISH_CATEGORY_NAMES.values()) | {"españa", "espana", "deportivas", "deportivo", "deporte"}
+# Multi-word markers ("reino unido"), matched against adjacent word pairs
+_SPANISH_PHRASES = frozenset(name for name in _SPANISH_NAMES if " " in name)
+
+_COUNTRY_ALIASES: Dict[str, str] = {
+    **{name.lower(): code for code, name in COUNTRY_NAMES.items()},
+    **{name.lower(): code for code, name in SPANISH_COUNTRY_NAMES.items()},
+    "usa": "us", "america": "us", "britain": "uk", "espana": "es",
+}
+# Two-letter codes, only recognised in English queries ("es", "de" are Spanish
+# words) and only when no other keyword is left ("de Gaulle", "IT industry")
+_COUNTRY_CODES = frozenset(COUNTRY_NAMES) - _ENGLISH_FILLER
+
+_CATEGORY_ALIASES: Dict[str, str] = {
+    **{key: key for key in CATEGORY_NAMES if key != "general"},
+    **{name: key for key, name in CATEGORY_NAMES.items() if key != "general"},
+    **{name: key for key, name in SPANISH_CATEGORY_NAMES.items()},
+    "sport": "sports", "political": "politics", "deporte": "sports", "deportivas": "sports",
+    "deportivo": "sports", "deportivos": "sports", "politica": "politics", "politicas": "politics",
+    "políticas": "politics", "economia": "business", "negocios": "business", "tecnologia": "tech",
+}
+
+_PUNCTUATION = str.maketrans({c: " " for c in string.punctuation + "¿¡«»“”‘’"})
+_MAX_WORDS = 2  # Words in the longest country alias ("estados unidos")
+
+
+class CanonicalQuery(NamedTuple):
+    """Canonical search query and the language it is searched in."""
+
+    q: str
+    language: str
+
+
+@lru_cache(maxsize=4096)
+def canonicalize_query(q: str) -> CanonicalQuery:
+    """
+    Reduce a news query to its canonical form.
+
+    Args:
+        q: Query as sent by the agent
+
+    Returns:
+        CanonicalQuery with the keywords in their original order followed by
+        countries and categories in a fixed order, and "es" or "en". The
+        canonical query is a cache key, not the text to search for.
+    """
+    words = q.lower().translate(_PUNCTUATION).split()
+    spanish = any(word in _SPANISH_MARKERS for word in words) or any(
+        f"{first} {second}" in _SPANISH_PHRASES for first, second in zip(words, words[1:])
+    )
+    filler = _SPANISH_FILLER if spanish else _ENGLISH_FILLER
+
+    keywords: List[str] = []
+    countries = set()
+    categories = set()
+    i = 0
+    while i < len(words):
+        # Multi-word country names first ("united states", "estados unidos")
+        for size in range(min(_MAX_WORDS, len(words) - i), 1, -1):
+            code = _COUNTRY_ALIASES.get(" ".join(words[i:i + size]))
+            if code is not None:
+                countries.add(code)
+                i += size
+                break
+        else:
+            word = words[i]
+            i += 1
+            if word in _COUNTRY_ALIASES:
+                countries.add(_COUNTRY_ALIASES[word])
+            elif word in _CATEGORY_ALIASES:
+                categories.add(_CATEGORY_ALIASES[word])
+            elif word not in filler and word not in keywords:
+                keywords.append(word)
+
+    # A bare code is a country only when it is the whole query ("us politics")
+    if not spanish and keywords and all(word in _COUNTRY_CODES for word in keywords):
+        countries.update(keywords)
+        keywords = []
+
+    if spanish:
+        parts = ["noticias"] + keywords
+        parts += sorted(SPANISH_COUNTRY_NAMES[code] for code in countries)
+        parts += sorted(SPANISH_CATEGORY_NAMES[key] for key in categories)
+        return CanonicalQuery(" ".join(parts), "es")
+
+    parts = keywords + sorted(COUNTRY_NAMES[code] for code in countries)
+    parts += sorted(CATEGORY_NAMES[key] for key in categories)
+    return CanonicalQuery(" ".join(parts) or "news", "en")
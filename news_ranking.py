@@ -0,0 +1,150 @@
+"""
+Ranking stage for SerpAPI news results: date parsing and most-recent-first selection.
+
+All date strings in a batch are parsed against one reference timestamp with a
+single precompiled pattern for relative dates ("3 hours ago") and a small set
+of absolute formats SerpAPI returns ("Sep 15, 2025", "09/15/2025, 07:00 AM,
++0000 UTC"). Identical strings are parsed once per batch, and when only the
+top ``k`` articles are needed a heap selection replaces the full sort.
+Absolute dates do not depend on the reference time and are memoized.
+"""
+
+import functools
+import heapq
+import re
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+# Sort key for articles without a parseable date (they go last)
+UNDATED = float("-inf")
+
+_RELATIVE_RE = re.compile(
+    r"(\d+)\s*(minutes?|mins?|hours?|hrs?|days?|d|weeks?|w|months?|mo|years?|y)\s+ago"
+)
+
+# Seconds per relative unit (months and years are approximate, as before)
+_UNIT_SECONDS = {
+    "minute": 60, "minutes": 60, "min": 60, "mins": 60,
+    "hour": 3600, "hours": 3600, "hr": 3600, "hrs": 3600,
+    "day": 86400, "days": 86400, "d": 86400,
+    "week": 604800, "weeks": 604800, "w": 604800,
+    "month": 30 * 86400, "months": 30 * 86400, "mo": 30 * 86400,
+    "year": 365 * 86400, "years": 365 * 86400, "y": 365 * 86400,
+}
+
+_KEYWORDS = {
+    "just now": 0,
+    "yesterday": 86400,
+}
+
+# Absolute formats, most common first. SerpAPI's google_news engines return
+# "Sep 15, 2025" and "09/15/2025, 07:00 AM, +0000 UTC".
+_NAIVE_FORMATS = ("%b %d, %Y", "%B %d, %Y", "%Y-%m-%d", "%m/%d/%Y", "%d/%m/%Y")
+_UTC_FORMAT = "%m/%d/%Y, %I:%M %p, %z UTC"
+
+
+def parse_timestamp(date_str: str, now: float) -> float:
+    """
+    Parse a SerpAPI date string into a POSIX timestamp.
+
+    Args:
+        date_str: Date string in any of the supported formats
+        now: Reference timestamp for relative dates
+
+    Returns:
+        Timestamp, or UNDATED if the string cannot be parsed
+    """
+    if not date_str:
+        return UNDATED
+
+    lowered = date_str.lower()
+    if lowered.endswith("ago"):
+        match = _RELATIVE_RE.search(lowered)
+        if match:
+            return now - int(match.group(1)) * _UNIT_SECONDS[match.group(2)]
+        return UNDATED
+
+    if lowered in _KEYWORDS:
+        return now - _KEYWORDS[lowered]
+
+    return _parse_absolute(date_str)
+
+
+@functools.lru_cache(maxsize=4096)
+def _parse_absolute(date_str: str) -> float:
+    """Parse an absolute date string (independent of the reference time, so memoized)."""
+    lowered = date_str.lower()
+    if lowered.endswith(" utc"):
+        try:
+            return datetime.strptime(date_str, _UTC_FORMAT).timestamp()
+        except ValueError:
+            pass
+
+    if "t" in lowered[:11] and lowered[:4].isdigit():
+        try:
+            parsed = datetime.fromisoformat(date_str.replace("Z", "+00:00"))
+            return parsed.timestamp()
+        except ValueError:
+            pass
+
+    for fmt in _NAIVE_FORMATS:
+        try:
+            return datetime.strptime(date_str, fmt).timestamp()
+        except ValueError:
+            continue
+
+    return UNDATED
+
+
+def parse_datetime(date_str: str, now: Optional[float] = None) -> Optional[datetime]:
+    """
+    Parse a SerpAPI date string into a naive local datetime.
+
+    Args:
+        date_str: Date string in any of the supported formats
+        now: Reference timestamp for relative dates (defaults to time.time())
+
+    Returns:
+        datetime object or None if parsing fails
+    """
+    timestamp = parse_timestamp(date_str, time.time() if now is None else now)
+    if timestamp == UNDATED:
+        return None
+    return datetime.fromtimestamp(timestamp)
+
+
+def rank_articles(
+    articles: List[Dict[str, Any]],
+    k: Optional[int] = None,
+    now: Optional[float] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Order articles most recent first.
+
+    Args:
+        articles: Articles with a 'published_at' field
+        k: Only return the ``k`` most recent articles (heap selection)
+        now: Reference timestamp for relative dates (defaults to time.time())
+
+    Returns:
+        Articles sorted by date (most recent first); undated articles last
+        and ties in their original order
+    """
+    if now is None:
+        now = time.time()
+
+    parsed: Dict[str, float] = {}
+    keys = []
+    for article in articles:
+        published_at = article.get("published_at") or ""
+        timestamp = parsed.get(published_at)
+        if timestamp is None:
+            timestamp = parsed[published_at] = parse_timestamp(published_at, now)
+        keys.append(timestamp)
+
+    if k is not None and k < len(articles):
+        order = heapq.nlargest(k, range(len(articles)), key=keys.__getitem__)
+    else:
+        order = sorted(range(len(articles)), key=keys.__getitem__, reverse=True)
+    return [articles[i] for i in order]
@@ -0,0 +1,185 @@
+"""
+Background prefetch scheduler for hot news queries.
+
+Query popularity is tracked from /api/v1/news/top traffic with exponential
+decay. A background task periodically refreshes the most popular queries
+through SerpAPIService shortly before their cached results go stale, within
+an hourly SerpAPI budget, so the first news request of a session is served
+from a warm cache.
+"""
+
+import asyncio
+import math
+import random
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+from loguru import logger
+from config import settings
+from serpapi_service import SerpAPIService
+from quota import QuotaExceededError
+
+
+class NewsPrefetcher:
+    """Tracks news query popularity and keeps the hottest queries warm."""
+
+    def __init__(self, service: SerpAPIService):
+        """
+        Args:
+            service: SerpAPI service whose cache is kept warm
+        """
+        self.service = service
+        self.top_n = settings.prefetch_top_n
+        self.interval = settings.prefetch_interval
+        self.jitter = settings.prefetch_jitter
+        self.lead_time = settings.prefetch_lead_time
+        self.budget_per_hour = settings.prefetch_budget_per_hour
+        self.min_score = settings.prefetch_min_score
+        self._decay = math.log(2) / settings.prefetch_half_life
+
+        # canonical query -> (decayed score, last update time)
+        self._scores: Dict[str, Tuple[float, float]] = {}
+        # canonical query -> the agent's latest wording, which is what gets searched
+        self._queries: Dict[str, str] = {}
+        self._spent: Deque[float] = deque()
+        self._task: Optional[asyncio.Task] = None
+
+        # Statistics
+        self.refreshes = 0
+        self.failures = 0
+        self.skipped_budget = 0
+
+        for q in settings.prefetch_seed_queries:
+            self._queries.setdefault(service.canonical_query(q), q)
+        self.seed_queries = list(self._queries)
+
+    def record(self, q: str) -> None:
+        """
+        Count one request for query ``q``.
+
+        Args:
+            q: Search query as sent to SerpAPIService (counted under its canonical form)
+        """
+        query, q = q, self.service.canonical_query(q)
+        if q not in self.seed_queries:
+            self._queries[q] = query
+        now = time.monotonic()
+        score, updated = self._scores.get(q, (0.0, now))
+        self._scores[q] = (score * math.exp(-self._decay * (now - updated)) + 1.0, now)
+        if len(self._scores) > settings.prefetch_max_tracked:
+            self._prune(now)
+
+    def hot_queries(self, n: Optional[int] = None) -> List[str]:
+        """
+        Return the most popular queries, hottest first.
+
+        Args:
+            n: Number of queries (defaults to settings.prefetch_top_n)
+
+        Returns:
+            Canonical seed queries, then canonical queries whose decayed score
+            is at least settings.prefetch_min_score
+        """
+        now = time.monotonic()
+        scored = [(self._current(q, now), q) for q in self._scores if q not in self.seed_queries]
+        scored = [item for item in scored if item[0] >= self.min_score]
+        scored.sort(reverse=True)
+        return (self.seed_queries + [q for _, q in scored])[: n or self.top_n]
+
+    def _current(self, q: str, now: float) -> float:
+        score, updated = self._scores[q]
+        return score * math.exp(-self._decay * (now - updated))
+
+    def _prune(self, now: float) -> None:
+        """Drop the coldest half of the tracked queries."""
+        ranked = sorted(self._scores, key=lambda q: self._current(q, now), reverse=True)
+        for q in ranked[len(ranked) // 2:]:
+            del self._scores[q]
+            if q not in self.seed_queries:
+                self._queries.pop(q, None)
+
+    def _budget_left(self) -> int:
+        cutoff = time.monotonic() - 3600
+        while self._spent and self._spent[0] < cutoff:
+            self._spent.popleft()
+        return self.budget_per_hour - len(self._spent)
+
+    async def run_once(self) -> int:
+        """
+        Refresh hot queries that are uncached or about to go stale.
+
+        Returns:
+            Number of queries refreshed (none while the result cache is disabled)
+        """
+        if not self.service.cache.enabled:
+            # Nothing would keep the results: every refresh would be a wasted search
+            return 0
+        refreshed = 0
+        for canonical in self.hot_queries():
+            q = self._queries.get(canonical, canonical)
+            fresh_for = self.service.cache_fresh_for(q)
+            if fresh_for is not None and fresh_for > self.lead_time:
+                continue
+            if self._budget_left() <= 0:
+                self.skipped_budget += 1
+                logger.debug(f"⏸️ Prefetch budget exhausted, skipping '{q}'")
+                break
+            self._spent.append(time.monotonic())
+            try:
+                count = await self.service.refresh_news(q)
+                self.refreshes += 1
+                refreshed += 1
+                logger.info(f"🔥 Prefetched '{q}' ({count} articles)")
+            except QuotaExceededError:
+                # The SerpAPI quota is reserved for live requests right now
+                self.skipped_budget += 1
+                logger.debug(f"⏸️ SerpAPI quota reserved for live requests, skipping '{q}'")
+                break
+            except Exception as e:
+                self.failures += 1
+                logger.warning(f"⚠️ Prefetch failed for '{q}': {e}")
+        return refreshed
+
+    def start(self) -> None:
+        """Start the background prefetch loop (not while the result cache is disabled)."""
+        if not self.service.cache.enabled:
+            logger.info("🔥 News prefetcher not started: the news result cache is disabled")
+            return
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+            logger.info(
+                f"🔥 News prefetcher started (top_n={self.top_n}, interval={self.interval:.0f}s, "
+                f"budget={self.budget_per_hour}/h)"
+            )
+
+    async def stop(self) -> None:
+        """Stop the background prefetch loop."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            # Jitter spreads refreshes across workers and avoids lockstep bursts
+            delay = self.interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+            await asyncio.sleep(delay)
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Prefetch cycle failed: {e}")
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "tracked": len(self._scores),
+            "refreshes": self.refreshes,
+            "failures": self.failures,
+            "skipped_budget": self.skipped_budget,
+            "budget_left": self._budget_left(),
+        }
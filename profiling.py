@@ -0,0 +1,263 @@
+"""
+Opt-in request profiling and an event-loop lag monitor.
+
+``RequestProfiler`` samples the event-loop thread's Python stack from a
+background thread while one request is handled, and stores the samples as
+collapsed stacks ("frame;frame;frame count" per line). That format is read
+by flamegraph.pl, speedscope and most other flame graph viewers. Time spent
+waiting on an upstream shows up as the event loop idling in its selector.
+Other requests handled at the same time on the same loop are sampled too.
+
+``LoopLagMonitor`` runs a heartbeat task on the event loop and a watchdog
+thread. When the heartbeat is late by more than the threshold, the watchdog
+logs the stack of whatever is blocking the loop at that moment, and the
+heartbeat records the full stall once the loop is back.
+"""
+
+import asyncio
+import os
+import secrets
+import sys
+import threading
+import time
+import traceback
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass
+from types import FrameType
+from typing import Any, Dict, List, Optional
+
+from loguru import logger
+
+from config import settings
+from metrics import Counter, Histogram, registry
+
+LOOP_LAG = registry.register(Histogram(
+    "event_loop_lag_seconds",
+    "Delay of the event-loop heartbeat beyond its scheduled time.",
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+))
+LOOP_STALLS = registry.register(Counter(
+    "event_loop_stalls_total",
+    "Event-loop stalls longer than the lag monitor's threshold.",
+))
+
+
+def _frame_label(frame: FrameType) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def collapse_stack(frame: Optional[FrameType]) -> str:
+    """
+    Collapsed form of a stack, outermost frame first.
+
+    Args:
+        frame: Innermost frame
+
+    Returns:
+        Frame labels joined by ";"
+    """
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+@dataclass(slots=True)
+class Profile:
+    """Collapsed-stack samples of one profiled request."""
+
+    id: str
+    method: str
+    path: str
+    started_at: float
+    duration: float
+    samples: int
+    collapsed: str
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration * 1000, 2),
+            "samples": self.samples,
+        }
+
+
+class _Sampler(threading.Thread):
+    """Samples one thread's stack at a fixed interval until stopped."""
+
+    def __init__(self, thread_id: int, interval: float):
+        super().__init__(name="request-profiler", daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.counts: Dict[str, int] = defaultdict(int)
+        self._stopped = threading.Event()
+
+    def run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.counts[collapse_stack(frame)] += 1
+
+    def stop(self) -> Dict[str, int]:
+        self._stopped.set()
+        self.join()
+        return self.counts
+
+
+class RequestProfiler:
+    """Profiles single requests on demand and keeps the latest profiles."""
+
+    def __init__(self, interval: Optional[float] = None, maxsize: Optional[int] = None):
+        """
+        Args:
+            interval: Seconds between stack samples (defaults to settings.profiling_interval)
+            maxsize: Profiles kept for download (defaults to settings.profiling_max_profiles)
+        """
+        self.interval = settings.profiling_interval if interval is None else interval
+        self.maxsize = settings.profiling_max_profiles if maxsize is None else maxsize
+        self.profiles: "OrderedDict[str, Profile]" = OrderedDict()
+        self._sampler: Optional[_Sampler] = None
+
+    @property
+    def busy(self) -> bool:
+        """True while a request is being profiled (one at a time, as all share the loop thread)."""
+        return self._sampler is not None
+
+    def start(self) -> bool:
+        """
+        Start sampling the calling (event-loop) thread.
+
+        Returns:
+            False if another request is being profiled
+        """
+        if self._sampler is not None:
+            return False
+        self._sampler = _Sampler(threading.get_ident(), self.interval)
+        self._sampler.start()
+        return True
+
+    def stop(self, method: str, path: str, started_at: float, duration: float) -> Profile:
+        """
+        Stop sampling and store the profile.
+
+        Args:
+            method: HTTP method of the profiled request
+            path: Request path
+            started_at: UNIX time the request started
+            duration: Request duration in seconds
+
+        Returns:
+            The stored profile
+        """
+        sampler, self._sampler = self._sampler, None
+        counts = sampler.stop()
+        profile = Profile(
+            id=secrets.token_hex(8),
+            method=method,
+            path=path,
+            started_at=started_at,
+            duration=duration,
+            samples=sum(counts.values()),
+            collapsed="".join(f"{stack} {count}\n" for stack, count in sorted(counts.items())),
+        )
+        self.profiles[profile.id] = profile
+        while len(self.profiles) > self.maxsize:
+            self.profiles.popitem(last=False)
+        logger.info(f"🔥 Profiled {method} {path}: {profile.samples} samples in {duration * 1000:.1f} ms (id={profile.id})")
+        return profile
+
+    def get(self, profile_id: str) -> Optional[Profile]:
+        return self.profiles.get(profile_id)
+
+    def summaries(self) -> List[Dict[str, Any]]:
+        """Summaries of the stored profiles, newest first."""
+        return [profile.summary() for profile in reversed(self.profiles.values())]
+
+
+class LoopLagMonitor:
+    """Detects event-loop stalls and logs the stack that caused them."""
+
+    def __init__(self, threshold: Optional[float] = None, interval: Optional[float] = None):
+        """
+        Args:
+            threshold: Stall length in seconds worth logging (defaults to settings.loop_lag_threshold)
+            interval: Heartbeat period in seconds (defaults to settings.loop_lag_interval)
+        """
+        self.threshold = settings.loop_lag_threshold if threshold is None else threshold
+        self.interval = settings.loop_lag_interval if interval is None else interval
+        self._beat = time.monotonic()
+        self._loop_thread: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+        # Statistics
+        self.stalls = 0
+        self.max_lag = 0.0
+
+    def start(self) -> None:
+        """Start the heartbeat and the watchdog thread (no-op if running)."""
+        if self._task is not None and not self._task.done():
+            return
+        self._loop_thread = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.create_task(self._heartbeat())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-lag-watchdog", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        """Stop the heartbeat and the watchdog thread."""
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._watchdog is not None:
+            await asyncio.to_thread(self._watchdog.join)
+            self._watchdog = None
+
+    async def _heartbeat(self) -> None:
+        while True:
+            scheduled = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self._beat = now
+            lag = max(0.0, now - scheduled)
+            LOOP_LAG.observe(lag)
+            if lag > self.threshold:
+                self.stalls += 1
+                self.max_lag = max(self.max_lag, lag)
+                LOOP_STALLS.inc()
+                logger.warning(f"🐢 Event loop was blocked for {lag * 1000:.0f} ms")
+
+    def _watch(self) -> None:
+        """Watchdog thread: capture the loop's stack while a stall is in progress."""
+        reported = None
+        while not self._stopped.wait(self.threshold / 2):
+            beat = self._beat
+            if time.monotonic() - beat <= self.interval + self.threshold or beat == reported:
+                continue
+            frame = sys._current_frames().get(self._loop_thread)
+            if frame is None or frame.f_code.co_filename.endswith("selectors.py"):
+                # Idle in the selector: the loop is not blocked, it was starved
+                # (e.g. another thread holding the GIL); keep watching
+                continue
+            # Report each stall once, while the blocking code is still running
+            reported = beat
+            # Innermost frames: the blocking coroutine and what it called
+            stack = "".join(traceback.format_list(traceback.extract_stack(frame)[-settings.loop_lag_stack_depth:]))
+            logger.warning(
+                f"🐢 Event loop blocked for over {self.threshold * 1000:.0f} ms, currently in:\n{stack.rstrip()}"
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        return {"stalls": self.stalls, "max_lag_ms": round(self.max_lag * 1000, 2)}
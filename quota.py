@@ -0,0 +1,221 @@
+"""
+Quota-aware scheduling of outbound SerpAPI searches.
+
+SerpAPI bills every search, so outbound calls pass through a token bucket
+refilled at the rate allowed by the configured monthly and/or hourly quota.
+Callers that find the bucket empty wait in a bounded priority queue where
+live user requests are served before background work (prefetching and
+stale-while-revalidate refreshes). Background work may not dip into a
+reserve of tokens kept for live traffic. A caller that would wait longer
+than its priority allows is rejected at once with ``QuotaExceededError``,
+and the service answers from its cache instead.
+"""
+
+import asyncio
+import heapq
+import itertools
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from loguru import logger
+
+from cache import in_background_refresh
+from metrics import Counter, Gauge, registry
+from resilience import UpstreamUnavailable
+
+# Priority classes (lower is served first)
+LIVE = 0
+BACKGROUND = 1
+PRIORITY_NAMES = {LIVE: "live", BACKGROUND: "background"}
+
+QUOTA_DECISIONS = registry.register(Counter(
+    "upstream_quota_decisions_total",
+    "Quota scheduler decisions by upstream, priority and outcome.",
+    ("upstream", "priority", "outcome"),
+))
+QUOTA_TOKENS = registry.register(Gauge(
+    "upstream_quota_tokens",
+    "Tokens left in the quota bucket after the last decision.",
+    ("upstream",),
+))
+QUOTA_QUEUE = registry.register(Gauge(
+    "upstream_quota_queue_depth",
+    "Calls waiting for a quota token.",
+    ("upstream",),
+))
+
+_priority: ContextVar[int] = ContextVar("upstream_priority", default=LIVE)
+
+
+class QuotaExceededError(UpstreamUnavailable):
+    """Raised when no quota token can be granted in time."""
+
+
+def current_priority() -> int:
+    """Priority of the calling task: BACKGROUND inside cache refreshes and ``background_priority()``."""
+    if in_background_refresh.get():
+        return BACKGROUND
+    return _priority.get()
+
+
+@contextmanager
+def background_priority() -> Iterator[None]:
+    """Run the enclosed upstream calls (and tasks started from them) at BACKGROUND priority."""
+    token = _priority.set(BACKGROUND)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def quota_rate(monthly: int, hourly: int) -> float:
+    """
+    Tokens per second allowed by the configured quotas (0 means unlimited).
+
+    Args:
+        monthly: Searches per month (0 if not limited)
+        hourly: Searches per hour (0 if not limited)
+
+    Returns:
+        The stricter of the two rates, or 0.0 if neither is set
+    """
+    rates = []
+    if monthly > 0:
+        rates.append(monthly / (30 * 86400))
+    if hourly > 0:
+        rates.append(hourly / 3600)
+    return min(rates) if rates else 0.0
+
+
+class TokenBucketScheduler:
+    """Token bucket with a bounded priority wait queue."""
+
+    def __init__(
+        self,
+        name: str,
+        rate: float,
+        burst: int,
+        queue_size: int,
+        max_wait: Dict[int, float],
+        background_reserve: int = 0,
+    ):
+        """
+        Args:
+            name: Upstream name used in logs and metrics
+            rate: Tokens added per second (0 disables the scheduler)
+            burst: Bucket capacity
+            queue_size: Maximum number of waiting callers
+            max_wait: Longest wait in seconds per priority class (0 means never wait)
+            background_reserve: Tokens background work must leave for live requests
+        """
+        self.name = name
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.queue_size = queue_size
+        self.max_wait = max_wait
+        self.background_reserve = min(background_reserve, self.burst - 1)
+        self.tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._dispatcher: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _available(self, priority: int) -> float:
+        return self.tokens - (self.background_reserve if priority == BACKGROUND else 0)
+
+    async def acquire(self, priority: Optional[int] = None) -> None:
+        """
+        Take one token, waiting in the priority queue if the bucket is empty.
+
+        Args:
+            priority: LIVE or BACKGROUND (defaults to the calling task's priority)
+
+        Raises:
+            QuotaExceededError: If the queue is full or the expected wait
+                exceeds the priority's maximum wait
+        """
+        if not self.enabled:
+            return
+        if priority is None:
+            priority = current_priority()
+        label = PRIORITY_NAMES[priority]
+
+        self._refill()
+        if not self._waiters and self._available(priority) >= 1:
+            self.tokens -= 1
+            QUOTA_DECISIONS.inc(self.name, label, "granted")
+            QUOTA_TOKENS.set(self.tokens, self.name)
+            return
+
+        max_wait = self.max_wait.get(priority, 0.0)
+        ahead = sum(1 for p, _, f in self._waiters if p <= priority and not f.done())
+        expected_wait = (ahead + 1 - self._available(priority)) / self.rate
+        if len(self._waiters) >= self.queue_size or expected_wait > max_wait:
+            QUOTA_DECISIONS.inc(self.name, label, "rejected")
+            logger.warning(
+                f"⏸️ {self.name}: quota exhausted, rejecting {label} call "
+                f"(tokens={self.tokens:.2f}, queued={len(self._waiters)}, wait~{expected_wait:.1f}s)"
+            )
+            raise QuotaExceededError(f"{self.name} quota exhausted")
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), future))
+        QUOTA_QUEUE.set(len(self._waiters), self.name)
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch())
+        try:
+            await asyncio.wait_for(future, max_wait)
+        except asyncio.TimeoutError:
+            QUOTA_DECISIONS.inc(self.name, label, "timed_out")
+            raise QuotaExceededError(f"{self.name} quota wait exceeded {max_wait:.1f}s")
+        QUOTA_DECISIONS.inc(self.name, label, "queued")
+
+    def refund(self) -> None:
+        """Return a token taken by acquire() for a call that never reached the upstream."""
+        if not self.enabled:
+            return
+        self._refill()
+        self.tokens = min(self.burst, self.tokens + 1)
+        QUOTA_TOKENS.set(self.tokens, self.name)
+        if self._waiters and (self._dispatcher is None or self._dispatcher.done()):
+            self._dispatcher = asyncio.create_task(self._dispatch())
+
+    async def _dispatch(self) -> None:
+        """Hand out tokens to waiters in priority order as the bucket refills."""
+        while self._waiters:
+            self._refill()
+            while self._waiters:
+                priority, _, future = self._waiters[0]
+                if future.done():  # cancelled or timed out
+                    heapq.heappop(self._waiters)
+                    continue
+                if self._available(priority) < 1:
+                    break
+                heapq.heappop(self._waiters)
+                self.tokens -= 1
+                future.set_result(None)
+            QUOTA_QUEUE.set(len(self._waiters), self.name)
+            QUOTA_TOKENS.set(self.tokens, self.name)
+            if self._waiters:
+                priority = self._waiters[0][0]
+                await asyncio.sleep(max(0.001, (1 - self._available(priority)) / self.rate))
+
+    def stats(self) -> Dict[str, Any]:
+        self._refill()
+        return {
+            "enabled": self.enabled,
+            "tokens": round(self.tokens, 2),
+            "rate_per_hour": round(self.rate * 3600, 2),
+            "queued": len(self._waiters),
+        }
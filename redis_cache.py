@@ -0,0 +1,337 @@
+"""
+Two-tier result cache: a short-lived in-process L1 in front of a shared L2.
+
+The L2 tier is normally Redis so several uvicorn workers share warm results.
+When Redis is unreachable the cache degrades to L1-only and retries the L2
+after ``redis_retry_interval`` seconds.
+"""
+
+import asyncio
+import time
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from loguru import logger
+
+import serialization
+from cache import Loader, TTLCache, in_background_refresh
+from config import settings
+
+
+class InMemoryBackend:
+    """In-process stand-in for Redis implementing the L2 backend interface."""
+
+    def __init__(self):
+        self._data: Dict[str, Tuple[bytes, float]] = {}
+
+    async def get(self, key: str) -> Optional[bytes]:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        payload, expires_at = item
+        if time.time() >= expires_at:
+            del self._data[key]
+            return None
+        return payload
+
+    async def set(self, key: str, payload: bytes, ttl: float) -> None:
+        self._data[key] = (payload, time.time() + ttl)
+
+    async def close(self) -> None:
+        self._data.clear()
+
+
+class RedisBackend:
+    """L2 backend storing payloads in Redis with a per-key expiry."""
+
+    def __init__(self, url: str, socket_timeout: float):
+        """
+        Args:
+            url: Redis connection URL
+            socket_timeout: Connect/read timeout in seconds, kept short so a
+                slow Redis never delays a request for long
+        """
+        import redis.asyncio as redis
+
+        self._redis = redis.Redis.from_url(
+            url,
+            socket_timeout=socket_timeout,
+            socket_connect_timeout=socket_timeout,
+        )
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self._redis.get(key)
+
+    async def set(self, key: str, payload: bytes, ttl: float) -> None:
+        await self._redis.set(key, payload, px=max(1, int(ttl * 1000)))
+
+    async def close(self) -> None:
+        await self._redis.aclose()
+
+
+class TieredCache:
+    """
+    Result cache with a short-lived local L1 in front of a shared L2 backend.
+
+    Exposes the same ``get_or_load`` interface as TTLCache. L2 payloads carry
+    their wall-clock freshness deadline, so stale-while-revalidate works
+    across workers: a stale L2 entry is served while one background refresh
+    reloads it.
+    """
+
+    def __init__(
+        self,
+        backend: Any,
+        namespace: str,
+        maxsize: int,
+        ttl: float,
+        stale_ttl: float = 0.0,
+        l1_ttl: Optional[float] = None,
+        retry_interval: Optional[float] = None,
+    ):
+        """
+        Args:
+            backend: L2 backend (RedisBackend or InMemoryBackend)
+            namespace: Key namespace, e.g. 'news' or 'audiobooks'
+            maxsize: Maximum number of L1 entries
+            ttl: Seconds an entry is considered fresh
+            stale_ttl: Extra seconds a stale entry may be served while refreshing
+            l1_ttl: Seconds an entry stays fresh in L1 before re-checking L2
+            retry_interval: Seconds to skip L2 after it fails
+        """
+        self.backend = backend
+        self.namespace = namespace
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.l1_ttl = settings.cache_l1_ttl if l1_ttl is None else l1_ttl
+        self.retry_interval = settings.redis_retry_interval if retry_interval is None else retry_interval
+        self.l1 = TTLCache(maxsize=maxsize, ttl=self.l1_ttl, stale_ttl=stale_ttl, name=f"{namespace}-l1")
+        self._refreshing: Dict[Hashable, asyncio.Task] = {}
+        self._deadlines: Dict[Hashable, float] = {}  # Wall-clock freshness per key
+        self._l2_down_until = 0.0
+
+        # Statistics
+        self.hits = 0
+        self.l2_hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.l2_errors = 0
+
+    @property
+    def enabled(self) -> bool:
+        return True
+
+    @property
+    def l2_available(self) -> bool:
+        return time.monotonic() >= self._l2_down_until
+
+    def __len__(self) -> int:
+        return len(self.l1)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the L1 value (fresh or stale) or ``default``."""
+        return self.l1.get(key, default)
+
+    async def peek(self, key: Hashable) -> Any:
+        """
+        Return the value from L1, or from L2 (as written by any worker), never loading it.
+
+        Args:
+            key: Cache key
+
+        Returns:
+            The cached value (fresh or stale), or None if neither tier has it
+        """
+        value = self.l1.get(key)
+        if value is not None:
+            return value
+        record = await self._l2_get(key)
+        return record[1] if record is not None else None
+
+    async def get_or_load(self, key: Hashable, loader: Loader) -> Any:
+        """
+        Return the cached value from L1 or L2, loading it on a miss.
+
+        Args:
+            key: Cache key
+            loader: Zero-argument coroutine function producing the value
+
+        Returns:
+            The cached or freshly loaded value
+        """
+        now = time.monotonic()
+        entry = self.l1.get_entry(key, now)
+        if entry is not None and entry.is_fresh(now):
+            self.hits += 1
+            return entry.value
+
+        record = await self._l2_get(key)
+        if record is not None:
+            fresh_until, value = record
+            self._set_deadline(key, fresh_until)
+            remaining = fresh_until - time.time()
+            if remaining > 0:
+                self.l2_hits += 1
+                self.l1.set(key, value, ttl=min(self.l1_ttl, remaining))
+            else:
+                self.stale_hits += 1
+                self.l1.set(key, value, ttl=0)
+                self._schedule_refresh(key, loader)
+            return value
+
+        if entry is not None:
+            # L2 missing or unreachable: keep serving the local copy
+            self.stale_hits += 1
+            self._schedule_refresh(key, loader)
+            return entry.value
+
+        self.misses += 1
+        value = await loader()
+        await self._store(key, value)
+        return value
+
+    def fresh_for(self, key: Hashable) -> Optional[float]:
+        """
+        Seconds until the entry for ``key`` goes stale, as last seen by this worker.
+
+        Returns:
+            Remaining freshness (negative once stale), or None if not cached locally
+        """
+        deadline = self._deadlines.get(key)
+        if deadline is None or self.l1.get_entry(key) is None:
+            return None
+        return deadline - time.time()
+
+    async def refresh(self, key: Hashable, loader: Loader) -> Any:
+        """
+        Reload and store the value for ``key`` in both tiers now.
+
+        Args:
+            key: Cache key
+            loader: Zero-argument coroutine function producing the value
+
+        Returns:
+            The freshly loaded value
+        """
+        value = await loader()
+        await self._store(key, value)
+        return value
+
+    def _set_deadline(self, key: Hashable, fresh_until: float) -> None:
+        self._deadlines[key] = fresh_until
+        if len(self._deadlines) > 2 * max(self.l1.maxsize, 1):
+            self._deadlines = {k: v for k, v in self._deadlines.items() if k in self.l1}
+
+    def _schedule_refresh(self, key: Hashable, loader: Loader) -> None:
+        if key in self._refreshing:
+            return
+        self._refreshing[key] = asyncio.create_task(self._refresh(key, loader))
+
+    async def _refresh(self, key: Hashable, loader: Loader) -> None:
+        in_background_refresh.set(True)
+        try:
+            value = await loader()
+            await self._store(key, value)
+            logger.debug(f"♻️ {self.namespace} cache: refreshed stale entry {key!r}")
+        except Exception as e:
+            logger.warning(f"⚠️ {self.namespace} cache: background refresh failed for {key!r}: {e}")
+        finally:
+            self._refreshing.pop(key, None)
+
+    async def _store(self, key: Hashable, value: Any) -> None:
+        """Write a value to L2 and L1. Without L2, L1 keeps it for the full TTL."""
+        stored = await self._l2_set(key, value)
+        self.l1.set(key, value, ttl=self.l1_ttl if stored else self.ttl)
+        self._set_deadline(key, time.time() + self.ttl)
+
+    def _redis_key(self, key: Hashable) -> str:
+        parts = key if isinstance(key, tuple) else (key,)
+        return f"{settings.redis_key_prefix}:{self.namespace}:" + "|".join(str(p) for p in parts)
+
+    async def _l2_get(self, key: Hashable) -> Optional[Tuple[float, Any]]:
+        if not self.l2_available:
+            return None
+        try:
+            payload = await self.backend.get(self._redis_key(key))
+        except Exception as e:
+            self._mark_l2_down(e)
+            return None
+        if payload is None:
+            return None
+        try:
+            fresh_until, value = serialization.unpack(payload)
+        except Exception as e:
+            logger.warning(f"⚠️ {self.namespace} cache: dropping undecodable L2 payload: {e}")
+            return None
+        return fresh_until, value
+
+    async def _l2_set(self, key: Hashable, value: Any) -> bool:
+        if not self.l2_available:
+            return False
+        payload = serialization.pack([time.time() + self.ttl, value])
+        try:
+            await self.backend.set(self._redis_key(key), payload, self.ttl + self.stale_ttl)
+        except Exception as e:
+            self._mark_l2_down(e)
+            return False
+        return True
+
+    def _mark_l2_down(self, error: Exception) -> None:
+        self.l2_errors += 1
+        if self.l2_available:
+            logger.warning(
+                f"⚠️ {self.namespace} cache: L2 unreachable ({error}), "
+                f"serving from L1 only for {self.retry_interval:.0f}s"
+            )
+        self._l2_down_until = time.monotonic() + self.retry_interval
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters for both tiers."""
+        return {
+            "size": len(self.l1),
+            "hits": self.hits,
+            "l2_hits": self.l2_hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "l2_errors": self.l2_errors,
+        }
+
+
+def build_l2_backend() -> Optional[Any]:
+    """
+    Create the shared L2 backend selected by ``settings.cache_backend``.
+
+    Returns:
+        RedisBackend for 'redis', or None for the in-process 'memory' backend
+    """
+    backend = settings.cache_backend.lower()
+    if backend == "redis":
+        logger.info(f"🗄️ Using Redis L2 result cache at {settings.redis_url}")
+        return RedisBackend(settings.redis_url, settings.redis_socket_timeout)
+    if backend != "memory":
+        logger.warning(f"⚠️ Unknown cache_backend '{settings.cache_backend}', using in-process cache only")
+    return None
+
+
+def build_result_cache(
+    backend: Optional[Any],
+    namespace: str,
+    maxsize: int,
+    ttl: float,
+    stale_ttl: float,
+):
+    """
+    Build a result cache, tiered over ``backend`` when one is configured.
+
+    Args:
+        backend: Shared L2 backend, or None for an in-process TTLCache
+        namespace: Key namespace, e.g. 'news' or 'audiobooks'
+        maxsize: Maximum number of in-process entries (0 disables caching)
+        ttl: Seconds an entry is considered fresh
+        stale_ttl: Extra seconds a stale entry may be served while refreshing
+
+    Returns:
+        TieredCache or TTLCache
+    """
+    if backend is None or maxsize <= 0:
+        return TTLCache(maxsize=maxsize, ttl=ttl, stale_ttl=stale_ttl, name=f"{namespace}-cache")
+    return TieredCache(backend, namespace, maxsize=maxsize, ttl=ttl, stale_ttl=stale_ttl)
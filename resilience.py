@@ -0,0 +1,301 @@
+"""
+Resilience layer for upstream calls: latency budget, circuit breaker and hedging.
+
+Every upstream call made through a ``ResilientCaller`` is bounded by a
+latency budget, so a slow SerpAPI or LibriVox cannot hold a voice turn for
+the full HTTP timeout. Consecutive failures open a per-upstream circuit
+breaker that fails fast until a recovery probe succeeds, and callers can
+fall back to the last good result for the same key meanwhile. Optionally a
+second, hedged request is sent once the first has taken longer than the
+recent p95 latency, and whichever answers first wins.
+"""
+
+import asyncio
+import time
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Hashable, Optional
+
+import httpx
+from loguru import logger
+
+from metrics import Counter, Gauge, registry
+
+CIRCUIT_STATE = registry.register(Gauge(
+    "upstream_circuit_state",
+    "Circuit breaker state per upstream (0 closed, 1 half-open, 2 open).",
+    ("upstream",),
+))
+RESILIENCE_EVENTS = registry.register(Counter(
+    "upstream_resilience_events_total",
+    "Budget timeouts, rejected calls, hedges and fallbacks per upstream.",
+    ("upstream", "event"),
+))
+HEDGE_DELAY = registry.register(Gauge(
+    "upstream_hedge_delay_seconds",
+    "Current delay before a hedged request is sent, per upstream.",
+    ("upstream",),
+))
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class UpstreamUnavailable(Exception):
+    """Raised when an upstream cannot answer within the resilience limits."""
+
+
+class CircuitOpenError(UpstreamUnavailable):
+    """Raised instead of calling an upstream whose circuit breaker is open."""
+
+
+class BudgetExceededError(UpstreamUnavailable):
+    """Raised when an upstream call does not finish within its latency budget."""
+
+
+def is_failure(exc: BaseException) -> bool:
+    """
+    Return True if ``exc`` should count against the upstream's health.
+
+    Client errors such as a 404 for an empty search say nothing about the
+    upstream's health; 5xx, 429 and 403 (SerpAPI quota) do, as do timeouts
+    and connection errors.
+    """
+    if isinstance(exc, httpx.HTTPStatusError):
+        status = exc.response.status_code
+    else:
+        status = getattr(exc, "status_code", None)
+    if status is None:
+        return True
+    return status >= 500 or status in (403, 429)
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    After ``failure_threshold`` consecutive failures the breaker opens and
+    rejects calls for ``recovery_time`` seconds. It then lets a single probe
+    call through (half-open): success closes it, failure re-opens it.
+    """
+
+    def __init__(self, name: str, failure_threshold: int, recovery_time: float):
+        """
+        Args:
+            name: Upstream name used in logs and metrics
+            failure_threshold: Consecutive failures that open the breaker (0 disables it)
+            recovery_time: Seconds to stay open before probing again
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_time = recovery_time
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        CIRCUIT_STATE.set(0, name)
+
+    def allow(self) -> bool:
+        """Return True if a call may be made now."""
+        if self.state == CLOSED or self.failure_threshold <= 0:
+            return True
+        if self.state == OPEN and time.monotonic() - self.opened_at >= self.recovery_time:
+            self._transition(HALF_OPEN)
+        if self.state == HALF_OPEN and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self._probing = False
+        if self.state != CLOSED:
+            self._transition(CLOSED)
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._probing = False
+        if self.state == HALF_OPEN or (
+            self.failure_threshold > 0 and self.state == CLOSED and self.failures >= self.failure_threshold
+        ):
+            self.opened_at = time.monotonic()
+            self._transition(OPEN)
+
+    def release(self) -> None:
+        """Give up a half-open probe that ended without a verdict (e.g. cancelled)."""
+        self._probing = False
+
+    def _transition(self, state: str) -> None:
+        logger.warning(f"🔌 {self.name}: circuit breaker {self.state} -> {state} (failures={self.failures})")
+        self.state = state
+        CIRCUIT_STATE.set(_STATE_VALUES[state], self.name)
+
+
+class LatencyTracker:
+    """Rolling window of recent call latencies."""
+
+    def __init__(self, window: int = 200):
+        self._samples: Deque[float] = deque(maxlen=window)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class ResilientCaller:
+    """Runs upstream calls under a latency budget, a circuit breaker and optional hedging."""
+
+    def __init__(
+        self,
+        name: str,
+        budget: float,
+        failure_threshold: int,
+        recovery_time: float,
+        hedge: bool = False,
+        hedge_quantile: float = 0.95,
+        hedge_min_delay: float = 0.1,
+        hedge_min_samples: int = 20,
+        last_good_maxsize: int = 256,
+    ):
+        """
+        Args:
+            name: Upstream name used in logs and metrics
+            budget: Seconds a call may take, including a hedged retry (0 disables)
+            failure_threshold: Consecutive failures that open the circuit breaker
+            recovery_time: Seconds the breaker stays open before probing
+            hedge: Send a second request when the first is slower than usual
+            hedge_quantile: Latency quantile after which the hedge is sent
+            hedge_min_delay: Lower bound for the hedge delay in seconds
+            hedge_min_samples: Latency samples needed before hedging starts
+            last_good_maxsize: Number of last good results kept for fallback
+        """
+        self.name = name
+        self.budget = budget
+        self.breaker = CircuitBreaker(name, failure_threshold, recovery_time)
+        self.latency = LatencyTracker()
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_min_samples = hedge_min_samples
+        self.last_good_maxsize = last_good_maxsize
+        self._last_good: "OrderedDict[Hashable, Any]" = OrderedDict()
+
+    async def call(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Call the upstream through the breaker, within the budget.
+
+        Args:
+            key: Request key under which the result is remembered for fallback
+            fn: Zero-argument coroutine function performing one upstream request
+
+        Returns:
+            The upstream result
+
+        Raises:
+            CircuitOpenError: If the breaker is open
+            BudgetExceededError: If the call took longer than the budget
+        """
+        if not self.breaker.allow():
+            RESILIENCE_EVENTS.inc(self.name, "rejected")
+            raise CircuitOpenError(f"{self.name} circuit breaker is open")
+
+        start = time.perf_counter()
+        try:
+            if self.budget > 0:
+                result = await asyncio.wait_for(self._attempt(fn), self.budget)
+            else:
+                result = await self._attempt(fn)
+        except asyncio.TimeoutError:
+            RESILIENCE_EVENTS.inc(self.name, "budget_exceeded")
+            self.breaker.record_failure()
+            raise BudgetExceededError(f"{self.name} did not answer within {self.budget:.1f}s")
+        except (asyncio.CancelledError, UpstreamUnavailable):
+            # Cancelled, or refused before the upstream was called (quota
+            # exhausted, shed by admission control): no verdict on its health
+            self.breaker.release()
+            raise
+        except Exception as e:
+            if is_failure(e):
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+            raise
+
+        self.latency.record(time.perf_counter() - start)
+        self.breaker.record_success()
+        self._remember(key, result)
+        return result
+
+    def last_good(self, key: Hashable) -> Any:
+        """
+        Return the last good result for ``key``, or None.
+
+        Counts a fallback when one is found.
+        """
+        value = self._last_good.get(key)
+        if value is not None:
+            RESILIENCE_EVENTS.inc(self.name, "fallback")
+        return value
+
+    def hedge_delay(self) -> Optional[float]:
+        """Seconds to wait before hedging, or None if hedging is off or not yet calibrated."""
+        if not self.hedge or len(self.latency) < self.hedge_min_samples:
+            return None
+        delay = max(self.hedge_min_delay, self.latency.quantile(self.hedge_quantile))
+        HEDGE_DELAY.set(delay, self.name)
+        return delay
+
+    async def _attempt(self, fn: Callable[[], Awaitable[Any]]) -> Any:
+        delay = self.hedge_delay()
+        if delay is None:
+            return await fn()
+
+        pending = {asyncio.ensure_future(fn())}
+        try:
+            done, pending = await asyncio.wait(pending, timeout=delay)
+            if done:
+                return done.pop().result()
+
+            RESILIENCE_EVENTS.inc(self.name, "hedged")
+            logger.debug(f"🏁 {self.name}: no answer after {delay * 1000:.0f} ms, sending hedged request")
+            hedged = asyncio.ensure_future(fn())
+            pending.add(hedged)
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedged:
+                            RESILIENCE_EVENTS.inc(self.name, "hedge_won")
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def _remember(self, key: Hashable, value: Any) -> None:
+        if self.last_good_maxsize <= 0:
+            return
+        self._last_good[key] = value
+        self._last_good.move_to_end(key)
+        while len(self._last_good) > self.last_good_maxsize:
+            self._last_good.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        p95 = self.latency.quantile(0.95)
+        delay = self.hedge_delay()
+        return {
+            "state": self.breaker.state,
+            "consecutive_failures": self.breaker.failures,
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+            "hedge_delay_ms": round(delay * 1000, 1) if delay is not None else None,
+            "last_good": len(self._last_good),
+        }
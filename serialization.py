@@ -0,0 +1,67 @@
+"""
+Fast JSON helpers and the compact binary payload format used for cached values.
+
+``orjson`` is used when installed and the standard library ``json`` module
+otherwise; both produce the same compact UTF-8 JSON.
+"""
+
+import json
+import zlib
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+# Payloads at least this large are zlib-compressed
+COMPRESS_THRESHOLD = 1024
+
+_RAW = b"j"
+_ZLIB = b"z"
+
+
+def dumps(value: Any) -> bytes:
+    """Serialize a value to compact JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def loads(data: bytes) -> Any:
+    """Deserialize JSON bytes."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def pack(value: Any) -> bytes:
+    """
+    Encode a value as a compact payload: a one-byte header followed by JSON,
+    zlib-compressed when larger than COMPRESS_THRESHOLD.
+
+    Args:
+        value: JSON-serializable value
+
+    Returns:
+        Encoded payload
+    """
+    body = dumps(value)
+    if len(body) >= COMPRESS_THRESHOLD:
+        return _ZLIB + zlib.compress(body, 1)
+    return _RAW + body
+
+
+def unpack(payload: bytes) -> Any:
+    """
+    Decode a payload produced by ``pack``.
+
+    Raises:
+        ValueError: If the payload header is unknown
+    """
+    header, body = payload[:1], payload[1:]
+    if header == _ZLIB:
+        return loads(zlib.decompress(body))
+    if header == _RAW:
+        return loads(body)
+    raise ValueError(f"Unknown cache payload header: {header!r}")
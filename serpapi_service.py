@@ -3,19 +3,84 @@ SerpAPI service for fetching news articles from Google News.
 """
 
 import httpx
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Awaitable, Optional, Tuple
 from loguru import logger
 from config import settings
-from datetime import datetime, timedelta
-import re
+from logging_config import DETAIL, redact
+from cache import TTLCache
+from single_flight import SingleFlight
+from metrics import ARTICLES_REQUESTED, ARTICLES_RETURNED, UPSTREAM_ERRORS, timed_upstream
+from admission import AdmissionController, UpstreamOverloaded
+from resilience import ResilientCaller, UpstreamUnavailable
+from quota import BACKGROUND, LIVE, TokenBucketScheduler, background_priority, quota_rate
+from news_ranking import parse_datetime, rank_articles
+from news_dedup import cluster_articles
+from news_filter import DEFAULT_NEGATIVE_TERMS, DEFAULT_POSITIVE_TERMS, ContentFilter
+from news_query import CATEGORY_NAMES, COUNTRY_NAMES, LANGUAGE_PARAMS, canonicalize_query
+from datetime import datetime
+
+
+class SerpAPIError(Exception):
+    """Raised when SerpAPI returns an error response."""
+    
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
 
 class SerpAPIService:
     """Service for interacting with the SerpAPI Google News."""
     
-    def __init__(self):
+    def __init__(self, client: Optional[httpx.AsyncClient] = None, cache: Optional[Any] = None):
+        """
+        Args:
+            client: Shared pooled client. When omitted a short-lived client is
+                created per request (e.g. when used outside the app lifespan).
+            cache: Result cache (TTLCache or TieredCache). Defaults to an
+                in-process TTLCache sized from settings.
+        """
         self.base_url = settings.serpapi_base_url
         self.api_key = settings.serpapi_api_key
-        self.timeout = settings.timeout
+        self.timeout = settings.serpapi_timeout
+        self.client = client
+        self.cache = cache if cache is not None else TTLCache(
+            maxsize=settings.news_cache_maxsize,
+            ttl=settings.news_cache_ttl,
+            stale_ttl=settings.news_cache_stale_ttl,
+            name="news-cache",
+        )
+        self.single_flight = SingleFlight(name="serpapi")
+        self.resilience = ResilientCaller(
+            "serpapi",
+            budget=settings.serpapi_budget,
+            failure_threshold=settings.breaker_failure_threshold,
+            recovery_time=settings.breaker_recovery_time,
+            hedge=settings.serpapi_hedge_enabled,
+            hedge_quantile=settings.hedge_quantile,
+            hedge_min_delay=settings.hedge_min_delay,
+            hedge_min_samples=settings.hedge_min_samples,
+            last_good_maxsize=settings.resilience_last_good_maxsize,
+        )
+        self.scheduler = TokenBucketScheduler(
+            "serpapi",
+            rate=quota_rate(settings.serpapi_quota_monthly, settings.serpapi_quota_hourly),
+            burst=settings.serpapi_quota_burst,
+            queue_size=settings.serpapi_quota_queue_size,
+            max_wait={LIVE: settings.serpapi_quota_live_max_wait, BACKGROUND: settings.serpapi_quota_background_max_wait},
+            background_reserve=settings.serpapi_quota_live_reserve,
+        )
+        self.admission = AdmissionController(
+            "serpapi",
+            max_concurrency=settings.serpapi_max_concurrency,
+            queue_size=settings.upstream_queue_size,
+            max_wait=settings.upstream_queue_max_wait,
+        )
+        self.content_filter = ContentFilter(
+            negative_terms=DEFAULT_NEGATIVE_TERMS + tuple(settings.news_filter_negative_terms),
+            positive_terms=DEFAULT_POSITIVE_TERMS + tuple(settings.news_filter_positive_terms),
+            negative_weight=settings.news_filter_negative_weight,
+            min_score=settings.news_filter_min_score,
+        )
         
     
     async def get_latest_news(
@@ -39,13 +104,204 @@ class SerpAPIService:
         Returns:
             List of news articles
         """
+        sorted_articles = await self.get_ranked_articles(country=country, category=category, q=q, limit=size)
+        
+        limited_articles = sorted_articles[:size]
+        ARTICLES_REQUESTED.observe(size)
+        ARTICLES_RETURNED.observe(len(limited_articles))
+        logger.log(DETAIL, "📊 Returning {} latest articles (size={})", len(limited_articles), size)
+        
+        return limited_articles
+    
+    async def get_ranked_articles(
+        self,
+        country: Optional[str] = None,
+        category: Optional[str] = None,
+        q: Optional[str] = None,
+        limit: Optional[int] = None,
+        raise_errors: bool = False
+    ) -> List[Dict[str, Any]]:
+        """
+        Return the full ranked result set for a query, most recent first.
+        
+        With caching enabled this is the cached list itself, so repeated
+        calls for a fresh entry return the same object; callers must not
+        modify it.
+        
+        Args:
+            country: Country code (e.g., 'us', 'es', 'au')
+            category: News category
+            q: Search query for specific keywords
+            limit: Number of articles the caller needs; only used to select
+                the top articles when caching is disabled
+            raise_errors: Raise upstream errors instead of returning an empty list
+            
+        Returns:
+            Ranked articles, or an empty list if SerpAPI failed
+            
+        Raises:
+            UpstreamOverloaded: If the call was shed by admission control and
+                no earlier result for the query is available
+            Exception: The upstream error, if SerpAPI failed and raise_errors is set
+        """
         if not self.api_key:
             logger.error("SerpAPI API key not configured")
             raise ValueError("SerpAPI API key not configured")
         
-        # Use the provided query directly
+        params = self._build_params(country=country, category=category, q=q)
+        cache_key = self._cache_key(params)
+        # Without the cache only the `limit` top articles are fetched, so the
+        # last good result of a call is only a fallback for the same limit
+        fallback_key = cache_key if self.cache.enabled else (cache_key, limit)
+        
+        try:
+            # The cache holds the full converted, sorted result set so every
+            # `size` requested for the same query is served from one entry.
+            # Concurrent misses for the same key share one upstream call.
+            if self.cache.enabled:
+                return await self.cache.get_or_load(cache_key, lambda: self._load(cache_key, params))
+            # No cache: concurrent identical requests still share one call,
+            # and only the `limit` most recent articles are selected
+            return await self.single_flight.do(
+                fallback_key,
+                lambda: self.resilience.call(fallback_key, lambda: self._fetch_articles(params, limit=limit))
+            )
+        except UpstreamOverloaded as e:
+            # Shed under load: an earlier result, or a fast 503 from the API
+            sorted_articles = self.resilience.last_good(fallback_key)
+            if sorted_articles is None:
+                raise
+            logger.warning(f"⚠️ SerpAPI overloaded ({e}), serving last good result for '{q}'")
+            return sorted_articles
+        except UpstreamUnavailable as e:
+            # Breaker open or budget exceeded: serve the last good result if any
+            sorted_articles = self.resilience.last_good(fallback_key)
+            if sorted_articles is None:
+                logger.error(f"SerpAPI unavailable: {e}")
+                if raise_errors:
+                    raise
+                return []
+            logger.warning(f"⚠️ SerpAPI unavailable ({e}), serving last good result for '{q}'")
+            return sorted_articles
+        except SerpAPIError as e:
+            logger.error(f"SerpAPI error: {e}")
+            if raise_errors:
+                raise
+            return []
+        except httpx.TimeoutException:
+            logger.error("SerpAPI request timed out")
+            if raise_errors:
+                raise
+            return []
+        except httpx.RequestError as e:
+            logger.error(f"SerpAPI request error: {e}")
+            if raise_errors:
+                raise
+            return []
+        except Exception as e:
+            logger.error(f"Unexpected error in SerpAPI: {e}")
+            if raise_errors:
+                raise
+            return []
+    
+    def canonical_query(self, q: str) -> str:
+        """
+        Return the search query that results for ``q`` are cached under.
+        
+        Args:
+            q: Search query as sent by the agent
+            
+        Returns:
+            Canonical query (``q`` itself when canonicalization is disabled)
+        """
+        return self._cache_key(self._build_params(q=q))[0]
+    
+    def cache_key_for(self, q: str) -> Tuple[str, str, str, str]:
+        """
+        Return the result-cache key of query ``q``.
+        
+        Args:
+            q: Search query
+            
+        Returns:
+            Tuple of (canonical query, hl, lr, google_domain)
+        """
+        return self._cache_key(self._build_params(q=q))
+    
+    def cache_fresh_for(self, q: str) -> Optional[float]:
+        """
+        Seconds until the cached results for query ``q`` go stale.
+        
+        Args:
+            q: Search query
+            
+        Returns:
+            Remaining freshness (negative once stale), or None if not cached
+        """
+        return self.cache.fresh_for(self.cache_key_for(q))
+    
+    async def refresh_news(self, q: str) -> int:
+        """
+        Fetch the results for query ``q`` from SerpAPI and store them in the cache.
+        
+        Used by the prefetcher, so the search is scheduled at background
+        priority against the SerpAPI quota.
+        
+        Args:
+            q: Search query
+            
+        Returns:
+            Number of articles cached
+            
+        Raises:
+            SerpAPIError: If SerpAPI returns an error status
+            httpx.HTTPError: If the request fails
+            UpstreamUnavailable: If the circuit breaker is open, the budget is
+                exceeded or no quota is left for background searches
+        """
+        params = self._build_params(q=q)
+        cache_key = self._cache_key(params)
+        with background_priority():
+            articles = await self.cache.refresh(cache_key, lambda: self._load(cache_key, params))
+        return len(articles)
+    
+    def _load(self, cache_key: Tuple, params: Dict[str, Any]) -> Awaitable[List[Dict[str, Any]]]:
+        """
+        Fetch the results for ``params``, sharing concurrent identical calls.
+        
+        The upstream call runs under the resilience layer (latency budget,
+        circuit breaker and optional hedging).
+        """
+        return self.single_flight.do(
+            cache_key, lambda: self.resilience.call(cache_key, lambda: self._fetch_articles(params))
+        )
+    
+    def _build_params(
+        self,
+        country: Optional[str] = None,
+        category: Optional[str] = None,
+        q: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Build the SerpAPI query parameters for a request.
+        
+        Args:
+            country: Country code (e.g., 'us', 'es', 'au')
+            category: News category
+            q: Search query for specific keywords
+            
+        Returns:
+            SerpAPI query parameters
+        """
+        # Language and domain follow the country, or the query's own language
+        language = "es" if country == "es" else "en"
+        
         if q:
             search_query = q
+            if settings.news_query_canonicalize and country is None:
+                # SerpAPI searches the agent's own words; only the language
+                # (google.es for Spanish queries) follows the canonical form
+                language = canonicalize_query(q).language
         else:
             # Build search query based on parameters if no direct query provided
             query_parts = []
@@ -79,90 +335,130 @@ class SerpAPIService:
             "safe": "active"
         }
         
-        # Set language and domain based on country
-        if country == "es":
-            params["hl"] = "es"
-            params["lr"] = "lang_es"
-            params["google_domain"] = "google.es"
-        else:
-            params["hl"] = "en"
-            params["lr"] = "lang_en"
-            params["google_domain"] = "google.com"
+        params.update(LANGUAGE_PARAMS[language])
         
-        logger.info(f"🔍 SerpAPI Request: {self.base_url}")
-        logger.info(f"📋 Request params: {params}")
+        return params
+    
+    async def _fetch_articles(self, params: Dict[str, Any], limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Fetch, convert, deduplicate, filter and sort the result set for a query from SerpAPI.
         
+        Args:
+            params: SerpAPI query parameters
+            limit: Only keep the `limit` most recent articles (default: all)
+            
+        Returns:
+            Converted articles (one per near-duplicate cluster, with
+            'cluster_size'), sorted by date (most recent first)
+            
+        Raises:
+            SerpAPIError: If SerpAPI returns an error status
+            httpx.HTTPError: If the request fails
+        """
+        logger.log(DETAIL, "🔍 SerpAPI Request: {}", self.base_url)
+        logger.log(DETAIL, "📋 Request params: {}", redact(params))
+        
+        # Every search is billed: wait for a quota token first
+        await self.scheduler.acquire()
+        # Bounded concurrency: wait briefly for a slot or shed the call
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.get(self.base_url, params=params)
-                
-                logger.info(f"📡 Response status: {response.status_code}")
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    logger.info(f"📄 Response data keys: {list(data.keys())}")
-                    
-                    if data.get("search_metadata", {}).get("status") == "Success":
-                        articles = data.get("news_results", [])
-                        logger.info(f"📰 Parsed {len(articles)} articles from API")
-                        
-                        # Convert articles to our expected format
-                        converted_articles = [self._convert_article_format(article) for article in articles]
-                        
-                        # Sort articles by date (most recent first)
-                        sorted_articles = self._sort_by_date(converted_articles)
-                        logger.info(f"✅ Converted {len(converted_articles)} articles, sorted by date")
-                        
-                        limited_articles = sorted_articles[:size]
-                        logger.info(f"📊 Returning {len(limited_articles)} latest articles (size={size})")
-                        
-                        return limited_articles
-                    else:
-                        logger.warning(f"API returned status: {data.get('search_metadata', {}).get('status')}")
-                        return []
-                else:
-                    logger.error(f"SerpAPI error: {response.status_code} - {response.text}")
-                    return []
-                    
-        except httpx.TimeoutException:
-            logger.error("SerpAPI request timed out")
-            return []
-        except httpx.RequestError as e:
-            logger.error(f"SerpAPI request error: {e}")
-            return []
-        except Exception as e:
-            logger.error(f"Unexpected error in SerpAPI: {e}")
-            return []
+            async with self.admission.slot():
+                response = await self._request(params)
+        except UpstreamOverloaded:
+            # Shed before reaching SerpAPI, so nothing was billed
+            self.scheduler.refund()
+            raise
+        
+        logger.log(DETAIL, "📡 Response status: {}", response.status_code)
+        
+        if response.status_code != 200:
+            raise SerpAPIError(f"{response.status_code} - {response.text}", status_code=response.status_code)
+        
+        data = response.json()
+        logger.log(DETAIL, "📄 Response data keys: {}", list(data.keys()))
+        
+        status = data.get("search_metadata", {}).get("status")
+        if status != "Success":
+            UPSTREAM_ERRORS.inc("serpapi", "api_status")
+            raise SerpAPIError(f"API returned status: {status}")
+        
+        articles = data.get("news_results", [])
+        logger.log(DETAIL, "📰 Parsed {} articles from API", len(articles))
+        
+        # Convert articles to our expected format
+        converted_articles = [self._convert_article_format(article) for article in articles]
+        
+        # Collapse the same story reported by several outlets
+        if settings.news_dedup_enabled:
+            clustered = cluster_articles(
+                converted_articles,
+                max_distance=settings.news_dedup_max_distance,
+                snippet_words=settings.news_dedup_snippet_words,
+            )
+            logger.log(DETAIL, "🧩 Clustered {} articles into {} stories", len(converted_articles), len(clustered))
+            converted_articles = clustered
+        
+        # Drop negative stories; the top `limit` are backfilled from the rest
+        if settings.news_filter_enabled:
+            kept = self.content_filter.filter(converted_articles)
+            logger.log(DETAIL, "🌼 Kept {} of {} articles after content filtering", len(kept), len(converted_articles))
+            converted_articles = kept
+        
+        # Sort articles by date (most recent first)
+        sorted_articles = self._sort_by_date(converted_articles, k=limit)
+        logger.log(DETAIL, "✅ Converted {} articles, sorted by date", len(converted_articles))
+        
+        return sorted_articles
     
-    def _sort_by_date(self, articles: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    @staticmethod
+    def _cache_key(params: Dict[str, Any]) -> Tuple[str, str, str, str]:
+        """
+        Build the result-cache key from the effective request parameters.
+        
+        Variants of the same request ("Spain Sports News", "es sports")
+        share one cache entry and one in-flight search under the canonical
+        form of the query, although each is searched as written.
+        
+        Args:
+            params: SerpAPI query parameters
+            
+        Returns:
+            Tuple of (query, hl, lr, google_domain)
+        """
+        q = params["q"]
+        if settings.news_query_canonicalize:
+            q = canonicalize_query(q).q
+        return (q, params["hl"], params["lr"], params["google_domain"])
+    
+    async def _request(self, params: Dict[str, Any]) -> httpx.Response:
+        """
+        Send the search request, reusing the shared pooled client when available.
+        
+        Args:
+            params: SerpAPI query parameters
+            
+        Returns:
+            Raw HTTP response
+        """
+        if self.client is not None:
+            return await timed_upstream("serpapi", self.client.get(self.base_url, params=params))
+        
+        async with httpx.AsyncClient(timeout=self.timeout) as client:
+            return await timed_upstream("serpapi", client.get(self.base_url, params=params))
+    
+    def _sort_by_date(self, articles: List[Dict[str, Any]], k: Optional[int] = None) -> List[Dict[str, Any]]:
         """
         Sort articles by date, with most recent articles first.
         
         Args:
             articles: List of articles with 'published_at' field
+            k: Only keep the k most recent articles
             
         Returns:
             List of articles sorted by date (most recent first)
         """
-        def get_sort_key(article):
-            published_at = article.get('published_at', '')
-            if not published_at:
-                # Articles without dates go to the end
-                return datetime.min
-            
-            try:
-                article_date = self._parse_date_string(published_at)
-                if article_date:
-                    return article_date
-                else:
-                    return datetime.min
-            except Exception:
-                # If we can't parse the date, put it at the end
-                return datetime.min
-        
-        # Sort by date (most recent first)
-        sorted_articles = sorted(articles, key=get_sort_key, reverse=True)
-        logger.info(f"📅 Sorted {len(articles)} articles by date (most recent first)")
+        sorted_articles = rank_articles(articles, k=k)
+        logger.log(DETAIL, "📅 Sorted {} articles by date (most recent first)", len(articles))
         
         return sorted_articles
     
@@ -176,52 +472,7 @@ class SerpAPIService:
         Returns:
             datetime object or None if parsing fails
         """
-        if not date_str:
-            return None
-            
-        # Common patterns from SerpAPI
-        patterns = [
-            r'(\d+)\s+(minute|hour|day|week|month|year)s?\s+ago',
-            r'(\d+)\s+(minute|hour|day|week|month|year)\s+ago',
-            r'(\d+)\s+(min|hr|d|w|mo|y)\s+ago',
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, date_str.lower())
-            if match:
-                try:
-                    value = int(match.group(1))
-                    unit = match.group(2)
-                    
-                    now = datetime.now()
-                    
-                    if unit in ['minute', 'min']:
-                        return now - timedelta(minutes=value)
-                    elif unit in ['hour', 'hr']:
-                        return now - timedelta(hours=value)
-                    elif unit in ['day', 'd']:
-                        return now - timedelta(days=value)
-                    elif unit in ['week', 'w']:
-                        return now - timedelta(weeks=value)
-                    elif unit in ['month', 'mo']:
-                        return now - timedelta(days=value * 30)  # Approximate
-                    elif unit in ['year', 'y']:
-                        return now - timedelta(days=value * 365)  # Approximate
-                except (ValueError, TypeError):
-                    continue
-        
-        # If no pattern matches, try to parse as a regular date
-        try:
-            # Try common date formats
-            for fmt in ['%Y-%m-%d', '%m/%d/%Y', '%d/%m/%Y', '%B %d, %Y']:
-                try:
-                    return datetime.strptime(date_str, fmt)
-                except ValueError:
-                    continue
-        except Exception:
-            pass
-            
-        return None
+        return parse_datetime(date_str)
     
     def _convert_article_format(self, article: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -253,20 +504,7 @@ class SerpAPIService:
         Returns:
             Search-friendly category name
         """
-        category_mapping = {
-            "general": "news",
-            "sports": "sports", 
-            "business": "business",
-            "health": "health",
-            "entertainment": "entertainment",
-            "tech": "technology",
-            "politics": "politics",
-            "science": "science",
-            "food": "food",
-            "travel": "travel"
-        }
-        
-        return category_mapping.get(category.lower(), "news")
+        return CATEGORY_NAMES.get(category.lower(), "news")
     
     def _map_country_to_name(self, country: str) -> str:
         """
@@ -278,18 +516,5 @@ class SerpAPIService:
         Returns:
             Country name for search
         """
-        country_mapping = {
-            "us": "United States",
-            "es": "Spain", 
-            "uk": "United Kingdom",
-            "au": "Australia",
-            "ca": "Canada",
-            "fr": "France",
-            "de": "Germany",
-            "it": "Italy",
-            "jp": "Japan",
-            "in": "India"
-        }
-        
-        return country_mapping.get(country.lower(), country)
+        return COUNTRY_NAMES.get(country.lower(), country)
     
@@ -0,0 +1,72 @@
+"""
+Single-flight coalescing of concurrent identical upstream requests.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls that share a key into one upstream call.
+
+    The first caller for a key starts the work; callers arriving while it is
+    in flight await the same result (or exception) instead of issuing their
+    own request. The shared work is shielded, so a cancelled caller does not
+    cancel it for the others.
+    """
+
+    def __init__(self, name: str = "single-flight"):
+        """
+        Args:
+            name: Name used in log messages and metrics
+        """
+        self.name = name
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+
+        # Statistics
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run ``fn`` for ``key``, or join the call already in flight.
+
+        Args:
+            key: Normalized request key
+            fn: Zero-argument coroutine function performing the upstream call
+
+        Returns:
+            The result of the (possibly shared) call
+        """
+        self.calls += 1
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            return await asyncio.shield(task)
+
+        task = asyncio.ensure_future(fn())
+        self._inflight[key] = task
+        self.executions += 1
+        task.add_done_callback(lambda t: self._forget(key, t))
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Mark the exception as retrieved in case every caller was cancelled
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> Dict[str, int]:
+        """Return call counters and the number of calls in flight."""
+        return {
+            "calls": self.calls,
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "inflight": len(self._inflight),
+        }
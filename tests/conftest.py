@@ -0,0 +1,23 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Settings are read at import time; point the services at unroutable test hosts
+os.environ.setdefault("SERPAPI_API_KEY", "test")
+os.environ.setdefault("SERPAPI_BASE_URL", "http://serp.test/search.json")
+os.environ.setdefault("LIBRIVOX_API", "http://librivox.test/api/feed/audiobooks/?format=json")
+os.environ.setdefault("PREFETCH_ENABLED", "false")
+os.environ.setdefault("LIBRIVOX_CATALOG_ENABLED", "false")
+os.environ.setdefault("CACHE_SNAPSHOT_ENABLED", "false")
+
+
+@pytest.fixture(autouse=True, scope="session")
+def _log_to_tmp(tmp_path_factory):
+    """Keep test runs out of the service's own log file."""
+    from logging_config import configure_logging
+
+    configure_logging(path=str(tmp_path_factory.mktemp("logs") / "news_api.log"))
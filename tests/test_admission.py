@@ -0,0 +1,61 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+import main
+from admission import AdmissionController, UpstreamOverloaded
+
+
+@pytest.mark.asyncio
+async def test_full_queue_sheds_at_once():
+    admission = AdmissionController("test", max_concurrency=1, queue_size=1, max_wait=5.0)
+    await admission.acquire()
+    waiter = asyncio.create_task(admission.acquire())
+    await asyncio.sleep(0)
+    assert admission.stats()["queued"] == 1
+
+    start = time.monotonic()
+    with pytest.raises(UpstreamOverloaded):
+        await admission.acquire()
+    assert time.monotonic() - start < 0.1
+    assert admission.rejected == 1
+
+    # The queued caller gets the slot when it is released
+    admission.release()
+    await asyncio.wait_for(waiter, 1)
+    assert admission.in_flight == 1 and admission.stats()["queued"] == 0
+
+
+@pytest.mark.asyncio
+async def test_wait_longer_than_max_wait_is_shed():
+    admission = AdmissionController("test", max_concurrency=1, queue_size=4, max_wait=0.05)
+    await admission.acquire()
+
+    start = time.monotonic()
+    with pytest.raises(UpstreamOverloaded):
+        await admission.acquire()
+    assert 0.04 <= time.monotonic() - start < 0.5
+    assert admission.stats() == {
+        "enabled": True, "in_flight": 1, "queued": 0, "admitted": 1, "waited": 0, "rejected": 1,
+    }
+
+    # A freed slot is not handed to the caller that gave up
+    admission.release()
+    assert admission.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_shed_request_gets_503_with_retry_after(monkeypatch):
+    admission = AdmissionController("serpapi", max_concurrency=1, queue_size=0, max_wait=0.0)
+    admission._hold_time = 2.5  # Calls hold their slot for 2.5 s on average
+    await admission.acquire()  # Every slot busy
+    monkeypatch.setattr(main.serpapi_service, "admission", admission)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://test") as client:
+        response = await client.get("/api/v1/news/top", params={"q": "harbour admission test"})
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "3"
+    assert response.json() == {"detail": "Service busy, retry in 3s"}
@@ -0,0 +1,63 @@
+import asyncio
+
+import httpx
+import pytest
+
+from audiobook_manifests import AudiobookManifests
+from http_clients import build_client
+from librivox_service import LibriVoxService
+from resilience import CLOSED, CircuitOpenError
+
+
+def make_service(handler):
+    return LibriVoxService(client=build_client(5, 5, transport=httpx.MockTransport(handler)))
+
+
+@pytest.mark.asyncio
+async def test_manifest_fetch_stays_off_the_search_path():
+    def handler(request):
+        return httpx.Response(200, json={"books": [{
+            "id": "7", "title": "Walden", "authors": [],
+            "sections": [{"section_number": "1", "title": "Economy", "listen_url": "http://audio.test/1.mp3", "playtime": "60"}],
+        }]})
+
+    service = make_service(handler)
+    manifests = AudiobookManifests(service)
+    manifest = await manifests.get("7")
+
+    assert [chapter["title"] for chapter in manifest["chapters"]] == ["Economy"]
+    assert service.manifest_admission.admitted == 1
+    assert service.admission.admitted == 0
+    assert service.resilience.last_good(("manifest", "7")) is None
+    assert service.manifest_resilience.last_good(("manifest", "7")) is None
+
+
+@pytest.mark.asyncio
+async def test_failing_manifests_do_not_open_the_search_breaker():
+    service = make_service(lambda request: httpx.Response(503))
+    for book_id in range(10):
+        with pytest.raises((httpx.HTTPStatusError, CircuitOpenError)):
+            await service.fetch_manifest(str(book_id))
+
+    assert service.manifest_resilience.breaker.state != CLOSED
+    assert service.resilience.breaker.state == CLOSED
+
+
+@pytest.mark.asyncio
+async def test_search_never_joins_a_manifest_fetch():
+    release = asyncio.Event()
+
+    async def handler(request):
+        await release.wait()
+        if request.url.params.get("extended") == "1":
+            return httpx.Response(200, json={"books": [{"id": "123", "title": "Walden", "authors": [], "sections": []}]})
+        return httpx.Response(200, json={"books": [{"id": "9", "title": "The Manifest", "authors": [], "genres": []}]})
+
+    service = make_service(handler)
+    manifest = asyncio.create_task(service.fetch_manifest("123"))
+    search = asyncio.create_task(service.fetch_books(title="manifest", genre="123"))
+    await asyncio.sleep(0)
+    release.set()
+
+    assert (await manifest)["title"] == "Walden"
+    assert [book["title"] for book in await search] == ["The Manifest"]
@@ -0,0 +1,47 @@
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from http_clients import build_client
+
+
+@pytest.fixture
+def librivox(monkeypatch):
+    """Route LibriVox calls to a stand-in; returns the list of requested URLs."""
+    calls = []
+
+    def handler(request):
+        calls.append(str(request.url))
+        if "title=" in str(request.url):
+            return httpx.Response(404, json={"error": "Audiobooks could not be found"})
+        return httpx.Response(200, json={"books": [
+            {"id": "101", "title": "Riders of the Purple Sage", "authors": [], "genres": [{"name": "Westerns"}]},
+        ]})
+
+    monkeypatch.setattr(main.librivox_service, "client", build_client(5, 5, transport=httpx.MockTransport(handler)))
+    monkeypatch.setattr(main.audiobook_manifests, "prefetch_count", 0)
+    main.librivox_service.cache.clear()
+    return calls
+
+
+def test_no_results_is_an_empty_list(librivox):
+    response = TestClient(main.app).get("/search_audiobooks", params={"title": "No Such Book Anywhere"})
+    assert response.status_code == 200
+    assert response.json() == {"results": []}
+
+
+def test_genre_missing_from_seed_list_reaches_librivox(librivox, monkeypatch):
+    monkeypatch.setattr(main.genre_index, "complete", False)
+    response = TestClient(main.app).get("/search_audiobooks", params={"genre": "Westerns"})
+    assert response.status_code == 200
+    assert response.json()["results"][0]["title"] == "Riders of the Purple Sage"
+    assert len(librivox) == 1
+
+
+def test_unknown_genre_short_circuits_after_full_sync(librivox, monkeypatch):
+    monkeypatch.setattr(main.genre_index, "complete", True)
+    response = TestClient(main.app).get("/search_audiobooks", params={"genre": "Zzyzx Qwerty"})
+    assert response.status_code == 404
+    assert "suggestions" in response.json()
+    assert librivox == []
@@ -0,0 +1,96 @@
+import asyncio
+import time
+
+import pytest
+
+from cache import TTLCache, in_background_refresh
+
+
+def make_stale(cache, key):
+    """Age the entry for ``key`` past its TTL, into the stale window."""
+    cache._data[key].fresh_until = time.monotonic() - 1
+
+
+class Loader:
+    """Counting loader returning 'v1', 'v2', ... and optionally failing."""
+
+    def __init__(self):
+        self.calls = 0
+        self.fail = False
+        self.release = asyncio.Event()
+        self.release.set()
+        self.background = []
+
+    async def __call__(self):
+        self.calls += 1
+        self.background.append(in_background_refresh.get())
+        await self.release.wait()
+        if self.fail:
+            raise RuntimeError("upstream down")
+        return f"v{self.calls}"
+
+
+async def drain(cache):
+    await asyncio.gather(*cache._refreshing.values())
+
+
+@pytest.mark.asyncio
+async def test_stale_value_is_served_while_one_refresh_runs():
+    cache = TTLCache(maxsize=4, ttl=300, stale_ttl=60)
+    loader = Loader()
+    assert await cache.get_or_load("q", loader) == "v1"
+    make_stale(cache, "q")
+
+    # Every caller gets the stale value at once, while one refresh is pending
+    loader.release.clear()
+    results = await asyncio.gather(*(cache.get_or_load("q", loader) for _ in range(5)))
+    assert results == ["v1"] * 5
+    assert loader.calls == 2 and list(cache._refreshing) == ["q"]
+    assert cache.stats()["stale_hits"] == 5
+
+    loader.release.set()
+    await drain(cache)
+    assert loader.background == [False, True]
+    assert await cache.get_or_load("q", loader) == "v2"
+    assert cache.stats()["hits"] == 1 and loader.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_failed_refresh_keeps_the_stale_value():
+    cache = TTLCache(maxsize=4, ttl=300, stale_ttl=60)
+    loader = Loader()
+    await cache.get_or_load("q", loader)
+    make_stale(cache, "q")
+
+    loader.fail = True
+    assert await cache.get_or_load("q", loader) == "v1"
+    await drain(cache)
+    assert cache.get("q") == "v1" and not cache._refreshing
+
+    # The next stale hit tries again
+    loader.fail = False
+    assert await cache.get_or_load("q", loader) == "v1"
+    await drain(cache)
+    assert cache.get("q") == "v3" and loader.calls == 3
+
+
+@pytest.mark.asyncio
+async def test_expired_value_is_loaded_again():
+    cache = TTLCache(maxsize=4, ttl=300, stale_ttl=60)
+    loader = Loader()
+    await cache.get_or_load("q", loader)
+    cache._data["q"].stale_until = time.monotonic() - 1
+
+    assert await cache.get_or_load("q", loader) == "v2"
+    assert not cache._refreshing and cache.stats()["misses"] == 2
+
+
+@pytest.mark.asyncio
+async def test_without_stale_window_a_miss_waits_for_the_loader():
+    cache = TTLCache(maxsize=4, ttl=300)
+    loader = Loader()
+    await cache.get_or_load("q", loader)
+    cache._data["q"].fresh_until = cache._data["q"].stale_until = time.monotonic() - 1
+
+    assert await cache.get_or_load("q", loader) == "v2"
+    assert cache.stats()["stale_hits"] == 0
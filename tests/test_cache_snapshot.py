@@ -0,0 +1,97 @@
+import time
+
+import pytest
+
+from cache import TTLCache
+from cache_snapshot import MAGIC, CacheSnapshotter
+
+
+def make_caches():
+    return {"news": TTLCache(maxsize=16, ttl=300, stale_ttl=60), "audiobooks": TTLCache(maxsize=16, ttl=300)}
+
+
+async def save(path, fill):
+    caches = make_caches()
+    fill(caches)
+    return await CacheSnapshotter(caches, path=str(path), interval=0).save()
+
+
+def load(path):
+    caches = make_caches()
+    snapshotter = CacheSnapshotter(caches, path=str(path), interval=0)
+    snapshotter.load()
+    return caches, snapshotter
+
+
+@pytest.mark.asyncio
+async def test_entries_round_trip_with_their_deadlines(tmp_path):
+    path = tmp_path / "snapshot.bin"
+    articles = [{"title": "Harbour bridge reopens", "source": "Wire"}]
+
+    def fill(caches):
+        caches["news"].set(("harbour news", "en", "lang_en", "google.com"), articles)
+        caches["audiobooks"].set(("walden", None), [{"id": "1"}], ttl=120)
+
+    assert await save(path, fill) == 2
+    caches, snapshotter = load(path)
+    assert snapshotter.stats()["pending"] == 2
+
+    assert caches["news"].get(("harbour news", "en", "lang_en", "google.com")) == articles
+    assert caches["audiobooks"].get(("walden", None)) == [{"id": "1"}]
+    assert 110 < caches["audiobooks"].fresh_for(("walden", None)) <= 120
+    assert snapshotter.stats()["restored"] == 2
+    assert caches["news"].get(("unknown",)) is None
+
+
+@pytest.mark.asyncio
+async def test_truncated_file_keeps_the_complete_records(tmp_path):
+    path = tmp_path / "snapshot.bin"
+
+    def fill(caches):
+        for i in range(3):
+            caches["news"].set(("query", i), [{"title": f"Story {i}"}])
+
+    assert await save(path, fill) == 3
+    path.write_bytes(path.read_bytes()[:-5])
+
+    caches, snapshotter = load(path)
+    assert snapshotter.stats()["pending"] == 2
+    assert caches["news"].get(("query", 0)) == [{"title": "Story 0"}]
+    assert caches["news"].get(("query", 1)) == [{"title": "Story 1"}]
+    assert caches["news"].get(("query", 2)) is None
+
+
+@pytest.mark.parametrize("content", [b"", b"not a snapshot at all", MAGIC + b"\xff" * 16])
+def test_corrupt_file_is_ignored(tmp_path, content):
+    path = tmp_path / "snapshot.bin"
+    path.write_bytes(content)
+
+    caches, snapshotter = load(path)
+    assert snapshotter.stats()["pending"] == 0
+    assert caches["news"].get(("query", 0)) is None
+
+
+def test_missing_file_is_ignored(tmp_path):
+    caches, snapshotter = load(tmp_path / "missing.bin")
+    assert snapshotter.snapshot is None
+    assert caches["news"].warm_start is None
+
+
+@pytest.mark.asyncio
+async def test_expired_entries_are_dropped_on_load(tmp_path):
+    path = tmp_path / "snapshot.bin"
+
+    def fill(caches):
+        caches["audiobooks"].set(("short",), ["gone"], ttl=0.05)
+        caches["audiobooks"].set(("long",), ["kept"])
+
+    assert await save(path, fill) == 2
+    time.sleep(0.1)
+
+    caches, snapshotter = load(path)
+    assert snapshotter.stats()["pending"] == 1
+    assert caches["audiobooks"].get(("short",)) is None
+    assert caches["audiobooks"].get(("long",)) == ["kept"]
+
+    # A new snapshot only carries the live entry
+    assert await snapshotter.save() == 1
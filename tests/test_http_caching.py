@@ -0,0 +1,97 @@
+import gzip
+
+import pytest
+from starlette.requests import Request
+
+import http_caching
+from config import settings
+from http_caching import CompressedBodies, cached_response, choose_encoding, compute_etag
+
+
+def make_request(accept_encoding=None, if_none_match=None, method="GET"):
+    headers = []
+    if accept_encoding is not None:
+        headers.append((b"accept-encoding", accept_encoding.encode()))
+    if if_none_match is not None:
+        headers.append((b"if-none-match", if_none_match.encode()))
+    return Request({"type": "http", "method": method, "path": "/", "headers": headers})
+
+
+@pytest.fixture
+def compression(monkeypatch):
+    monkeypatch.setattr(settings, "http_compression_enabled", True)
+    monkeypatch.setattr(settings, "http_caching_enabled", True)
+    monkeypatch.setattr(settings, "http_compression_min_size", 100)
+    monkeypatch.setattr(http_caching, "compressed_bodies", CompressedBodies(maxsize=8))
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, None),
+    ("", None),
+    ("identity", None),
+    ("gzip, deflate", "gzip"),
+    ("br, gzip", "br"),
+    ("gzip;q=0.5, br;q=1.0", "br"),
+    ("br;q=0, gzip", "gzip"),
+    ("gzip;q=0", None),
+    ("*", "br"),
+    ("*, br;q=0", "gzip"),
+    ("GZIP", "gzip"),
+    ("gzip;q=bogus", None),
+])
+def test_encoding_negotiation(monkeypatch, header, expected):
+    # With brotli installed, br is preferred whenever the client accepts it
+    monkeypatch.setattr(http_caching, "ENCODINGS", ("br", "gzip"))
+    assert choose_encoding(header) == expected
+
+
+def test_br_is_not_chosen_without_brotli(monkeypatch):
+    monkeypatch.setattr(http_caching, "ENCODINGS", ("gzip",))
+    assert choose_encoding("br") is None
+    assert choose_encoding("br, gzip") == "gzip"
+
+
+def test_body_below_min_size_is_sent_uncompressed(compression):
+    body = b"x" * 99
+    response = cached_response(make_request("gzip"), body, 60)
+    assert "Content-Encoding" not in response.headers
+    assert response.body == body
+    assert response.headers["ETag"] == compute_etag(body)
+
+
+def test_body_at_min_size_is_gzipped(compression):
+    body = b'{"stories": []}'.ljust(100)
+    response = cached_response(make_request("gzip, deflate"), body, 60)
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.headers["Vary"] == "Accept-Encoding"
+    assert gzip.decompress(response.body) == body
+    # Each encoding has its own strong validator
+    assert response.headers["ETag"] == compute_etag(body)[:-1] + '-gzip"'
+
+    # Revalidating with the gzip ETag gets a 304
+    revalidated = cached_response(make_request("gzip", if_none_match=response.headers["ETag"]), body, 60)
+    assert revalidated.status_code == 304 and not revalidated.body
+
+
+def test_compressed_body_is_reused(compression):
+    body = b"a" * 500
+    first = cached_response(make_request("gzip"), body, 60)
+    second = cached_response(make_request("gzip"), body, 60)
+    assert first.body == second.body
+    assert http_caching.compressed_bodies.stats() == {"size": 1, "hits": 1, "misses": 1}
+
+
+def test_client_without_accept_encoding_gets_identity(compression):
+    body = b"a" * 500
+    response = cached_response(make_request(), body, 60)
+    assert "Content-Encoding" not in response.headers
+    assert response.body == body
+
+
+def test_brotli_round_trip(compression, monkeypatch):
+    brotli = pytest.importorskip("brotli")
+    monkeypatch.setattr(http_caching, "ENCODINGS", ("br", "gzip"))
+    body = b'{"stories": []}' * 20
+    response = cached_response(make_request("gzip, br"), body, 60)
+    assert response.headers["Content-Encoding"] == "br"
+    assert brotli.decompress(response.body) == body
@@ -0,0 +1,125 @@
+import asyncio
+import threading
+
+import httpx
+import pytest
+
+from http_clients import build_client
+from librivox_catalog import LibriVoxCatalog
+from librivox_service import LibriVoxService
+
+BOOKS = [
+    {"id": "1", "title": "Walden", "authors": [], "genres": [{"name": "Essays"}]},
+    {"id": "2", "title": "Moby Dick", "authors": [], "genres": [{"name": "Action & Adventure"}]},
+]
+
+
+def make_catalog():
+    def handler(request):
+        if "offset=0" in str(request.url):
+            return httpx.Response(200, json={"books": BOOKS})
+        return httpx.Response(404)
+
+    service = LibriVoxService(client=build_client(5, 5, transport=httpx.MockTransport(handler)))
+    return LibriVoxCatalog(service, path=":memory:")
+
+
+@pytest.mark.asyncio
+async def test_partial_index_does_not_answer():
+    catalog = make_catalog()
+    catalog.open()
+    # First page of an initial load that has not finished yet
+    catalog._upsert([catalog.service.convert_book_format(BOOKS[0])])
+
+    assert await catalog.search(title="Walden") is None
+    assert catalog.hits == 0
+
+
+@pytest.mark.asyncio
+async def test_index_answers_after_full_sync():
+    catalog = make_catalog()
+    assert await catalog.sync() == 2
+
+    results = await catalog.search(title="Walden")
+    assert [book["title"] for book in results] == ["Walden"]
+
+
+@pytest.mark.asyncio
+async def test_failed_full_sync_resumes_after_last_page(monkeypatch):
+    monkeypatch.setattr("librivox_catalog.settings.librivox_catalog_page_size", 1)
+    offsets = []
+    failures = [500]
+
+    def handler(request):
+        offset = int(request.url.params["offset"])
+        offsets.append(offset)
+        if offset == 1 and failures:
+            return httpx.Response(failures.pop())
+        if offset < len(BOOKS):
+            return httpx.Response(200, json={"books": [BOOKS[offset]]})
+        return httpx.Response(404)
+
+    service = LibriVoxService(client=build_client(5, 5, transport=httpx.MockTransport(handler)))
+    catalog = LibriVoxCatalog(service, path=":memory:")
+    with pytest.raises(httpx.HTTPStatusError):
+        await catalog.sync()
+    assert await catalog.search(title="Walden") is None
+
+    assert await catalog.sync() == 1
+    assert offsets == [0, 1, 1, 2]
+    assert [book["title"] for book in await catalog.search(title="Walden")] == ["Walden"]
+    assert catalog._get_meta("full_sync_offset") is None
+
+
+@pytest.mark.asyncio
+async def test_failed_full_sync_is_retried_before_refresh_interval(monkeypatch):
+    monkeypatch.setattr("librivox_catalog.settings.librivox_catalog_retry_interval", 30.0)
+    monkeypatch.setattr("librivox_catalog.settings.librivox_catalog_refresh_interval", 21600.0)
+    catalog = make_catalog()
+    attempts = []
+    delays = []
+
+    async def sync():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise httpx.ConnectError("down")
+        catalog._synced = True
+
+    async def sleep(delay):
+        delays.append(delay)
+        if len(delays) == 4:
+            raise asyncio.CancelledError
+
+    monkeypatch.setattr(catalog, "sync", sync)
+    monkeypatch.setattr("librivox_catalog.asyncio.sleep", sleep)
+    with pytest.raises(asyncio.CancelledError):
+        await catalog._run()
+    assert delays == [30.0, 60.0, 21600.0, 21600.0]
+
+
+class RecordingLock:
+    """threading.Lock that records the threads acquiring it."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.threads = set()
+
+    def __enter__(self):
+        self.threads.add(threading.get_ident())
+        return self.lock.__enter__()
+
+    def __exit__(self, *exc):
+        return self.lock.__exit__(*exc)
+
+
+@pytest.mark.asyncio
+async def test_event_loop_never_waits_for_the_index_lock():
+    catalog = make_catalog()
+    catalog.open()
+    catalog._lock = RecordingLock()
+
+    assert await catalog.sync() == 2
+    assert await catalog.search(title="Walden")
+    await catalog.load_genre_index()
+    assert catalog.stats()["size"] == len(catalog) == 2
+    assert catalog._lock.threads and threading.get_ident() not in catalog._lock.threads
@@ -0,0 +1,39 @@
+import httpx
+import pytest
+
+import main
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    """SerpAPI stand-in that fails every query mentioning 'outage'."""
+    def handler(request):
+        if "outage" in request.url.params["q"]:
+            return httpx.Response(500, json={"error": "Internal error"})
+        return httpx.Response(200, json={
+            "search_metadata": {"status": "Success"},
+            "news_results": [{"title": "Harbour bridge reopens", "snippet": "", "source": "Wire", "date": "1 hour ago"}],
+        })
+
+    monkeypatch.setattr(main.serpapi_service, "client", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+
+
+@pytest.mark.asyncio
+async def test_upstream_failure_is_reported_per_query(upstream):
+    response = await main.get_top_news_batch(main.NewsBatchRequest(queries=[
+        main.NewsRequest(q="harbour batch news"),
+        main.NewsRequest(q="harbour outage batch news"),
+    ]))
+    working, failing = response.results
+    assert working.success and working.total_count == 1
+    assert not failing.success and failing.error and not failing.stories
+    assert not response.success
+
+
+@pytest.mark.asyncio
+async def test_cursor_is_rejected_in_batch(upstream):
+    response = await main.get_top_news_batch(main.NewsBatchRequest(queries=[
+        main.NewsRequest(q="harbour cursor batch news", cursor="abc.def"),
+    ]))
+    result, = response.results
+    assert not result.success and "cursor" in result.error.lower()
@@ -0,0 +1,80 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+from bench_dedup import clustering_errors, distinct_articles, load_clusters_fixture, load_fixture  # noqa: E402
+
+from news_dedup import _snippet_tokens, cluster_articles, tokenize  # noqa: E402
+
+
+def test_fixture_collapses_to_one_story_per_event():
+    stories = cluster_articles(load_fixture())
+    assert len(stories) == 20
+    assert {story["cluster_size"] for story in stories} == {5}
+
+
+def test_distinct_articles_stay_apart():
+    assert len(cluster_articles(distinct_articles())) == 100
+
+
+def test_headline_with_one_extra_word_joins_cluster():
+    articles = [
+        {"title": "Bakery donates bread to shelters", "description": ""},
+        {"title": "Bakery donates bread to local shelters", "description": "Loaves for three shelters."},
+    ]
+    [story] = cluster_articles(articles)
+    assert story["cluster_size"] == 2
+    # The first member with a description represents the cluster
+    assert story["description"] == "Loaves for three shelters."
+
+
+def test_stories_sharing_one_word_stay_apart():
+    articles = [
+        {"title": "City marathon raises funds for hospital", "description": ""},
+        {"title": "City council approves new bike lanes", "description": ""},
+    ]
+    assert len(cluster_articles(articles)) == 2
+
+
+def test_snippet_tokens_are_a_prefix_of_all_tokens():
+    text = "The the of a " * 20 + "Harbour bridge reopens after U.S.-funded repairs, officials say"
+    for count in (0, 1, 8, 40):
+        assert _snippet_tokens(text, count) == tokenize(text)[:count]
+
+
+def test_headlines_with_one_word_swapped_stay_apart():
+    pairs = [
+        ("Apple shares rise after strong earnings", "Microsoft shares rise after strong earnings"),
+        ("Storm hits Florida coast", "Storm hits Texas coast"),
+        ("Spain wins Euro 2024 final", "England wins Euro 2024 final"),
+    ]
+    for first, second in pairs:
+        articles = [{"title": first, "description": ""}, {"title": second, "description": ""}]
+        assert [story["title"] for story in cluster_articles(articles)] == [first, second]
+
+
+def test_look_alike_stories_stay_apart():
+    pairs = [
+        ("Nadal wins French Open", "Nadal loses French Open final"),
+        ("Real Madrid beat Barcelona 2-1 in El Clasico", "Barcelona beat Real Madrid 3-0 in El Clasico"),
+        ("Interest rates cut by Bank of England", "Interest rates held by Bank of Spain"),
+        ("Madrid marathon raises funds for hospital", "Barcelona marathon raises funds for school"),
+        ("Pogacar wins Tour de France stage 4", "Pogacar wins Tour de France"),
+    ]
+    for first, second in pairs:
+        articles = [{"title": first, "description": ""}, {"title": second, "description": ""}]
+        assert [story["title"] for story in cluster_articles(articles)] == [first, second]
+
+
+def test_inflected_headline_joins_cluster():
+    articles = [
+        {"title": "Harbour bridge reopens after repairs", "description": ""},
+        {"title": "Harbour bridge reopened after repairs", "description": ""},
+    ]
+    [story] = cluster_articles(articles)
+    assert story["cluster_size"] == 2
+
+
+def test_realistic_result_set_merges_no_different_stories():
+    wrong, _ = clustering_errors(load_clusters_fixture())
+    assert wrong == 0
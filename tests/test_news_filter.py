@@ -0,0 +1,39 @@
+import pytest
+
+from news_filter import DEFAULT_NEGATIVE_TERMS, ContentFilter
+
+
+def test_batch_scores_match_single_article_scores():
+    articles = [{"title": "İİİİİİİİİİİİİİİİİİİİ stanbul festival"}, {"title": "Man killed"}]
+    content_filter = ContentFilter(negative_terms=["killed"], positive_terms=["festival"])
+    assert content_filter.score_batch(articles) == [1.0, -2.0]
+
+
+def test_filter_keeps_non_negative_articles_in_order():
+    articles = [{"title": "Village festival draws crowds"}, {"title": "Man killed"}, {"title": "Weather"}]
+    content_filter = ContentFilter(negative_terms=["killed"], positive_terms=["festival"])
+    assert [article["title"] for article in content_filter.filter(articles)] == ["Village festival draws crowds", "Weather"]
+
+
+@pytest.mark.parametrize("title, description", [
+    ("Spain wins the World Cup", "Spain's attack dominated the final."),
+    ("Apple faces lawsuit over app store fees", "The company said it would appeal."),
+    ("Tech shares rebound after last week's crash", "Investors returned to chip makers."),
+    ("Talks aim to end the energy crisis", "Ministers meet in Brussels."),
+    ("Price war lowers airfares to the islands", ""),
+    ("Former mayor released from jail early", ""),
+])
+def test_neutral_headlines_are_kept(title, description):
+    articles = [{"title": title, "description": description}]
+    assert ContentFilter().filter(articles) == articles
+
+
+@pytest.mark.parametrize("title", ["War breaks out along the border", "Plane crash near the airport", "Bridge collapse closes river crossing"])
+def test_unambiguous_negative_phrases_are_dropped(title):
+    assert ContentFilter().filter([{"title": title, "description": ""}]) == []
+
+
+def test_lexicon_has_no_phrase_covered_by_a_shorter_term():
+    terms = {term.lower() for term in DEFAULT_NEGATIVE_TERMS}
+    redundant = [term for term in terms if any(word in terms for word in term.split()) and " " in term]
+    assert redundant == []
@@ -0,0 +1,134 @@
+import httpx
+import pytest
+
+from http_clients import build_client
+from news_pipeline import NewsPipeline, decode_cursor
+from redis_cache import InMemoryBackend, TieredCache
+from serpapi_service import SerpAPIService
+
+TITLES = [
+    "Central bank holds interest rates steady",
+    "Storm closes mountain passes overnight",
+    "Local team wins championship final",
+    "Scientists map deep ocean trench",
+    "City council approves new bike lanes",
+    "Museum reopens after long renovation",
+    "Farmers report record apple harvest",
+    "Airline adds routes to island resorts",
+]
+
+
+def serpapi_handler(request):
+    return httpx.Response(200, json={
+        "search_metadata": {"status": "Success"},
+        "news_results": [
+            {"title": title, "snippet": "", "source": "Wire", "date": f"{i + 1} hours ago", "link": f"http://news.test/{i}"}
+            for i, title in enumerate(TITLES)
+        ],
+    })
+
+
+def make_worker(backend):
+    """One uvicorn worker: its own service, L1 and pipeline over a shared L2."""
+    cache = TieredCache(backend, namespace="news", maxsize=16, ttl=300, stale_ttl=900)
+    service = SerpAPIService(client=build_client(5, 5, transport=httpx.MockTransport(serpapi_handler)), cache=cache)
+    cursor_store = TieredCache(backend, namespace="news-cursors", maxsize=16, ttl=3600)
+    return NewsPipeline(service, cursor_store=cursor_store)
+
+
+@pytest.mark.asyncio
+async def test_cursor_resolves_on_another_worker():
+    backend = InMemoryBackend()
+    first, second = make_worker(backend), make_worker(backend)
+
+    page = await first.top_stories(q="world news", limit=3)
+    assert page.next_cursor is not None
+
+    more = await second.more_stories(page.next_cursor, 3, "world news")
+    assert more is not None
+    assert [story.title for story in page.stories + more.stories] == [
+        story.title for story in (await first.top_stories(q="world news", limit=6)).stories
+    ]
+
+
+@pytest.mark.asyncio
+async def test_tampered_cursor_is_rejected():
+    pipeline = make_worker(InMemoryBackend())
+    page = await pipeline.top_stories(q="world news", limit=3)
+    payload, _, signature = page.next_cursor.partition(".")
+    forged = payload[:-1] + ("A" if payload[-1] != "A" else "B") + "." + signature
+
+    assert decode_cursor(forged) is None
+    assert await pipeline.more_stories(forged, 3, "world news") is None
+    assert await pipeline.more_stories("not-a-cursor", 3, "world news") is None
+
+
+@pytest.mark.asyncio
+async def test_cursor_outlives_result_refresh_and_eviction():
+    backend = InMemoryBackend()
+    pipeline = make_worker(backend)
+    page = await pipeline.top_stories(q="world news", limit=3)
+
+    # A refresh replaces the cached list, then the result is evicted everywhere
+    await pipeline.service.cache.refresh(pipeline.service.cache_key_for("world news"), _reversed_articles)
+    pipeline.service.cache.l1.clear()
+    for key in [key for key in backend._data if ":news:" in key]:
+        del backend._data[key]
+
+    more = await pipeline.more_stories(page.next_cursor, 3, "world news")
+    assert [story.title for story in more.stories] == TITLES[3:6]
+    last = await pipeline.more_stories(more.next_cursor, 3, "world news")
+    assert [story.title for story in last.stories] == TITLES[6:]
+    assert last.next_cursor is None
+
+
+async def _reversed_articles():
+    return [{"title": title, "description": "", "link": f"http://news.test/r{i}"} for i, title in enumerate(reversed(TITLES))]
+
+
+@pytest.mark.asyncio
+async def test_cursor_expires_with_its_served_list():
+    backend = InMemoryBackend()
+    pipeline = make_worker(backend)
+    page = await pipeline.top_stories(q="world news", limit=3)
+
+    pipeline.cursor_store.l1.clear()
+    backend._data.clear()
+    assert await pipeline.more_stories(page.next_cursor, 3, "world news") is None
+
+
+@pytest.mark.asyncio
+async def test_cursor_is_rejected_under_another_query():
+    pipeline = make_worker(InMemoryBackend())
+    page = await pipeline.top_stories(q="world news", limit=3)
+
+    assert await pipeline.more_stories(page.next_cursor, 3, "sports news") is None
+    # Variants of the same query share its cache key, and its cursors
+    assert await pipeline.more_stories(page.next_cursor, 3, "World News") is not None
+
+
+@pytest.mark.asyncio
+async def test_etag_is_stable_across_workers_and_renders():
+    backend = InMemoryBackend()
+    first, second = make_worker(backend), make_worker(backend)
+
+    page = await first.top_stories(q="world news", limit=3)
+    assert (await second.top_stories(q="world news", limit=3)).etag == page.etag
+
+    first._rendered.clear()
+    rerendered = await first.top_stories(q="world news", limit=3)
+    assert rerendered is not page
+    assert rerendered.etag == page.etag
+
+    assert (await first.top_stories(q="world news", limit=4)).etag != page.etag
+
+
+@pytest.mark.asyncio
+async def test_cursor_works_without_any_configured_secret(monkeypatch):
+    pipeline = make_worker(InMemoryBackend())
+    monkeypatch.setattr("news_pipeline.settings.news_cursor_secret", "")
+    monkeypatch.setattr("news_pipeline.settings.serpapi_api_key", None)
+
+    page = await pipeline.top_stories(q="world news", limit=3)
+    more = await pipeline.more_stories(page.next_cursor, 3, "world news")
+    assert more is not None and len(more.stories) == 3
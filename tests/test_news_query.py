@@ -0,0 +1,72 @@
+import pytest
+
+from news_query import canonicalize_query
+from serpapi_service import SerpAPIService
+
+
+@pytest.mark.parametrize("query, canonical", [
+    ("New York news", "new york"),
+    ("New Zealand weather", "new zealand weather"),
+    ("top gun", "top gun"),
+    ("IT industry layoffs", "it industry layoffs"),
+    ("de Gaulle", "de gaulle"),
+])
+def test_meaningful_words_are_kept(query, canonical):
+    assert canonicalize_query(query).q == canonical
+
+
+@pytest.mark.parametrize("query, canonical", [
+    ("us politics", "United States politics"),
+    ("es sports", "Spain sports"),
+    ("US news", "United States"),
+])
+def test_bare_country_code_maps_to_country(query, canonical):
+    assert canonicalize_query(query).q == canonical
+
+
+def test_variants_share_canonical_form():
+    variants = ["sports news Spain", "Spain Sports News", "es sports", "latest sports news in Spain today"]
+    assert {canonicalize_query(q).q for q in variants} == {"Spain sports"}
+
+
+def test_spanish_query_detected():
+    assert canonicalize_query("noticias deportivas de España hoy").language == "es"
+
+
+def test_multi_word_spanish_country_detected():
+    assert canonicalize_query("Reino Unido economía").language == "es"
+    assert canonicalize_query("elecciones en Estados Unidos") == ("noticias elecciones Estados Unidos", "es")
+
+
+@pytest.mark.parametrize("query, canonical", [
+    ("Lana Del Rey news", "lana del rey"),
+    ("Del Mar horse racing", "del mar horse racing"),
+    ("news about the world", "world"),
+    ("Mundo cup highlights", "mundo cup highlights"),
+])
+def test_english_queries_with_spanish_looking_words_stay_english(query, canonical):
+    assert canonicalize_query(query) == (canonical, "en")
+
+
+def test_english_query_with_spanish_looking_word_is_searched_in_english():
+    params = SerpAPIService()._build_params(q="Lana Del Rey news")
+    assert (params["hl"], params["lr"], params["google_domain"]) == ("en", "lang_en", "google.com")
+
+
+@pytest.mark.parametrize("query", ["New York news", "de Gaulle", "us politics", "noticias deportivas de España hoy"])
+def test_canonicalization_is_idempotent(query):
+    canonical = canonicalize_query(query)
+    assert canonicalize_query(canonical.q) == canonical
+
+
+def test_upstream_query_keeps_agents_words():
+    service = SerpAPIService()
+    params = service._build_params(q="New York news")
+    assert params["q"] == "New York news"
+    assert service._cache_key(params)[0] == "new york"
+
+
+def test_variants_share_cache_key():
+    service = SerpAPIService()
+    keys = {service._cache_key(service._build_params(q=q)) for q in ("Spain Sports News", "es sports")}
+    assert len(keys) == 1
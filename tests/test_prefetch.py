@@ -0,0 +1,36 @@
+import pytest
+
+from cache import TTLCache
+from prefetch import NewsPrefetcher
+from serpapi_service import SerpAPIService
+
+
+def make_prefetcher(maxsize, monkeypatch):
+    service = SerpAPIService(cache=TTLCache(maxsize=maxsize, ttl=300))
+    searched = []
+
+    async def refresh_news(q):
+        searched.append(q)
+        return 1
+
+    monkeypatch.setattr(service, "refresh_news", refresh_news)
+    prefetcher = NewsPrefetcher(service)
+    for _ in range(3):
+        prefetcher.record("Spain national news today")
+    return prefetcher, searched
+
+
+@pytest.mark.asyncio
+async def test_hot_query_is_prefetched(monkeypatch):
+    prefetcher, searched = make_prefetcher(16, monkeypatch)
+    assert await prefetcher.run_once() == 1
+    assert searched == ["Spain national news today"]
+
+
+@pytest.mark.asyncio
+async def test_nothing_is_prefetched_without_a_result_cache(monkeypatch):
+    prefetcher, searched = make_prefetcher(0, monkeypatch)
+    assert await prefetcher.run_once() == 0
+    prefetcher.start()
+    assert prefetcher._task is None
+    assert searched == []
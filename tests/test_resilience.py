@@ -0,0 +1,52 @@
+import pytest
+
+from admission import UpstreamOverloaded
+from quota import QuotaExceededError
+from resilience import CLOSED, HALF_OPEN, OPEN, ResilientCaller
+
+
+def make_caller(**kwargs):
+    return ResilientCaller("test", budget=0, failure_threshold=2, recovery_time=0, **kwargs)
+
+
+async def fail():
+    raise ConnectionError("upstream down")
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("refusal", [QuotaExceededError("no quota"), UpstreamOverloaded("busy")])
+async def test_refused_probe_leaves_breaker_half_open(refusal):
+    caller = make_caller()
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            await caller.call("k", fail)
+    assert caller.breaker.state == OPEN
+
+    async def refuse():
+        raise refusal
+
+    with pytest.raises(type(refusal)):
+        await caller.call("k", refuse)
+    assert caller.breaker.state == HALF_OPEN
+
+    # The probe slot was given back, so the next call probes again
+    async def succeed():
+        return "ok"
+
+    assert await caller.call("k", succeed) == "ok"
+    assert caller.breaker.state == CLOSED
+
+
+@pytest.mark.asyncio
+async def test_refusal_does_not_reset_failure_count():
+    caller = make_caller()
+    with pytest.raises(ConnectionError):
+        await caller.call("k", fail)
+
+    async def refuse():
+        raise QuotaExceededError("no quota")
+
+    with pytest.raises(QuotaExceededError):
+        await caller.call("k", refuse)
+    assert caller.breaker.failures == 1
+    assert caller.last_good("k") is None
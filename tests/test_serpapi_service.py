@@ -0,0 +1,63 @@
+import asyncio
+
+import httpx
+import pytest
+
+from admission import AdmissionController, UpstreamOverloaded
+from cache import TTLCache
+from http_clients import build_client
+from quota import LIVE, TokenBucketScheduler
+from serpapi_service import SerpAPIService
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_share_one_call_without_cache():
+    calls = []
+
+    async def handler(request):
+        calls.append(request)
+        await asyncio.sleep(0.05)
+        return httpx.Response(200, json={
+            "search_metadata": {"status": "Success"},
+            "news_results": [{"title": "Harbour bridge reopens", "snippet": "", "source": "Wire", "date": "1 hour ago"}],
+        })
+
+    service = SerpAPIService(
+        client=build_client(5, 5, transport=httpx.MockTransport(handler)),
+        cache=TTLCache(maxsize=0, ttl=300),
+    )
+    assert not service.cache.enabled
+
+    results = await asyncio.gather(*(service.get_ranked_articles(q="harbour news", limit=3) for _ in range(5)))
+    assert len(calls) == 1
+    assert all(articles == results[0] and articles for articles in results)
+
+
+@pytest.mark.asyncio
+async def test_shed_call_spends_no_quota_token():
+    service = SerpAPIService(client=build_client(5, 5, transport=httpx.MockTransport(lambda request: httpx.Response(500))))
+    service.scheduler = TokenBucketScheduler("serpapi", rate=0.001, burst=2, queue_size=0, max_wait={LIVE: 0.0})
+    service.admission = AdmissionController("serpapi", max_concurrency=1, queue_size=0, max_wait=0.0)
+    await service.admission.acquire()  # Every slot busy
+
+    with pytest.raises(UpstreamOverloaded):
+        await service._fetch_articles(service._build_params(q="harbour news"))
+    assert service.scheduler.tokens >= 2
+
+
+@pytest.mark.asyncio
+async def test_fallback_without_cache_is_only_served_for_the_same_limit():
+    results = [{"title": f"Harbour story {i}", "snippet": "", "source": "Wire", "date": f"{i + 1} hours ago"} for i in range(5)]
+    service = SerpAPIService(
+        client=build_client(5, 5, transport=httpx.MockTransport(lambda request: httpx.Response(200, json={
+            "search_metadata": {"status": "Success"},
+            "news_results": results,
+        }))),
+        cache=TTLCache(maxsize=0, ttl=300),
+    )
+    assert len(await service.get_ranked_articles(q="harbour news", limit=2)) == 2
+
+    service.resilience.breaker.allow = lambda: False  # Upstream unavailable from now on
+    assert len(await service.get_ranked_articles(q="harbour news", limit=2)) == 2
+    # The two articles kept for limit=2 are not the five stories asked for
+    assert await service.get_ranked_articles(q="harbour news", limit=5) == []
@@ -0,0 +1,51 @@
+import os
+import sys
+import time
+
+import httpx
+import pytest
+
+import main
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+from fake_upstreams import create_app  # noqa: E402
+
+SERPAPI_LATENCY = 0.2
+
+
+@pytest.fixture
+def stand_in(monkeypatch):
+    """Send SerpAPI calls to the benchmark stand-in with a fixed latency."""
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=create_app(serpapi_latency=SERPAPI_LATENCY, jitter=0.0)))
+    monkeypatch.setattr(main.serpapi_service, "client", client)
+    return client
+
+
+async def time_to_first_event(q):
+    """Seconds until the first NDJSON line, and all lines of the stream."""
+    start = time.perf_counter()
+    response = await main.stream_top_news(q=q, limit=3, format="ndjson")
+    first, lines = None, []
+    async for line in response.body_iterator:
+        if first is None:
+            first = time.perf_counter() - start
+        lines.append(line)
+    return first, lines
+
+
+@pytest.mark.asyncio
+async def test_time_to_first_event(stand_in):
+    q = "harbour festival streaming test"
+    executions = main.serpapi_service.single_flight.executions
+
+    # Cold: stories are ranked over the whole SerpAPI result before the first event
+    cold, lines = await time_to_first_event(q)
+    assert cold >= SERPAPI_LATENCY * 0.9
+    assert b'"event":"story"' in lines[0]
+    assert b'"event":"summary"' in lines[-1]
+
+    # Warm: served from the cache, no upstream call
+    warm, lines = await time_to_first_event(q)
+    assert warm < SERPAPI_LATENCY / 4
+    assert b'"event":"story"' in lines[0]
+    assert main.serpapi_service.single_flight.executions == executions + 1